@@ -1,3 +1,5 @@
 # License AGPL-3.0 or later (https://www.gnu.org/licenses/agpl.html).
 
 from . import jira_oauth_dance
+from . import jira_bulk_load_worklogs
+from . import jira_webhook_benchmark
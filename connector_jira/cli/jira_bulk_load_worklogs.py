@@ -0,0 +1,131 @@
+"""Odoo CLI command to bulk load the Jira worklogs
+
+Loads large volumes of worklogs (initial load, historical backfill)
+with PostgreSQL COPY instead of one job per worklog. The worklogs are
+read either from the Jira API or from a dump file containing one
+worklog per line in JSON, as returned by the Jira API.
+
+It is plugged in the Odoo CLI commands::
+
+  odoo jirabulkloadworklogs --backend-id=2 --since=2018-01-01
+  odoo jirabulkloadworklogs --backend-id=2 --dump=worklogs.jsonl
+
+You have to target the database to load, either in the
+configuration file, either using the ``--database`` option.
+
+"""
+
+# this is a cli tool, we want to use print statements
+# pylint: disable=print-used
+
+import argparse
+import json
+import logging
+import os
+import signal
+import sys
+from contextlib import contextmanager
+
+import odoo
+from odoo.cli import Command
+from odoo.tools import config
+
+from ..models.account_analytic_line.bulk_loader import BULK_CHUNK_SIZE
+
+_logger = logging.getLogger(__name__)
+
+
+def raise_keyboard_interrupt(*a):
+    raise KeyboardInterrupt()
+
+
+def read_dump(path):
+    """Generator of the worklogs of a dump, one JSON worklog per line"""
+    with open(path) as dump:
+        for line in dump:
+            line = line.strip()
+            if line:
+                yield json.loads(line)
+
+
+class JiraBulkLoadWorklogs(Command):
+    def init(self, args):
+        config.parse_config(args)
+        odoo.cli.server.report_configuration()
+        odoo.service.server.start(preload=[], stop=True)
+        signal.signal(signal.SIGINT, raise_keyboard_interrupt)
+
+    @contextmanager
+    def env(self, dbname):
+        with odoo.api.Environment.manage():
+            registry = odoo.registry(dbname)
+            with registry.cursor() as cr:
+                uid = odoo.SUPERUSER_ID
+                ctx_environment = odoo.api.Environment(cr, uid, {})["res.users"]
+                ctx = ctx_environment.context_get()
+                env = odoo.api.Environment(cr, uid, ctx)
+                yield env
+
+    def bulk_load(self, dbname, options):
+        with self.env(dbname) as env:
+            backend = env["jira.backend"].browse(options.backend_id)
+            if not backend.exists():
+                die("no backend with id found {}".format(options.backend_id))
+            with backend.work_on("jira.account.analytic.line") as work:
+                loader = work.component(usage="bulk.loader")
+                if options.dump:
+                    worklogs = read_dump(options.dump)
+                else:
+                    since = None
+                    if options.since:
+                        since = odoo.fields.Datetime.from_string(options.since)
+                    worklogs = loader.worklogs_since(since)
+                stats = loader.run(worklogs, chunk_size=options.chunk_size, commit=True)
+            print()
+            for key, count in sorted(stats.items()):
+                print("{}: {}".format(key, count))
+
+    def run(self, cmdargs):
+        parser = argparse.ArgumentParser(
+            prog="%s jirabulkloadworklogs" % sys.argv[0].split(os.path.sep)[-1],
+            description=self.__doc__,
+        )
+        parser.add_argument(
+            "--backend-id",
+            dest="backend_id",
+            type=int,
+            required=True,
+            help="ID of the backend of the worklogs.",
+        )
+        parser.add_argument(
+            "--dump",
+            dest="dump",
+            help="Path of a file with one JSON worklog per line. "
+            "(by default the worklogs are read from the Jira API)",
+        )
+        parser.add_argument(
+            "--since",
+            dest="since",
+            help="Read the worklogs updated since this date (UTC) "
+            "from the Jira API (by default all the worklogs)",
+        )
+        parser.add_argument(
+            "--chunk-size",
+            dest="chunk_size",
+            type=int,
+            default=BULK_CHUNK_SIZE,
+            help="Number of worklogs loaded and committed together.",
+        )
+
+        args, unknown = parser.parse_known_args(args=cmdargs)
+
+        self.init(unknown)
+        if not config["db_name"]:
+            die("need a db_name")
+        self.bulk_load(config["db_name"], args)
+        return 0
+
+
+def die(message, code=1):
+    print(message, file=sys.stderr)
+    sys.exit(code)
@@ -0,0 +1,572 @@
+"""Odoo CLI command to benchmark the Jira webhooks
+
+Replays Jira webhook requests against a running Odoo server, at a given
+rate and in bursts, to measure how many webhooks per second the workers
+absorb. The requests are either synthetic (``--issues``, ``--worklogs``,
+``--updates``), either read from a file (``--payloads``) containing one
+JSON webhook body per line, optionally wrapped as
+``{"kind": "issue"|"worklog", "body": {...}}``.
+
+With ``--stub-port``, a local stand-in of Jira answers the API reads of
+the jobs (issues and worklogs) with synthetic data: the URL of the
+backend is pointed to it during the benchmark. Only the Jira API is
+answered, the calls of other APIs (e.g. Tempo) fail.
+
+It is plugged in the Odoo CLI commands::
+
+  odoo jirawebhookbenchmark --backend-id=2 --issues=100 --worklogs=5 \\
+      --rate=50 --burst=10 --stub-port=8099
+
+It reports the latency of the requests, the jobs created and the time
+needed to drain the queue. Run it on a test database: the backend is
+modified during the benchmark (and restored afterwards), and the imported
+records stay.
+
+You have to target the database, either in the configuration file,
+either using the ``--database`` option.
+
+"""
+
+# this is a cli tool, we want to use print statements
+# pylint: disable=print-used
+
+import argparse
+import binascii
+import hashlib
+import hmac
+import json
+import logging
+import math
+import os
+import re
+import signal
+import sys
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+import odoo
+from odoo.cli import Command
+from odoo.tools import config
+
+_logger = logging.getLogger(__name__)
+
+ISSUE_EVENT = "jira:issue_updated"
+WORKLOG_EVENT = "worklog_updated"
+# first id of the synthetic issues and worklogs, far from the real ones
+SYNTHETIC_FIRST_ID = 900000000
+
+
+def raise_keyboard_interrupt(*a):
+    raise KeyboardInterrupt()
+
+
+def jira_now():
+    return datetime.utcnow().strftime("%Y-%m-%dT%H:%M:%S.000+0000")
+
+
+def read_payloads(path):
+    """Read the recorded webhook bodies, return a list of (kind, body)"""
+    payloads = []
+    with open(path) as dump:
+        for line in dump:
+            line = line.strip()
+            if not line:
+                continue
+            payload = json.loads(line)
+            if "body" in payload:
+                payloads.append((payload["kind"], payload["body"]))
+            elif "worklog" in payload:
+                payloads.append(("worklog", payload))
+            else:
+                payloads.append(("issue", payload))
+    return payloads
+
+
+def synthetic_payloads(issues, worklogs, updates, project_id, issue_type_id):
+    """Generate webhook bodies, return a list of (kind, body)
+
+    Each issue and worklog receives ``updates`` events, the events of
+    the same record are spread over the whole benchmark.
+    """
+    records = []
+    for issue_index in range(issues):
+        issue_id = str(SYNTHETIC_FIRST_ID + issue_index)
+        issue = {
+            "id": issue_id,
+            "key": "BENCH-{}".format(issue_index + 1),
+            "fields": {
+                "project": {"id": project_id},
+                "issuetype": {"id": issue_type_id},
+            },
+        }
+        records.append(("issue", {"webhookEvent": ISSUE_EVENT, "issue": issue}))
+        for worklog_index in range(worklogs):
+            worklog_id = str(
+                SYNTHETIC_FIRST_ID + issue_index * worklogs + worklog_index
+            )
+            worklog = {"id": worklog_id, "issueId": issue_id}
+            records.append(
+                (
+                    "worklog",
+                    {"webhookEvent": WORKLOG_EVENT, "worklog": worklog, "issue": issue},
+                )
+            )
+    return records * updates
+
+
+class JiraStub:
+    """Local stand-in for the Jira API read by the import jobs
+
+    Answers the issues and worklogs with synthetic data. The project,
+    issue type and worklogs of the issues are taken from the replayed
+    webhooks when they are known.
+    """
+
+    def __init__(self, port, project_id, issue_type_id, author):
+        self.port = port
+        self.project_id = project_id
+        self.issue_type_id = issue_type_id
+        self.author = author
+        self.issues = {}
+        self.worklogs = {}
+        self.calls = Counter()
+        self.server = None
+
+    def register(self, kind, body):
+        if kind == "issue":
+            issue = body["issue"]
+            self.issues.setdefault(str(issue["id"]), issue)
+        else:
+            worklog = body["worklog"]
+            issue_worklogs = self.worklogs.setdefault(str(worklog["issueId"]), {})
+            issue_worklogs[str(worklog["id"])] = worklog
+            if body.get("issue"):
+                self.issues.setdefault(str(worklog["issueId"]), body["issue"])
+
+    def issue(self, issue_id):
+        fields = (self.issues.get(issue_id) or {}).get("fields") or {}
+        project_id = (fields.get("project") or {}).get("id") or self.project_id
+        issue_type_id = (fields.get("issuetype") or {}).get("id") or self.issue_type_id
+        return {
+            "id": issue_id,
+            "key": "BENCH-{}".format(issue_id),
+            "fields": {
+                "summary": "Benchmark issue {}".format(issue_id),
+                "project": {"id": project_id, "key": "BENCH"},
+                "issuetype": {"id": issue_type_id},
+                "status": {"name": "To Do"},
+                "assignee": None,
+                "duedate": None,
+                "timeoriginalestimate": None,
+                "created": jira_now(),
+                "updated": jira_now(),
+            },
+            "renderedFields": {"description": "<p>Benchmark</p>"},
+        }
+
+    def worklog(self, issue_id, worklog_id):
+        return {
+            "id": worklog_id,
+            "issueId": issue_id,
+            "author": self.author,
+            "comment": "Benchmark worklog {}".format(worklog_id),
+            "started": jira_now(),
+            "created": jira_now(),
+            "updated": jira_now(),
+            "timeSpentSeconds": 900,
+        }
+
+    def answer(self, path):
+        """Return the JSON answer of a GET on the API, None if unknown"""
+        path = path.split("?")[0].rstrip("/")
+        if path.endswith("/serverInfo"):
+            return {"versionNumbers": [8, 0, 0], "version": "8.0.0"}
+        match = re.search(r"/issue/([^/]+)/worklog/([^/]+)$", path)
+        if match:
+            return self.worklog(*match.groups())
+        match = re.search(r"/issue/([^/]+)/worklog$", path)
+        if match:
+            issue_id = match.group(1)
+            worklogs = [
+                self.worklog(issue_id, worklog_id)
+                for worklog_id in self.worklogs.get(issue_id, {})
+            ]
+            return {
+                "startAt": 0,
+                "maxResults": len(worklogs),
+                "total": len(worklogs),
+                "worklogs": worklogs,
+            }
+        match = re.search(r"/issue/([^/]+)$", path)
+        if match:
+            return self.issue(match.group(1))
+        return None
+
+    def start(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                stub.calls[self.path.split("?")[0]] += 1
+                answer = stub.answer(self.path)
+                body = json.dumps(answer or {"errorMessages": ["Not found"]})
+                self.send_response(200 if answer is not None else 404)
+                self.send_header("Content-Type", "application/json")
+                self.end_headers()
+                self.wfile.write(body.encode())
+
+            def log_message(self, format, *args):  # pylint: disable=W0622
+                return
+
+        self.server = ThreadingHTTPServer(("localhost", self.port), Handler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def stop(self):
+        if self.server:
+            self.server.shutdown()
+
+
+def percentile(values, percent):
+    """Nearest-rank percentile of a sorted list"""
+    if not values:
+        return 0.0
+    index = max(0, math.ceil(percent / 100.0 * len(values)) - 1)
+    return values[min(index, len(values) - 1)]
+
+
+class JiraWebhookBenchmark(Command):
+    def init(self, args):
+        config.parse_config(args)
+        odoo.cli.server.report_configuration()
+        odoo.service.server.start(preload=[], stop=True)
+        signal.signal(signal.SIGINT, raise_keyboard_interrupt)
+
+    @contextmanager
+    def env(self, dbname):
+        with odoo.api.Environment.manage():
+            registry = odoo.registry(dbname)
+            with registry.cursor() as cr:
+                uid = odoo.SUPERUSER_ID
+                ctx_environment = odoo.api.Environment(cr, uid, {})["res.users"]
+                ctx = ctx_environment.context_get()
+                env = odoo.api.Environment(cr, uid, ctx)
+                yield env
+
+    def prepare_backend(self, dbname, options):
+        """Configure the backend for the benchmark
+
+        Return the values to restore afterwards and the settings of the
+        benchmark read from the backend.
+        """
+        with self.env(dbname) as env:
+            backend = env["jira.backend"].browse(options.backend_id)
+            if not backend.exists():
+                die("no backend with id found {}".format(options.backend_id))
+            restore = {
+                "use_webhooks": backend.use_webhooks,
+                "webhook_token": backend.webhook_token,
+                "uri": backend.uri,
+            }
+            values = {"use_webhooks": True}
+            if not backend.webhook_token:
+                values["webhook_token"] = binascii.hexlify(os.urandom(16)).decode()
+            if options.stub_port:
+                values["uri"] = "http://localhost:{}".format(options.stub_port)
+            backend.write(values)
+            issue_types_by_project = backend._linked_issue_types_by_project()
+            project_id = options.project_id
+            if not project_id and issue_types_by_project:
+                project_id = sorted(issue_types_by_project)[0]
+            issue_type_id = options.issue_type_id
+            if not issue_type_id and issue_types_by_project.get(project_id):
+                issue_type_id = sorted(issue_types_by_project[project_id])[0]
+            author_key = options.author_key
+            if not author_key:
+                author_key = (
+                    env["jira.res.users"]
+                    .search([("backend_id", "=", backend.id)], limit=1)
+                    .external_id
+                )
+            settings = {
+                "project_id": project_id or "10000",
+                "issue_type_id": issue_type_id or "10000",
+                "author": {
+                    "key": author_key,
+                    "name": author_key,
+                    "emailAddress": "",
+                    "timeZone": "UTC",
+                },
+                "issue_url": backend._webhook_url("issue"),
+                "worklog_url": backend._webhook_url("worklog"),
+                "verification": backend.webhook_verification,
+                "secret": backend.webhook_secret,
+            }
+            if options.odoo_url:
+                for key in ("issue_url", "worklog_url"):
+                    path = settings[key].split("/connector_jira/", 1)[1]
+                    settings[key] = "{}/connector_jira/{}".format(
+                        options.odoo_url.rstrip("/"), path
+                    )
+            env.cr.execute("SELECT COALESCE(MAX(id), 0) FROM queue_job")
+            settings["first_job_id"] = env.cr.fetchone()[0] + 1
+        return restore, settings
+
+    def restore_backend(self, dbname, options, restore):
+        with self.env(dbname) as env:
+            env["jira.backend"].browse(options.backend_id).write(restore)
+
+    def send(self, payloads, settings, options):
+        """Send the webhooks, return the list of (latency, status)"""
+        local = threading.local()
+
+        def post(kind, body):
+            session = getattr(local, "session", None)
+            if session is None:
+                session = local.session = requests.Session()
+            data = json.dumps(body).encode()
+            headers = {"Content-Type": "application/json"}
+            if settings["verification"] == "hmac" and settings["secret"]:
+                digest = hmac.new(
+                    settings["secret"].encode(), data, hashlib.sha256
+                ).hexdigest()
+                headers["X-Hub-Signature"] = "sha256=" + digest
+            url = settings["{}_url".format(kind)]
+            start = time.perf_counter()
+            try:
+                response = session.post(url, data=data, headers=headers, timeout=60)
+                status = response.status_code
+                # the errors of the json routes are in the body
+                if status == 200 and "error" in response.json():
+                    status = "odoo error"
+            except (requests.exceptions.RequestException, ValueError):
+                status = "error"
+            return time.perf_counter() - start, status
+
+        interval = options.burst / options.rate
+        started = time.perf_counter()
+        futures = []
+        with ThreadPoolExecutor(max_workers=options.concurrency) as executor:
+            for index in range(0, len(payloads), options.burst):
+                wait = started + (index // options.burst) * interval
+                wait -= time.perf_counter()
+                if wait > 0:
+                    time.sleep(wait)
+                for kind, body in payloads[index : index + options.burst]:
+                    futures.append(executor.submit(post, kind, body))
+        return [future.result() for future in futures], time.perf_counter() - started
+
+    def wait_drain(self, dbname, settings, options):
+        """Wait until the events and jobs are processed
+
+        Return the drain time (None on timeout) and the jobs created.
+        """
+        registry = odoo.registry(dbname)
+        started = time.perf_counter()
+        while True:
+            with registry.cursor() as cr:
+                cr.execute("SELECT COUNT(*) FROM jira_webhook_event")
+                events = cr.fetchone()[0]
+                cr.execute(
+                    "SELECT method_name, state, COUNT(*) FROM queue_job "
+                    "WHERE id >= %s GROUP BY method_name, state",
+                    (settings["first_job_id"],),
+                )
+                jobs = cr.fetchall()
+            waiting = sum(
+                count
+                for __, state, count in jobs
+                if state in ("wait_dependencies", "pending", "enqueued", "started")
+            )
+            elapsed = time.perf_counter() - started
+            if not events and not waiting:
+                return elapsed, jobs
+            if elapsed > options.drain_timeout:
+                return None, jobs
+            time.sleep(0.5)
+
+    def report(self, results, send_time, drain_time, jobs, stub):
+        latencies = sorted(latency for latency, __ in results)
+        statuses = Counter(status for __, status in results)
+        print()
+        print("Requests: {} in {:.2f}s".format(len(results), send_time))
+        if send_time:
+            print("Throughput: {:.1f} requests/s".format(len(results) / send_time))
+        for status, count in sorted(statuses.items(), key=str):
+            print("  status {}: {}".format(status, count))
+        print("Latency (ms):")
+        for label, percent in (("p50", 50), ("p90", 90), ("p99", 99)):
+            print("  {}: {:.1f}".format(label, percentile(latencies, percent) * 1000))
+        if latencies:
+            print("  max: {:.1f}".format(latencies[-1] * 1000))
+        print("Jobs created: {}".format(sum(count for __, __, count in jobs)))
+        by_method = Counter()
+        by_state = Counter()
+        for method, state, count in jobs:
+            by_method[method] += count
+            by_state[state] += count
+        for method, count in sorted(by_method.items()):
+            print("  {}: {}".format(method, count))
+        for state, count in sorted(by_state.items()):
+            print("  state {}: {}".format(state, count))
+        if drain_time is None:
+            print("Queue drain: not drained before the timeout")
+        else:
+            print("Queue drain: {:.2f}s after the last request".format(drain_time))
+        if stub:
+            print("Jira API reads: {}".format(sum(stub.calls.values())))
+
+    def benchmark(self, dbname, options):
+        restore, settings = self.prepare_backend(dbname, options)
+        stub = None
+        try:
+            if options.payloads:
+                payloads = read_payloads(options.payloads)
+            else:
+                payloads = synthetic_payloads(
+                    options.issues,
+                    options.worklogs,
+                    options.updates,
+                    settings["project_id"],
+                    settings["issue_type_id"],
+                )
+            if options.stub_port:
+                stub = JiraStub(
+                    options.stub_port,
+                    settings["project_id"],
+                    settings["issue_type_id"],
+                    settings["author"],
+                )
+                for kind, body in payloads:
+                    stub.register(kind, body)
+                stub.start()
+            print("Sending {} webhooks...".format(len(payloads)))
+            results, send_time = self.send(payloads, settings, options)
+            print("Waiting for the queue to drain...")
+            drain_time, jobs = self.wait_drain(dbname, settings, options)
+            self.report(results, send_time, drain_time, jobs, stub)
+        finally:
+            if stub:
+                stub.stop()
+            self.restore_backend(dbname, options, restore)
+
+    def run(self, cmdargs):
+        parser = argparse.ArgumentParser(
+            prog="%s jirawebhookbenchmark" % sys.argv[0].split(os.path.sep)[-1],
+            description=self.__doc__,
+        )
+        parser.add_argument(
+            "--backend-id",
+            dest="backend_id",
+            type=int,
+            required=True,
+            help="ID of the backend receiving the webhooks.",
+        )
+        parser.add_argument(
+            "--odoo-url",
+            dest="odoo_url",
+            help="URL of the Odoo server receiving the webhooks "
+            "(by default the base URL of the webhooks of the backend).",
+        )
+        parser.add_argument(
+            "--payloads",
+            dest="payloads",
+            help="Path of a file with one recorded webhook body per line "
+            "(by default synthetic webhooks are sent).",
+        )
+        parser.add_argument(
+            "--issues",
+            dest="issues",
+            type=int,
+            default=100,
+            help="Number of synthetic issues.",
+        )
+        parser.add_argument(
+            "--worklogs",
+            dest="worklogs",
+            type=int,
+            default=2,
+            help="Number of synthetic worklogs per issue.",
+        )
+        parser.add_argument(
+            "--updates",
+            dest="updates",
+            type=int,
+            default=1,
+            help="Number of events sent for each synthetic issue and worklog.",
+        )
+        parser.add_argument(
+            "--project-id",
+            dest="project_id",
+            help="Jira project of the synthetic issues "
+            "(by default the first project linked on the backend).",
+        )
+        parser.add_argument(
+            "--issue-type-id",
+            dest="issue_type_id",
+            help="Jira issue type of the synthetic issues "
+            "(by default the first one synchronized for the project).",
+        )
+        parser.add_argument(
+            "--author-key",
+            dest="author_key",
+            help="Jira user of the synthetic worklogs "
+            "(by default the first user linked on the backend).",
+        )
+        parser.add_argument(
+            "--rate",
+            dest="rate",
+            type=float,
+            default=10.0,
+            help="Average number of webhooks sent per second.",
+        )
+        parser.add_argument(
+            "--burst",
+            dest="burst",
+            type=int,
+            default=1,
+            help="Number of webhooks sent at once, the bursts are spaced "
+            "to keep the average rate.",
+        )
+        parser.add_argument(
+            "--concurrency",
+            dest="concurrency",
+            type=int,
+            default=10,
+            help="Maximum number of requests in flight.",
+        )
+        parser.add_argument(
+            "--stub-port",
+            dest="stub_port",
+            type=int,
+            help="Start a local stand-in of the Jira API on this port and "
+            "point the backend to it during the benchmark.",
+        )
+        parser.add_argument(
+            "--drain-timeout",
+            dest="drain_timeout",
+            type=float,
+            default=600.0,
+            help="Maximum time (in seconds) to wait for the queue to drain.",
+        )
+
+        args, unknown = parser.parse_known_args(args=cmdargs)
+        if args.rate <= 0 or args.burst <= 0 or args.concurrency <= 0:
+            die("--rate, --burst and --concurrency must be positive")
+
+        self.init(unknown)
+        if not config["db_name"]:
+            die("need a db_name")
+        self.benchmark(config["db_name"], args)
+        return 0
+
+
+def die(message, code=1):
+    print(message, file=sys.stderr)
+    sys.exit(code)
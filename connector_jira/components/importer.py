@@ -18,13 +18,15 @@ import logging
 from contextlib import closing, contextmanager
 from datetime import datetime, timedelta
 
-from psycopg2 import IntegrityError, errorcodes
+from psycopg2 import IntegrityError, errorcodes, sql
+from psycopg2.extras import execute_values
 
 import odoo
 from odoo import _, tools
 
 from odoo.addons.component.core import AbstractComponent, Component
 from odoo.addons.connector.exception import IDMissingInBackend
+from odoo.addons.queue_job.delay import chain, group
 from odoo.addons.queue_job.exception import RetryableJobError
 
 from .backend_adapter import JIRA_JQL_DATETIME_FORMAT
@@ -55,6 +57,15 @@ class JiraImporter(Component):
         super().__init__(work_context)
         self.external_id = None
         self.external_record = None
+        # level of this import in a cascade of dependencies imports
+        self.import_depth = 0
+        # when False, the dependencies are always imported directly
+        self.defer_dependencies = True
+        # when False, the deferred import is not enqueued by ``run``,
+        # the caller handles ``deferred_imports``
+        self.delay_deferred = True
+        # delayables of the dependencies imported by prerequisite jobs
+        self.deferred_imports = []
 
     def _get_external_data(self):
         """Return the raw Jira data for ``self.external_id``"""
@@ -104,6 +115,11 @@ class JiraImporter(Component):
         The component that will be used for the dependency can be injected
         with the ``component``.
 
+        The dependencies deeper than the depth configured on the backend
+        are not imported directly: a missing dependency is imported by a
+        prerequisite job added in ``deferred_imports``, and the import of
+        the record is deferred after it.
+
         :param external_id: id of the related binding to import
         :param binding_model: name of the binding model for the relation
         :type binding_model: str | unicode
@@ -122,17 +138,56 @@ class JiraImporter(Component):
         if not external_id:
             return
         binder = self.binder_for(binding_model)
-        if always or not binder.to_internal(external_id):
+        binding = binder.to_internal(external_id)
+        if always or not binding:
+            max_depth = self.backend_record.import_dependency_depth
+            if self.defer_dependencies and 0 < max_depth <= self.import_depth:
+                description = _("Import a dependency from Jira")
+                if binding:
+                    # the record can be imported with the current binding
+                    self.env[binding_model].with_delay(
+                        description=description
+                    ).import_record(self.backend_record, external_id)
+                else:
+                    self.deferred_imports.append(
+                        self.env[binding_model]
+                        .delayable(description=description)
+                        .import_record(self.backend_record, external_id)
+                    )
+                return
             if component is None:
                 component = self.component(
                     usage="record.importer", model_name=binding_model
                 )
+            component.import_depth = self.import_depth + 1
+            component.defer_dependencies = self.defer_dependencies
+            component.delay_deferred = False
             component.run(external_id, record=record, force=True)
+            if component.deferred_imports:
+                self.deferred_imports.append(component._deferred_chain())
 
     def _import_dependencies(self):
         """Import the dependencies for the record"""
         return
 
+    def _delayable_import(self, force=False):
+        """Return a delayable of the import of the current record"""
+        return self.model.delayable().import_record(
+            self.backend_record, self.external_id, force=force
+        )
+
+    def _deferred_chain(self, force=False):
+        """Chain the prerequisite jobs and the import of the record"""
+        return chain(group(*self.deferred_imports), self._delayable_import(force=force))
+
+    def _defer_import(self, force=False):
+        """Defer the import after the import of its dependencies"""
+        if self.delay_deferred:
+            self._deferred_chain(force=force).delay()
+        return _("Import deferred after the import of {} dependencies.").format(
+            len(self.deferred_imports)
+        )
+
     def _map_data(self):
         """Returns an instance of
         :py:class:`~odoo.addons.component.core.Component`
@@ -385,6 +440,9 @@ class JiraImporter(Component):
         # import the missing linked resources
         self._import_dependencies()
 
+        if self.deferred_imports:
+            return self._defer_import(force=force)
+
         self._import(binding, **kwargs)
 
     def _import(self, binding, **kwargs):
@@ -449,6 +507,112 @@ class DirectBatchImporter(AbstractComponent):
         )
 
 
+class UpsertBatchImporter(AbstractComponent):
+    """Create and update standalone bindings with set-based statements
+
+    For the models holding the Jira records without ``_inherits``
+    (see ``jira.model.binder``) whose whole list is returned by one call.
+    The records of the list are mapped in one pass, then created or
+    updated with ``INSERT ... ON CONFLICT (backend_id, external_id)``,
+    rows whose values did not change are left untouched.
+
+    The ORM ``create`` and ``write`` are bypassed, so it must only be used
+    for models without overrides of these methods needing to run.
+    """
+
+    _name = "jira.upsert.batch.importer"
+    _inherit = ["jira.batch.importer"]
+
+    _upsert_chunk_size = 1000
+
+    def run(self):
+        """Run the synchronization, upsert all JIRA records"""
+        created = updated = 0
+        for chunk in tools.split_every(
+            self._upsert_chunk_size, self._search_read(), piece_maker=list
+        ):
+            chunk_created, chunk_updated = self._upsert(chunk)
+            created += chunk_created
+            updated += chunk_updated
+        _logger.info(
+            "%s: %s records created, %s updated", self.model._name, created, updated
+        )
+        return created, updated
+
+    def _search_read(self):
+        """Return an iterable of the records data to import"""
+        raise NotImplementedError
+
+    def _upsert_values(self, record):
+        """Return the column values of a record"""
+        model = self.model
+        values = self.mapper.map_record(record).values(for_create=True)
+        values["external_id"] = tools.ustr(record["id"])
+        values["backend_id"] = self.backend_record.id
+        return {
+            name: model._fields[name].convert_to_column(
+                value, model, values, validate=False
+            )
+            for name, value in values.items()
+        }
+
+    def _upsert(self, records):
+        """Create or update the records, return (number created, updated)"""
+        assert not self.model._inherits, "only for standalone bindings"
+        rows = [self._upsert_values(record) for record in records]
+        if not rows:
+            return 0, 0
+        columns = sorted(set().union(*rows))
+        for name in columns:
+            field = self.model._fields[name]
+            assert field.store and field.column_type, "{} is not a column".format(name)
+        # compared to know if a row changed
+        compared = [
+            name for name in columns if name not in ("backend_id", "external_id")
+        ]
+        self.model.flush()
+        query = sql.SQL(
+            "INSERT INTO {table} ({columns}, sync_date, "
+            "                     create_uid, create_date, write_uid, write_date) "
+            "VALUES %s "
+            "ON CONFLICT (backend_id, external_id) DO UPDATE "
+            "SET {updates}, sync_date = EXCLUDED.sync_date, "
+            "    write_uid = EXCLUDED.write_uid, write_date = EXCLUDED.write_date "
+            "WHERE ({current}) IS DISTINCT FROM ({excluded}) "
+            "RETURNING id, (xmax = 0)"
+        ).format(
+            table=sql.Identifier(self.model._table),
+            columns=sql.SQL(", ").join(map(sql.Identifier, columns)),
+            updates=sql.SQL(", ").join(
+                sql.SQL("{0} = EXCLUDED.{0}").format(sql.Identifier(name))
+                for name in compared
+            ),
+            current=sql.SQL(", ").join(
+                sql.SQL("{}.{}").format(
+                    sql.Identifier(self.model._table), sql.Identifier(name)
+                )
+                for name in compared
+            ),
+            excluded=sql.SQL(", ").join(
+                sql.SQL("EXCLUDED.{}").format(sql.Identifier(name)) for name in compared
+            ),
+        )
+        now = datetime.now()
+        uid = self.env.uid
+        result = execute_values(
+            self.env.cr._obj,
+            query.as_string(self.env.cr._obj),
+            [
+                tuple(row.get(name) for name in columns) + (now, uid, now, uid, now)
+                for row in rows
+            ],
+            fetch=True,
+        )
+        self.model.invalidate_cache(ids=[row[0] for row in result])
+        created = sum(1 for __, inserted in result if inserted)
+        return created, len(result) - created
+
+
 class DelayedBatchImporter(AbstractComponent):
     """Delay import of the records"""
 
@@ -477,18 +641,29 @@ class TimestampBatchImporter(AbstractComponent):
     _inherit = ["base.importer", "jira.base"]
     _usage = "timestamp.batch.importer"
 
+    def __init__(self, work_context):
+        super().__init__(work_context)
+        # options of the import jobs (e.g. channel of the backfills)
+        self.job_options = {}
+
     def run(self, timestamp, force=False, **kwargs):
         """Run the synchronization using the timestamp"""
         original_timestamp_value = timestamp.last_timestamp
         if not timestamp._lock():
             self._handle_lock_failed(timestamp)
 
+        channel = timestamp._job_channel()
+        if channel:
+            self.job_options = {"channel": channel}
+
         next_timestamp_value, records = self._search(timestamp)
 
         timestamp._update_timestamp(next_timestamp_value)
 
         number = self._handle_records(records, force=force)
 
+        timestamp._finish_backfill()
+
         return _("Batch from {} UTC to {} UTC generated {} imports").format(
             original_timestamp_value, next_timestamp_value, number
         )
@@ -496,7 +671,7 @@ class TimestampBatchImporter(AbstractComponent):
     def _handle_records(self, records, force=False):
         """Handle the records to import and return the number handled"""
         for record_id in records:
-            self._import_record(record_id, force=force)
+            self._import_record(record_id, force=force, **self.job_options)
         return len(records)
 
     def _handle_lock_failed(self, timestamp):
@@ -507,8 +682,12 @@ class TimestampBatchImporter(AbstractComponent):
         )
 
     def _search(self, timestamp):
-        """Return a tuple (next timestamp value, jira record ids)"""
-        until = datetime.now()
+        """Return a tuple (next timestamp value, jira record ids)
+
+        When the timestamp has an 'until' value (backfill shards), the
+        search stops at this date.
+        """
+        until = timestamp.until_timestamp or datetime.now()
 
         parts = []
         if timestamp.last_timestamp:
@@ -518,7 +697,10 @@ class TimestampBatchImporter(AbstractComponent):
             to_date = until.strftime(JIRA_JQL_DATETIME_FORMAT)
             parts.append('updated <= "%s"' % to_date)
 
-        next_timestamp = max(until - timedelta(seconds=IMPORT_DELTA), since)
+        if timestamp.until_timestamp:
+            next_timestamp = until
+        else:
+            next_timestamp = max(until - timedelta(seconds=IMPORT_DELTA), since)
         record_ids = self.backend_adapter.search(" and ".join(parts))
         return (next_timestamp, record_ids)
 
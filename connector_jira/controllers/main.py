@@ -8,28 +8,43 @@ Receive webhooks from Jira
 Webhooks to create in Jira:
 
 1. Odoo Issues
-   URL: http://odoo:8069/connector_jira/webhooks/issue/${issue.id}
+   URL: http://odoo:8069/connector_jira/webhooks/<token>/issue
    Events: Issue{created, updated, deleted}
-   Exclude body: yes
+   Exclude body: no
 
 1. Odoo Worklogs
-   URL: http://odoo:8069/connector_jira/webhooks/worklog
+   URL: http://odoo:8069/connector_jira/webhooks/<token>/worklog
    Events: Issue{created, updated, deleted}
    Exclude body: no
 
+The token identifies the backend receiving the webhooks, so each backend
+can have its webhooks. The URLs without token, installed by former
+versions, are routed to the backend using webhooks without token if there
+is only one.
+
 
 JIRA could well send all the data in the webhook request's body,
 which would avoid Odoo to make another GET to get this data, but
 JIRA webhooks are potentially insecure as we don't know if it really
-comes from JIRA. So we don't use the data sent by the webhook and the job
-gets the data by itself (with the nice side-effect that the job is retryable).
+comes from JIRA. So by default we don't use the data sent by the webhook
+and the job gets the data by itself (with the nice side-effect that the job
+is retryable).
+
+When a verification is configured on the backend (secret token in the URL
+or HMAC signature), the data of the verified requests is imported directly.
+If the verification fails, the job gets the data by itself as usual.
+
+The webhooks do not create the jobs: they only append the event in the
+``jira.webhook.event`` buffer. A job flushes the buffer every few seconds,
+keeping only the last event of each record, so a burst of updates on the
+same issue or worklog creates a single job.
 
 """
 
 import logging
 
 import odoo
-from odoo import _, http
+from odoo import http
 from odoo.http import request
 
 from odoo.addons.web.controllers.main import ensure_db
@@ -38,43 +53,61 @@ _logger = logging.getLogger(__name__)
 
 
 class JiraWebhookController(http.Controller):
-    @http.route("/connector_jira/webhooks/issue", type="json", auth="none", csrf=False)
-    def webhook_issue(self, issue_id=None, **kw):
+    @http.route(
+        [
+            "/connector_jira/webhooks/issue",
+            "/connector_jira/webhooks/<string:token>/issue",
+        ],
+        type="json",
+        auth="none",
+        csrf=False,
+    )
+    def webhook_issue(self, issue_id=None, token=None, **kw):
         ensure_db()
         request.uid = odoo.SUPERUSER_ID
         env = request.env
-        backend = env["jira.backend"].search([("use_webhooks", "=", True)], limit=1)
+        backend = self._get_backend(token)
         if not backend:
-            _logger.warning(
-                "Received a webhook from Jira but cannot find a "
-                "Jira backend with webhooks activated"
-            )
             return
 
         action = request.jsonrequest["webhookEvent"]
 
-        worklog = request.jsonrequest["issue"]
-        issue_id = worklog["id"]
+        issue = request.jsonrequest["issue"]
+        issue_id = issue["id"]
+        if action != "jira:issue_deleted" and not self._is_relevant(
+            backend, "jira.project.task", issue_id, issue
+        ):
+            return
 
-        delayable_model = env["jira.project.task"].with_delay()
-        if action == "jira:issue_deleted":
-            delayable_model.delete_record(backend, issue_id)
-        else:
-            delayable_model.import_record(backend, issue_id)
+        payload = None
+        # Jira never sends the rendered fields in the webhooks: the
+        # description of the task is then imported in background, see
+        # ProjectTaskImporter._after_import
+        if "fields" in issue and self._verify_request(backend):
+            payload = issue
+        env["jira.webhook.event"]._add_event(
+            backend.id,
+            "jira.project.task",
+            "delete" if action == "jira:issue_deleted" else "import",
+            issue_id,
+            payload=payload,
+        )
 
     @http.route(
-        "/connector_jira/webhooks/worklog", type="json", auth="none", csrf=False
+        [
+            "/connector_jira/webhooks/worklog",
+            "/connector_jira/webhooks/<string:token>/worklog",
+        ],
+        type="json",
+        auth="none",
+        csrf=False,
     )
-    def webhook_worklog(self, **kw):
+    def webhook_worklog(self, token=None, **kw):
         ensure_db()
         request.uid = odoo.SUPERUSER_ID
         env = request.env
-        backend = env["jira.backend"].search([("use_webhooks", "=", True)], limit=1)
+        backend = self._get_backend(token)
         if not backend:
-            _logger.warning(
-                "Received a webhook from Jira but cannot find a "
-                "Jira backend with webhooks activated"
-            )
             return
 
         action = request.jsonrequest["webhookEvent"]
@@ -82,14 +115,53 @@ class JiraWebhookController(http.Controller):
         worklog = request.jsonrequest["worklog"]
         issue_id = worklog["issueId"]
         worklog_id = worklog["id"]
+        # skeleton of the issue, sent by some versions of Jira
+        issue = request.jsonrequest.get("issue")
+        if action != "worklog_deleted" and not self._is_relevant(
+            backend, "jira.account.analytic.line", worklog_id, issue, issue_id=issue_id
+        ):
+            return
 
-        if action == "worklog_deleted":
-            env["jira.account.analytic.line"].with_delay(
-                description=_(
-                    "Delete a local worklog which has " "been deleted on JIRA"
-                )
-            ).delete_record(backend, worklog_id)
-        else:
-            env["jira.account.analytic.line"].with_delay(
-                description=_("Import a worklog from JIRA")
-            ).import_record(backend, issue_id, worklog_id)
+        payload = None
+        if self._verify_request(backend):
+            payload = worklog
+        env["jira.webhook.event"]._add_event(
+            backend.id,
+            "jira.account.analytic.line",
+            "delete" if action == "worklog_deleted" else "import",
+            worklog_id,
+            issue_id=issue_id,
+            payload=payload,
+        )
+
+    def _get_backend(self, token):
+        backend_id = request.env["jira.backend"]._get_webhook_backend_id(token)
+        if not backend_id:
+            _logger.warning(
+                "Received a webhook from Jira but cannot find a "
+                "Jira backend with webhooks activated for this URL"
+            )
+        return request.env["jira.backend"].browse(backend_id)
+
+    def _is_relevant(self, backend, model_name, external_id, issue, issue_id=None):
+        """Drop the events of the projects and issue types not synchronized
+
+        The dropped events are buffered too, to be counted by the flush.
+        """
+        if backend._is_webhook_event_relevant(model_name, issue):
+            return True
+        request.env["jira.webhook.event"]._add_event(
+            backend.id, model_name, "drop", external_id, issue_id=issue_id
+        )
+        return False
+
+    def _verify_request(self, backend):
+        if backend.webhook_verification == "none":
+            return False
+        if backend._verify_webhook_request(request.httprequest):
+            return True
+        _logger.warning(
+            "Could not verify a webhook request from Jira, "
+            "its data is read again from Jira"
+        )
+        return False
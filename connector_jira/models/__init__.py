@@ -5,6 +5,7 @@ from . import jira_binding  # must be before the others
 from . import account_analytic_line
 from . import jira_backend
 from . import jira_issue_type
+from . import jira_webhook_event
 from . import project_project
 from . import project_task
 from . import res_users
@@ -1,5 +1,6 @@
 # License AGPL-3.0 or later (https://www.gnu.org/licenses/agpl.html).
 
 from . import common
+from . import bulk_loader
 from . import deleter
 from . import importer
@@ -0,0 +1,385 @@
+# Copyright 2026 Camptocamp SA
+# License AGPL-3.0 or later (https://www.gnu.org/licenses/agpl.html).
+
+import io
+import logging
+from collections import Counter
+
+from psycopg2 import sql
+from psycopg2.extras import execute_values
+
+from odoo import _, fields, tools
+
+from odoo.addons.component.core import Component
+from odoo.addons.connector.exception import IDMissingInBackend, MappingError
+
+from ...components.mapper import iso8601_to_utc_datetime
+from ...fields import MilliDatetime
+
+_logger = logging.getLogger(__name__)
+
+BULK_CHUNK_SIZE = 10000
+
+# stored on the lines from the bindings, updated in one statement
+# at the end of a load
+JIRA_REFERENCE_FIELDS = ("jira_issue_key", "jira_issue_type_id", "jira_epic_issue_key")
+
+
+def _copy_text(value):
+    """Format a column value for a COPY in text format"""
+    if value is None:
+        return r"\N"
+    if isinstance(value, bool):
+        return "t" if value else "f"
+    return (
+        str(value)
+        .replace("\\", "\\\\")
+        .replace("\t", "\\t")
+        .replace("\n", "\\n")
+        .replace("\r", "\\r")
+    )
+
+
+class AnalyticLineBulkLoader(Component):
+    """Load large volumes of worklogs using PostgreSQL COPY
+
+    Meant for initial loads and historical backfills, when going through
+    one job and one ORM ``create`` per worklog is too slow.
+
+    The worklogs are mapped with the usual mapper, then the analytic
+    lines and their bindings are copied in temporary staging tables and
+    merged in the real tables with set-based statements. Worklogs already
+    bound are left untouched: the regular imports keep them up-to-date.
+
+    The ORM ``create`` is bypassed: the stored computed fields are
+    recomputed for each chunk, the Jira references of the lines are
+    updated in one statement at the end of the load.
+    """
+
+    _name = "jira.analytic.line.bulk.loader"
+    _inherit = ["base.importer", "jira.base"]
+    _apply_on = ["jira.account.analytic.line"]
+    _usage = "bulk.loader"
+
+    def __init__(self, work_context):
+        super().__init__(work_context)
+        # jira issue id: (issue, IssueLinks), None when the issue is missing
+        self._issues = {}
+        # project id: values for the lines of the project
+        self._projects = {}
+        self._known_authors = set()
+        # model name: default values of the stored fields of the model
+        self._defaults = {}
+
+    def worklogs_since(self, since=None):
+        """Generator of the worklogs updated on Jira since a datetime"""
+        unix_since = MilliDatetime.to_timestamp(since) if since else None
+        result = self.backend_adapter.updated_since(since=unix_since)
+        worklog_ids = [worklog.worklog_id for worklog in result.updated_worklogs]
+        return self.backend_adapter.yield_read(worklog_ids)
+
+    def run(self, worklogs, chunk_size=BULK_CHUNK_SIZE, commit=False):
+        """Load the worklogs
+
+        :param worklogs: iterable of worklogs data as returned by the
+                         Jira API, read from the API or from a dump
+        :param chunk_size: number of worklogs loaded in one go
+        :param commit: commit after each chunk, for the offline tools
+        :return: a :class:`collections.Counter` with the number of
+                 loaded, existing, rejected worklogs, and of worklogs
+                 without issue or without task/project to attach to
+        """
+        stats = Counter()
+        for chunk in tools.split_every(chunk_size, worklogs, piece_maker=list):
+            self._load_chunk(chunk, stats)
+            _logger.info("Bulk load of worklogs: %s", dict(stats))
+            if commit:
+                self.env.cr.commit()  # pylint: disable=invalid-commit
+        self._update_jira_references()
+        if commit:
+            self.env.cr.commit()  # pylint: disable=invalid-commit
+        return stats
+
+    def _load_chunk(self, worklogs, stats):
+        existing = self._existing_external_ids(worklogs)
+        worklogs = [
+            worklog for worklog in worklogs if str(worklog["id"]) not in existing
+        ]
+        stats["existing"] += len(existing)
+        rows = []
+        for worklog in self.backend_adapter.complete_read(worklogs):
+            values = self._map_worklog(worklog, stats)
+            if values is not None:
+                rows.append(self._split_values(worklog, values))
+        if not rows:
+            return
+        line_ids = self._copy_and_merge(rows)
+        self._recompute_lines(line_ids, rows)
+        stats["loaded"] += len(line_ids)
+        stats["existing"] += len(rows) - len(line_ids)
+
+    def _existing_external_ids(self, worklogs):
+        self.env.cr.execute(
+            "SELECT external_id FROM jira_account_analytic_line "
+            "WHERE backend_id = %s AND external_id IN %s",
+            (
+                self.backend_record.id,
+                tuple(str(worklog["id"]) for worklog in worklogs),
+            ),
+        )
+        return {row[0] for row in self.env.cr.fetchall()}
+
+    def _issue(self, issue_id):
+        """Return the issue and where its worklogs are attached
+
+        Read once per issue for the whole load.
+        """
+        if issue_id not in self._issues:
+            importer = self.component(usage="record.importer")
+            # the worklogs are loaded right away, with their task
+            importer.defer_dependencies = False
+            issue_adapter = self.component(
+                usage="backend.adapter", model_name="jira.project.task"
+            )
+            try:
+                issue = issue_adapter.read(
+                    issue_id, fields=importer._issue_fields_to_read
+                )
+            except IDMissingInBackend:
+                self._issues[issue_id] = None
+            else:
+                links = importer.resolve_issue_links(issue_id, issue)
+                self._issues[issue_id] = (issue, links)
+        return self._issues[issue_id]
+
+    def _import_author(self, jira_author):
+        key = jira_author.get("key")
+        if not key or key in self._known_authors:
+            return
+        if not self.binder_for("jira.res.users").to_internal(key):
+            importer = self.component(
+                usage="record.importer", model_name="jira.res.users"
+            )
+            importer.run(key, record=jira_author, force=True)
+        self._known_authors.add(key)
+
+    def _map_worklog(self, worklog, stats):
+        """Return the values of the binding, None when it is not loaded"""
+        issue = self._issue(worklog["issueId"])
+        if issue is None:
+            stats["no_issue"] += 1
+            return None
+        issue, links = issue
+        if not any(links):
+            stats["no_task"] += 1
+            return None
+        self._import_author(worklog["author"])
+        external_updated_at = None
+        if worklog.get("updated"):
+            external_updated_at = iso8601_to_utc_datetime(worklog["updated"])
+        mapper = self.component(usage="import.mapper")
+        try:
+            values = mapper.map_record(worklog).values(
+                for_create=True,
+                external_updated_at=external_updated_at,
+                task_binding=links.task_binding,
+                project_binding=links.project_binding,
+                fallback_project=links.fallback_project,
+                linked_issue=issue,
+            )
+            values.update(self._project_values(values["project_id"]))
+        except MappingError as err:
+            _logger.warning("Worklog %s not loaded: %s", worklog["id"], err)
+            stats["rejected"] += 1
+            return None
+        return values
+
+    def _project_values(self, project_id):
+        """Values set by hr_timesheet when a timesheet line is created"""
+        if project_id not in self._projects:
+            project = self.env["project.project"].browse(project_id)
+            account = project.analytic_account_id
+            if not account:
+                raise MappingError(
+                    _("Project {} has no analytic account").format(project.name)
+                )
+            company = account.company_id or project.company_id
+            self._projects[project_id] = {
+                "account_id": account.id,
+                "company_id": company.id,
+                "product_uom_id": company.project_time_mode_id.id,
+            }
+        return self._projects[project_id]
+
+    def _get_defaults(self, model):
+        if model._name not in self._defaults:
+            # fields of the binding inherited from the line are excluded
+            names = [
+                name
+                for name, field in model._fields.items()
+                if field.store and field.column_type and not field.inherited
+            ]
+            self._defaults[model._name] = model.default_get(names)
+        return self._defaults[model._name]
+
+    def _split_values(self, worklog, values):
+        """Split the values between the line and its binding
+
+        Return a tuple (line values, binding values) converted for
+        the database columns.
+        """
+        line_model = self.env["account.analytic.line"]
+        line_values = dict(self._get_defaults(line_model))
+        binding_values = dict(self._get_defaults(self.model))
+        binding_values["external_id"] = str(worklog["id"])
+        for name, value in values.items():
+            field = self.model._fields[name]
+            if field.inherited:
+                line_values[name] = value
+            elif field.store and field.column_type:
+                binding_values[name] = value
+        line_values = {
+            name: line_model._fields[name].convert_to_column(
+                value, line_model, line_values, validate=False
+            )
+            for name, value in line_values.items()
+        }
+        binding_values = {
+            name: self.model._fields[name].convert_to_column(
+                value, self.model, binding_values, validate=False
+            )
+            for name, value in binding_values.items()
+        }
+        return line_values, binding_values
+
+    def _copy_to_staging(self, table, columns, rows):
+        buffer = io.StringIO()
+        for row in rows:
+            buffer.write("\t".join(_copy_text(row.get(name)) for name in columns))
+            buffer.write("\n")
+        buffer.seek(0)
+        self.env.cr.copy_expert(
+            sql.SQL("COPY {} ({}) FROM STDIN")
+            .format(
+                sql.Identifier(table),
+                sql.SQL(", ").join(map(sql.Identifier, columns)),
+            )
+            .as_string(self.env.cr._obj),
+            buffer,
+        )
+
+    def _copy_and_merge(self, rows):
+        """Copy the rows in staging tables and merge them
+
+        Return the ids of the created analytic lines.
+        """
+        cr = self.env.cr
+        cr.execute(
+            "SELECT nextval(pg_get_serial_sequence('account_analytic_line', 'id')) "
+            "FROM generate_series(1, %s)",
+            (len(rows),),
+        )
+        new_ids = [row[0] for row in cr.fetchall()]
+        now = fields.Datetime.now()
+        audit = {
+            "create_uid": self.env.uid,
+            "create_date": now,
+            "write_uid": self.env.uid,
+            "write_date": now,
+        }
+        line_rows = []
+        binding_rows = []
+        for new_id, (line_values, binding_values) in zip(new_ids, rows):
+            line_rows.append(dict(line_values, id=new_id, **audit))
+            binding_rows.append(
+                dict(binding_values, odoo_id=new_id, sync_date=now, **audit)
+            )
+        line_columns = sorted(set().union(*line_rows))
+        binding_columns = sorted(set().union(*binding_rows))
+
+        cr.execute(
+            "CREATE TEMP TABLE jira_bulk_line "
+            "(LIKE account_analytic_line) ON COMMIT DROP"
+        )
+        cr.execute(
+            "CREATE TEMP TABLE jira_bulk_binding "
+            "(LIKE jira_account_analytic_line) ON COMMIT DROP"
+        )
+        self._copy_to_staging("jira_bulk_line", line_columns, line_rows)
+        self._copy_to_staging("jira_bulk_binding", binding_columns, binding_rows)
+
+        insert = sql.SQL("INSERT INTO {table} ({columns}) SELECT {columns} FROM {tmp}")
+        cr.execute(
+            insert.format(
+                table=sql.Identifier("account_analytic_line"),
+                columns=sql.SQL(", ").join(map(sql.Identifier, line_columns)),
+                tmp=sql.Identifier("jira_bulk_line"),
+            )
+        )
+        # worklogs imported meanwhile by the jobs are kept
+        cr.execute(
+            insert.format(
+                table=sql.Identifier("jira_account_analytic_line"),
+                columns=sql.SQL(", ").join(map(sql.Identifier, binding_columns)),
+                tmp=sql.Identifier("jira_bulk_binding"),
+            )
+            + sql.SQL(" ON CONFLICT DO NOTHING RETURNING odoo_id")
+        )
+        line_ids = [row[0] for row in cr.fetchall()]
+        orphan_ids = set(new_ids) - set(line_ids)
+        if orphan_ids:
+            cr.execute(
+                "DELETE FROM account_analytic_line WHERE id IN %s",
+                (tuple(orphan_ids),),
+            )
+        cr.execute("DROP TABLE jira_bulk_line, jira_bulk_binding")
+        self.env["account.analytic.line"].invalidate_cache()
+        self.model.invalidate_cache()
+        return line_ids
+
+    def _recompute_lines(self, line_ids, rows):
+        """Compute the values the ORM would have computed on create"""
+        if not line_ids:
+            return
+        lines = self.env["account.analytic.line"].browse(line_ids)
+        loaded = set().union(*(line_values for line_values, __ in rows))
+        for name, field in lines._fields.items():
+            if (
+                field.store
+                and field.compute
+                and name not in loaded
+                and name not in JIRA_REFERENCE_FIELDS
+            ):
+                self.env.add_to_compute(field, lines)
+        lines.flush()
+        amounts = lines._timesheet_postprocess_values({"unit_amount": True})
+        execute_values(
+            self.env.cr._obj,
+            "UPDATE account_analytic_line AS line SET amount = data.amount "
+            "FROM (VALUES %s) AS data(id, amount) WHERE line.id = data.id",
+            [
+                (line_id, values["amount"])
+                for line_id, values in amounts.items()
+                if "amount" in values
+            ],
+        )
+        lines.invalidate_cache(["amount"])
+
+    def _update_jira_references(self):
+        """Copy the Jira references of the bindings on the loaded lines"""
+        self.env.cr.execute(
+            "UPDATE account_analytic_line AS line "
+            "SET jira_issue_key = binding.jira_issue_key, "
+            "    jira_issue_type_id = binding.jira_issue_type_id, "
+            "    jira_epic_issue_key = binding.jira_epic_issue_key "
+            "FROM jira_account_analytic_line AS binding "
+            "WHERE binding.odoo_id = line.id "
+            "AND binding.backend_id = %s "
+            "AND line.jira_issue_key IS NULL",
+            (self.backend_record.id,),
+        )
+        _logger.info(
+            "Bulk load of worklogs: Jira references updated on %s lines",
+            self.env.cr.rowcount,
+        )
+        self.env["account.analytic.line"].invalidate_cache(list(JIRA_REFERENCE_FIELDS))
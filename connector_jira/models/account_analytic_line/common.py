@@ -105,11 +105,22 @@ class JiraAccountAnalyticLine(models.Model):
             )
 
     @api.model
-    def import_record(self, backend, issue_id, worklog_id, force=False):
+    def import_record(self, backend, issue_id, worklog_id, force=False, record=None):
         """Import a worklog from JIRA"""
         with backend.work_on(self._name) as work:
             importer = work.component(usage="record.importer")
-            return importer.run(worklog_id, issue_id=issue_id, force=force)
+            return importer.run(
+                worklog_id, issue_id=issue_id, force=force, record=record
+            )
+
+    @api.model
+    def import_issue_worklogs(
+        self, backend, issue_id, worklog_ids, force=False, records=None
+    ):
+        """Import several worklogs of the same JIRA issue"""
+        with backend.work_on(self._name) as work:
+            importer = work.component(usage="issue.worklogs.importer")
+            return importer.run(issue_id, worklog_ids, force=force, records=records)
 
     def force_reimport(self):
         for binding in self.sudo().mapped("jira_bind_ids"):
@@ -270,6 +281,32 @@ class WorklogAdapter(Component):
         worklogs = self.client.worklogs(issue_id)
         return [worklog.id for worklog in worklogs]
 
+    def search_read(self, issue_id, worklog_ids=None):
+        """Read the worklogs of an issue in one call
+
+        :param worklog_ids: when given, only these worklogs are returned
+                            and completed with the data of other APIs
+        """
+        with self.handle_404():
+            worklogs = [worklog.raw for worklog in self.client.worklogs(issue_id)]
+        if worklog_ids is not None:
+            wanted = {str(worklog_id) for worklog_id in worklog_ids}
+            worklogs = [worklog for worklog in worklogs if worklog["id"] in wanted]
+        return self.complete_read(worklogs)
+
+    def complete_read(self, worklogs):
+        """Add the data read from other APIs to worklogs read from Jira
+
+        Extension point for the modules adding data to the worklogs,
+        meant to read the data of all the worklogs in as few calls as
+        possible. The worklogs already completed are left untouched.
+
+        :param worklogs: list of worklogs data returned by Jira, they
+                         are modified in place
+        :return: the list of worklogs
+        """
+        return worklogs
+
     @staticmethod
     def _chunks(whole, size):
         """Yield successive n-sized chunks from l."""
@@ -287,19 +324,31 @@ class WorklogAdapter(Component):
             for worklog in result:
                 yield worklog
 
-    def updated_since(self, since=None):
+    def updated_since(self, since=None, until=None):
+        """Return the worklogs updated since a unix timestamp
+
+        :param since: unix timestamp in milliseconds
+        :param until: optional unix timestamp in milliseconds, worklogs
+                      updated after it are ignored and the search stops
+                      when it is reached
+        """
         path = "worklog/updated"
 
         start_since = since
         updated_worklogs = []
+        end = until
 
         while True:
             result = self.client._get_json(path, params={"since": since})
             updated_worklogs += [
                 UpdatedWorklog(worklog_id=row["worklogId"], updated=row["updatedTime"])
                 for row in result["values"]
+                if end is None or row["updatedTime"] <= end
             ]
             until = since = result["until"]
+            if end is not None and until >= end:
+                until = end
+                break
             if result["lastPage"]:
                 break
         return UpdatedWorklogSince(
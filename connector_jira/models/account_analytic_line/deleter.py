@@ -3,7 +3,7 @@
 
 import logging
 
-from odoo import _
+from odoo import _, tools
 
 from odoo.addons.component.core import Component
 from odoo.addons.queue_job.exception import RetryableJobError
@@ -12,6 +12,8 @@ from ...fields import MilliDatetime
 
 _logger = logging.getLogger(__name__)
 
+DELETE_CHUNK_SIZE = 1000
+
 
 class AnalyticLineBatchDeleter(Component):
     """Batch Deleter working with a jira.backend.timestamp.record
@@ -20,7 +22,10 @@ class AnalyticLineBatchDeleter(Component):
     and uses the latest timestamp value as reference for the search.
 
     The role of a BatchDeleter is to search for a list of
-    items to delete and schedule jobs for the deletions.
+    items to delete and delete them. Jira returns the ids of all the
+    deleted worklogs, including the ones never imported in Odoo, so
+    the ids are first matched against the existing bindings, and the
+    matching lines are deleted in chunks in the current job.
     """
 
     _name = "jira.analytic.line.timestamp.batch.deleter"
@@ -37,17 +42,48 @@ class AnalyticLineBatchDeleter(Component):
 
         timestamp._update_timestamp(next_timestamp_value)
 
-        number = self._handle_records(records)
+        matched, ignored = self._handle_records(records)
 
-        return _("Batch from {} UTC to {} UTC " "generated {} delete jobs").format(
-            original_timestamp_value, next_timestamp_value, number
-        )
+        return _(
+            "Batch from {} UTC to {} UTC deleted {} worklogs, "
+            "ignored {} worklogs not imported"
+        ).format(original_timestamp_value, next_timestamp_value, matched, ignored)
 
     def _handle_records(self, records):
-        """Handle the records to import and return the number handled"""
-        for record_id in records:
-            self._delete_record(record_id)
-        return len(records)
+        """Delete the lines bound to the deleted worklogs
+
+        Return a tuple (number of matched ids, number of ignored ids)
+        """
+        binding_ids = self._search_binding_ids(records)
+        for chunk in tools.split_every(DELETE_CHUNK_SIZE, binding_ids):
+            self._delete_bindings(self.model.browse(chunk))
+        matched = len(binding_ids)
+        ignored = len(set(records)) - matched
+        _logger.info(
+            "Deleted worklogs from Jira: %s matched, %s ignored", matched, ignored
+        )
+        return matched, ignored
+
+    def _search_binding_ids(self, worklog_ids):
+        """Return the ids of the bindings matching the Jira worklog ids"""
+        if not worklog_ids:
+            return []
+        self.env.cr.execute(
+            "SELECT id FROM jira_account_analytic_line "
+            "WHERE backend_id = %s AND external_id IN %s",
+            (
+                self.backend_record.id,
+                tuple({str(worklog_id) for worklog_id in worklog_ids}),
+            ),
+        )
+        return [row[0] for row in self.env.cr.fetchall()]
+
+    def _delete_bindings(self, bindings):
+        """Delete the bindings and their analytic lines"""
+        bindings = bindings.with_context(active_test=False)
+        lines = bindings.mapped("odoo_id")
+        bindings.unlink()
+        lines.unlink()
 
     def _handle_lock_failed(self, timestamp):
         _logger.warning("Failed to acquire timestamps %s", timestamp, exc_info=True)
@@ -62,15 +98,3 @@ class AnalyticLineBatchDeleter(Component):
         worklog_ids = result.deleted_worklog_ids
         next_timestamp = MilliDatetime.from_timestamp(result.until)
         return (next_timestamp, worklog_ids)
-
-    def _delete_record(self, record_id, **kwargs):
-        """Delay the delete of the records"""
-        self.model.with_delay(
-            description=_("Delete a local worklog which has " "been deleted on JIRA"),
-            **kwargs
-        ).delete_record(
-            self.backend_record,
-            record_id,
-            only_binding=False,
-            set_inactive=False,
-        )
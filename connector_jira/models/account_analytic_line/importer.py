@@ -3,14 +3,17 @@
 # License AGPL-3.0 or later (https://www.gnu.org/licenses/agpl.html).
 
 import logging
+from collections import defaultdict, namedtuple
 
 from pytz import timezone, utc
 
-from odoo import _
+from odoo import _, exceptions
 
 from odoo.addons.component.core import Component
 from odoo.addons.connector.components.mapper import mapping
-from odoo.addons.connector.exception import MappingError
+from odoo.addons.connector.exception import IDMissingInBackend, MappingError
+from odoo.addons.queue_job.delay import chain, group
+from odoo.addons.queue_job.exception import RetryableJobError
 
 from ...components.mapper import (
     iso8601_to_naive_date,
@@ -21,6 +24,14 @@ from ...fields import MilliDatetime
 
 _logger = logging.getLogger(__name__)
 
+try:
+    from jira import JIRAError
+except ImportError as err:
+    _logger.debug(err)
+
+# where the worklogs of an issue are attached in Odoo
+IssueLinks = namedtuple("IssueLinks", "task_binding project_binding fallback_project")
+
 
 class AnalyticLineMapper(Component):
     _name = "jira.analytic.line.mapper"
@@ -135,6 +146,8 @@ class AnalyticLineBatchImporter(Component):
     """Import the Jira worklogs
 
     For every id in in the list, a delayed job is created.
+    When several worklogs of the same issue have been updated,
+    a single job imports all of them.
     Import from a date
     """
 
@@ -144,23 +157,35 @@ class AnalyticLineBatchImporter(Component):
 
     def _search(self, timestamp):
         unix_timestamp = MilliDatetime.to_timestamp(timestamp.last_timestamp)
-        result = self.backend_adapter.updated_since(since=unix_timestamp)
+        unix_until = None
+        if timestamp.until_timestamp:
+            unix_until = MilliDatetime.to_timestamp(timestamp.until_timestamp)
+        result = self.backend_adapter.updated_since(
+            since=unix_timestamp, until=unix_until
+        )
         worklog_ids = self._filter_update(result.updated_worklogs)
         # We need issue_id + worklog_id for the worklog importer (the jira
         # "read" method for worklogs asks both), get it from yield_read.
-        # TODO we might consider to optimize the import process here:
-        # yield_read reads worklogs data, then the individual
-        # import will do a request again (and 2 with the tempo module)
+        # Only the ids are given to the jobs, which read the worklogs
+        # of an issue again in one call, so a retried job is up-to-date.
         next_timestamp = MilliDatetime.from_timestamp(result.until)
         return (next_timestamp, self.backend_adapter.yield_read(worklog_ids))
 
     def _handle_records(self, records, force=False):
         count = 0
+        worklog_ids_by_issue = defaultdict(list)
         for worklog in records:
             count += 1
-            worklog_id = worklog["id"]
-            issue_id = worklog["issueId"]
-            self._import_record(issue_id, worklog_id, force=force)
+            worklog_ids_by_issue[worklog["issueId"]].append(worklog["id"])
+        for issue_id, worklog_ids in worklog_ids_by_issue.items():
+            if len(worklog_ids) == 1:
+                self._import_record(
+                    issue_id, worklog_ids[0], force=force, **self.job_options
+                )
+            else:
+                self._import_issue_worklogs(
+                    issue_id, worklog_ids, force=force, **self.job_options
+                )
         return count
 
     def _filter_update(self, updated_worklogs):
@@ -205,6 +230,110 @@ class AnalyticLineBatchImporter(Component):
             force=force,
         )
 
+    def _import_issue_worklogs(self, issue_id, worklog_ids, force=False, **kwargs):
+        """Delay the import of the worklogs of an issue"""
+        self.model.with_delay(**kwargs).import_issue_worklogs(
+            self.backend_record,
+            issue_id,
+            worklog_ids,
+            force=force,
+        )
+
+
+class AnalyticLineIssueImporter(Component):
+    """Import several worklogs of the same Jira issue
+
+    The issue and all its worklogs are read in one call each, and the
+    task or project where the worklogs are attached is resolved only
+    once for all the worklogs.
+    """
+
+    _name = "jira.analytic.line.issue.importer"
+    _inherit = ["base.importer", "jira.base"]
+    _apply_on = ["jira.account.analytic.line"]
+    _usage = "issue.worklogs.importer"
+
+    def _read_issue_worklogs(self, issue_id, worklog_ids, records=None):
+        """Return a tuple (issue data, {worklog id: worklog data})
+
+        The worklogs are read from Jira unless their data are given
+        in ``records``, only the requested worklogs are completed with
+        the data of other APIs.
+        """
+        issue_adapter = self.component(
+            usage="backend.adapter", model_name="jira.project.task"
+        )
+        try:
+            issue = issue_adapter.read(issue_id)
+            if records is None:
+                records = self.backend_adapter.search_read(
+                    issue_id, worklog_ids=worklog_ids
+                )
+        except IDMissingInBackend:
+            # the individual imports will handle the missing records
+            return None, {}
+        return issue, {str(worklog["id"]): worklog for worklog in records}
+
+    def run(self, issue_id, worklog_ids, force=False, records=None):
+        """Run the import of the worklogs of the issue
+
+        :param records: optional data of the worklogs, when they have
+                        already been read
+        """
+        issue, worklogs = self._read_issue_worklogs(
+            issue_id, worklog_ids, records=records
+        )
+        issue_links = None
+        for index, worklog_id in enumerate(worklog_ids):
+            # a worklog missing from the issue's list is read again by
+            # the record importer which handles deleted worklogs
+            record = worklogs.get(str(worklog_id))
+            importer = self.component(usage="record.importer")
+            importer.delay_deferred = False
+            try:
+                with self.env.cr.savepoint():
+                    importer.run(
+                        worklog_id,
+                        issue_id=issue_id,
+                        force=force,
+                        record=record,
+                        issue=issue if record else None,
+                        issue_links=issue_links,
+                    )
+            except RetryableJobError:
+                raise
+            except (MappingError, JIRAError, exceptions.UserError):
+                # do not block the other worklogs of the issue, the
+                # failing one gets its own job to report the error
+                _logger.warning(
+                    "Failed to import worklog %s", worklog_id, exc_info=True
+                )
+                self.model.with_delay().import_record(
+                    self.backend_record, issue_id, worklog_id, force=force
+                )
+                continue
+            if importer.deferred_imports:
+                # the dependencies of the issue are the same for all the
+                # worklogs, the remaining ones are imported after them
+                return self._defer_worklogs(
+                    issue_id, worklog_ids[index:], importer.deferred_imports, force
+                )
+            if issue_links is None:
+                issue_links = importer.issue_links
+        return _("Imported {} worklogs of issue {}").format(len(worklog_ids), issue_id)
+
+    def _defer_worklogs(self, issue_id, worklog_ids, deferred_imports, force=False):
+        chain(
+            group(*deferred_imports),
+            self.model.delayable().import_issue_worklogs(
+                self.backend_record, issue_id, worklog_ids, force=force
+            ),
+        ).delay()
+        return _(
+            "Import of {} worklogs of issue {} deferred after the import "
+            "of their dependencies."
+        ).format(len(worklog_ids), issue_id)
+
 
 class AnalyticLineImporter(Component):
     _name = "jira.analytic.line.importer"
@@ -214,10 +343,17 @@ class AnalyticLineImporter(Component):
     def __init__(self, work_context):
         super().__init__(work_context)
         self.external_issue_id = None
+        self.external_issue = None
+        self.issue_links = None
         self.task_binding = None
         self.project_binding = None
         self.fallback_project = None
 
+    def _delayable_import(self, force=False):
+        return self.model.delayable().import_record(
+            self.backend_record, self.external_issue_id, self.external_id, force=force
+        )
+
     def _get_external_updated_at(self):
         assert self.external_record
         external_updated_at = self.external_record.get("updated")
@@ -246,7 +382,7 @@ class AnalyticLineImporter(Component):
         )
         issue_binder = self.binder_for("jira.project.task")
         issue_type_binder = self.binder_for("jira.issue.type")
-        jira_issue_id = self.external_record["issueId"]
+        jira_issue_id = self.external_issue_id
         epic_field_name = self.backend_record.epic_link_field_name
         project_matcher = self.component(usage="jira.task.project.matcher")
         current_project_id = self.external_issue["fields"]["project"]["id"]
@@ -305,8 +441,17 @@ class AnalyticLineImporter(Component):
         )
 
     def run(self, external_id, force=False, record=None, **kwargs):
+        """Run the import of a worklog
+
+        When the data of the issue (``issue``) or the place where to
+        attach the worklog (``issue_links``) are already known, for
+        instance because several worklogs of the issue are imported
+        together, they can be passed to avoid reading them again.
+        """
         assert "issue_id" in kwargs
         self.external_issue_id = kwargs.pop("issue_id")
+        self.external_issue = kwargs.pop("issue", None)
+        self.issue_links = kwargs.pop("issue_links", None)
         return super().run(external_id, force=force, record=record, **kwargs)
 
     def _handle_record_missing_on_jira(self):
@@ -322,30 +467,52 @@ class AnalyticLineImporter(Component):
             record.unlink()
         return _("Record does no longer exist in Jira")
 
-    def _get_external_data(self):
-        """Return the raw Jira data for ``self.external_id``"""
+    def _read_external_issue(self):
         issue_adapter = self.component(
             usage="backend.adapter", model_name="jira.project.task"
         )
-        self.external_issue = issue_adapter.read(self.external_issue_id)
+        return issue_adapter.read(self.external_issue_id)
+
+    def _get_external_data(self):
+        """Return the raw Jira data for ``self.external_id``"""
+        if self.external_issue is None:
+            self.external_issue = self._read_external_issue()
         return self.backend_adapter.read(self.external_issue_id, self.external_id)
 
-    def _before_import(self):
+    def _resolve_issue_links(self):
+        """Return the task or project where the worklogs of the issue go"""
         task_binding = self._recurse_import_task()
         if task_binding and task_binding.active:
-            self.task_binding = task_binding
-        if not self.task_binding:
-            # when no task exists in Odoo (because we don't synchronize
-            # the issue type for instance), we link the line directly
-            # to the corresponding project, not linked to any task
-            issue = self.external_issue
-            assert issue
-            matcher = self.component(usage="jira.task.project.matcher")
-            project_binding = matcher.find_project_binding(issue)
-            if project_binding and project_binding.active:
-                self.project_binding = project_binding
-            else:
-                self.fallback_project = matcher.fallback_project_for_worklogs()
+            return IssueLinks(task_binding, None, None)
+        # when no task exists in Odoo (because we don't synchronize
+        # the issue type for instance), we link the line directly
+        # to the corresponding project, not linked to any task
+        issue = self.external_issue
+        assert issue
+        matcher = self.component(usage="jira.task.project.matcher")
+        project_binding = matcher.find_project_binding(issue)
+        if project_binding and project_binding.active:
+            return IssueLinks(None, project_binding, None)
+        return IssueLinks(None, None, matcher.fallback_project_for_worklogs())
+
+    def resolve_issue_links(self, issue_id, issue):
+        """Return where the worklogs of an issue are attached in Odoo
+
+        Used when worklogs are imported without this importer, for
+        instance by the bulk loader.
+        """
+        self.external_issue_id = issue_id
+        self.external_issue = issue
+        return self._resolve_issue_links()
+
+    def _before_import(self):
+        if self.external_issue is None:
+            self.external_issue = self._read_external_issue()
+        if self.issue_links is None:
+            self.issue_links = self._resolve_issue_links()
+        self.task_binding = self.issue_links.task_binding
+        self.project_binding = self.issue_links.project_binding
+        self.fallback_project = self.issue_links.fallback_project
 
     def _import(self, binding, **kwargs):
         if not (self.task_binding or self.project_binding or self.fallback_project):
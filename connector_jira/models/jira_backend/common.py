@@ -4,9 +4,12 @@
 # License AGPL-3.0 or later (https://www.gnu.org/licenses/agpl.html).
 
 import binascii
+import hashlib
+import hmac
 import json
 import logging
 import urllib.parse
+from collections import defaultdict
 from contextlib import closing, contextmanager
 from datetime import datetime
 from os import urandom
@@ -19,12 +22,24 @@ import odoo
 from odoo import _, api, exceptions, fields, models, tools
 
 from odoo.addons.component.core import Component
+from odoo.addons.queue_job.job import identity_exact
 
 from ...fields import MilliDatetime
 
 _logger = logging.getLogger(__name__)
 
 JIRA_TIMEOUT = 30  # seconds
+BACKFILL_CHANNEL = "root.connector_jira.backfill"
+
+# fields of the backend used to route and filter the webhooks
+WEBHOOK_ROUTING_FIELDS = {
+    "use_webhooks",
+    "webhook_token",
+    "worklog_fallback_project_id",
+}
+# JQL of the issues webhook when no project is linked: an empty JQL
+# would send the events of all the issues
+WEBHOOK_NO_ISSUE_JQL = "project = -1"
 
 try:
     from jira import JIRA, JIRAError
@@ -134,6 +149,33 @@ class JiraBackend(models.Model):
     )
 
     verify_ssl = fields.Boolean(default=True, string="Verify SSL?")
+    import_dependency_depth = fields.Integer(
+        string="Dependencies Import Depth",
+        default=3,
+        help="Number of levels of missing dependencies (parent task, "
+        "epic, ...) imported in the same transaction as the record. "
+        "Deeper dependencies are imported by prerequisite jobs and the "
+        "import of the record is done once they are done. "
+        "0 means no limit.",
+    )
+    task_description_mode = fields.Selection(
+        selection=[
+            ("import", "Imported with the tasks"),
+            ("lazy", "Imported in background"),
+        ],
+        string="Tasks Description",
+        default="import",
+        required=True,
+        help="When imported in background, the tasks are read from Jira "
+        "without the HTML rendering of their fields, and the description "
+        "is imported by a low priority job, only when it has changed.",
+    )
+    task_incremental_update = fields.Boolean(
+        string="Incremental Task Updates",
+        help="When a task already imported is updated, the changelog of "
+        "the issue is read and only the fields changed since the last "
+        "import are updated.",
+    )
 
     project_template = fields.Selection(
         selection="_selection_project_template",
@@ -148,8 +190,7 @@ class JiraBackend(models.Model):
     use_webhooks = fields.Boolean(
         readonly=True,
         help="Webhooks need to be configured on the Jira instance. "
-        "When activated, synchronization from Jira is blazing fast. "
-        "It can be activated only on one Jira backend at a time. ",
+        "When activated, synchronization from Jira is blazing fast. ",
     )
 
     import_project_task_from_date = fields.Datetime(
@@ -165,6 +206,18 @@ class JiraBackend(models.Model):
         string="Import Worklogs from date",
     )
     import_analytic_line_force = fields.Boolean()
+    backfill_analytic_line_shards = fields.Integer(
+        string="Worklogs Backfill Shards",
+        default=4,
+        help="Number of time ranges imported in parallel by the worklogs "
+        "backfill. The jobs run on the channel "
+        "'root.connector_jira.backfill', its capacity limits how many "
+        "shards are processed at the same time.",
+    )
+    backfill_analytic_line_running = fields.Boolean(
+        compute="_compute_backfill_analytic_line_running",
+        string="Worklogs Backfill Running",
+    )
 
     delete_analytic_line_from_date = fields.Datetime(
         compute="_compute_last_import_date",
@@ -200,9 +253,53 @@ class JiraBackend(models.Model):
     )
     webhook_issue_jira_id = fields.Char()
     webhook_worklog_jira_id = fields.Char()
+    webhook_verification = fields.Selection(
+        selection=[
+            ("none", "None"),
+            ("token", "Secret Token in URL"),
+            ("hmac", "HMAC Signature"),
+        ],
+        default="none",
+        required=True,
+        help="When the webhook requests are verified, the data they "
+        "contain is imported directly, without reading it again from "
+        "Jira. A secret token in the URL works with any Jira instance, "
+        "the HMAC signature (header 'X-Hub-Signature') needs a Jira "
+        "version that signs the webhooks. Applied when the webhooks "
+        "are installed.",
+    )
+    webhook_secret = fields.Char(
+        copy=False,
+        readonly=True,
+        groups="connector.group_connector_manager",
+    )
+    webhook_jql = fields.Char(
+        string="Webhook JQL",
+        readonly=True,
+        help="Filter of the issues webhook, updated automatically with "
+        "the linked projects and their issue types. When empty, the "
+        "events of all the issues are received.",
+    )
+    webhook_dropped_count = fields.Integer(
+        string="Dropped Webhook Events",
+        readonly=True,
+        help="Number of events received by the webhooks and dropped "
+        "because they concern projects or issue types not synchronized.",
+    )
+    webhook_token = fields.Char(
+        copy=False,
+        readonly=True,
+        index=True,
+        groups="connector.group_connector_manager",
+    )
     # TODO: use something better to show this info
     # For instance, we could use web_notify to simply show a system msg.
     report_user_sync = fields.Html(readonly=True)
+    user_directory_date = fields.Datetime(
+        string="Jira Users Snapshot Date",
+        readonly=True,
+        help="Date of the snapshot of the Jira users used to link " "the Odoo users.",
+    )
 
     @api.model
     def _default_odoo_webhook_base_url(self):
@@ -256,6 +353,22 @@ class JiraBackend(models.Model):
                     }
                 )
 
+    def _compute_backfill_analytic_line_running(self):
+        ts_model = self.env["jira.backend.timestamp"]
+        for backend in self:
+            backend.backfill_analytic_line_running = bool(
+                ts_model.search_count(
+                    [
+                        ("backend_id", "=", backend.id),
+                        (
+                            "parent_id.from_date_field",
+                            "=",
+                            "import_analytic_line_from_date",
+                        ),
+                    ]
+                )
+            )
+
     def _inverse_date_fields(self, field_name, component_usage):
         for rec in self:
             ts_model = self.env["jira.backend.timestamp"]
@@ -315,19 +428,84 @@ class JiraBackend(models.Model):
             self, timestamp, force=force
         )
 
-    @api.constrains("use_webhooks")
-    def _check_use_webhooks_unique(self):
-        if len(self.search([("use_webhooks", "=", True)])) > 1:
-            raise exceptions.ValidationError(
-                _("Only one backend can listen to webhooks")
+    def _run_background_backfill_from_date(
+        self, model, from_date_field, component_usage, shards, force=False
+    ):
+        """Import records from a date using several jobs in parallel
+
+        The range between the sync timestamp and now is split in
+        ``shards`` ranges, each of them having its own timestamp,
+        imported by jobs running concurrently on the backfill channel.
+        The regular timestamp is moved at the end of the range at once,
+        so the regular synchronization goes on during the backfill.
+        """
+        self.ensure_one()
+        ts_model = self.env["jira.backend.timestamp"]
+        timestamp = ts_model._timestamp_for_field(
+            self,
+            from_date_field,
+            component_usage,
+        )
+        if not timestamp._lock():
+            raise exceptions.UserError(
+                _(
+                    "The synchronization timestamp is currently locked, "
+                    "probably due to an ongoing synchronization."
+                )
             )
+        if timestamp.shard_ids:
+            raise exceptions.UserError(_("A backfill is already running."))
+        until = datetime.now()
+        timestamp._create_shards(until, shards)
+        timestamp._update_timestamp(until)
+        self._run_background_backfill_shards(model, timestamp, force=force)
+
+    def _run_background_backfill_shards(self, model, timestamp, force=False):
+        """Create the jobs of the shards of a backfill not done yet
+
+        Called again by the scheduler: the shards whose job failed are
+        retried, the jobs still pending are not duplicated.
+        """
+        self.ensure_one()
+        for shard in timestamp.shard_ids:
+            self.env[model].with_delay(
+                channel=BACKFILL_CHANNEL, priority=9, identity_key=identity_exact
+            ).run_batch_timestamp(self, shard, force=force)
 
     @api.model
     def create(self, values):
         record = super().create(values)
         record.create_rsa_key_vals()
+        self.clear_caches()
         return record
 
+    def write(self, values):
+        result = super().write(values)
+        if WEBHOOK_ROUTING_FIELDS.intersection(values):
+            self.clear_caches()
+        return result
+
+    def unlink(self):
+        result = super().unlink()
+        self.clear_caches()
+        return result
+
+    @api.model
+    @tools.ormcache("token")
+    def _get_webhook_backend_id(self, token):
+        """Return the id of the backend receiving the webhooks of a token
+
+        The webhooks installed before the tokens were introduced have no
+        token, they are routed to the backend using such webhooks if
+        there is only one. The cache is cleared by the writes on the
+        ``WEBHOOK_ROUTING_FIELDS``.
+        """
+        domain = [("use_webhooks", "=", True), ("webhook_token", "=", token or False)]
+        backends = self.sudo().with_context(active_test=False).search(domain)
+        if len(backends) != 1:
+            return None
+        return backends.id
+
     def create_rsa_key_vals(self):
         """Create public/private RSA keypair"""
         for backend in self:
@@ -374,19 +552,6 @@ class JiraBackend(models.Model):
 
     def create_webhooks(self):
         self.ensure_one()
-        other_using_webhook = self.search(
-            [("use_webhooks", "=", True), ("id", "!=", self.id)]
-        )
-        if other_using_webhook:
-            raise exceptions.UserError(
-                _(
-                    "Only one JIRA backend can use the webhook at a time. "
-                    'You must disable them on the backend "%s" before '
-                    "activating them here."
-                )
-                % (other_using_webhook.name,)
-            )
-
         # open a new cursor because we'll commit after the creations
         # to be sure to keep the webhook ids
         with new_env(self.env) as env:
@@ -397,40 +562,219 @@ class JiraBackend(models.Model):
 
             with self.work_on("jira.backend") as work:
                 backend.use_webhooks = True
+                secret = None
+                if backend.webhook_verification != "none":
+                    secret = binascii.hexlify(urandom(32)).decode()
+                backend.sudo().write(
+                    {
+                        "webhook_secret": secret,
+                        # identifies the backend in the URL of the webhooks
+                        "webhook_token": binascii.hexlify(urandom(16)).decode(),
+                    }
+                )
 
                 adapter = work.component(usage="backend.adapter")
-                # TODO: we could update the JQL of the webhook
-                # each time a new project is sync'ed, so we would
-                # filter out the useless events
-                url = urllib.parse.urljoin(base_url, "/connector_jira/webhooks/issue")
+                # the JQL is updated when the linked projects change,
+                # so the events of the other projects are filtered out
+                jql = backend._webhook_issue_jql()
+                url = backend._webhook_url("issue")
                 webhook = adapter.create_webhook(
                     name="Odoo Issues",
                     url=url,
+                    jql=jql,
                     events=[
                         "jira:issue_created",
                         "jira:issue_updated",
                         "jira:issue_deleted",
                     ],
+                    secret=secret if backend.webhook_verification == "hmac" else None,
                 )
                 # the only place where to find the hook id is in
                 # the 'self' url, looks like
                 # u'http://jira:8080/rest/webhooks/1.0/webhook/5'
                 webhook_id = webhook["self"].split("/")[-1]
-                backend.webhook_issue_jira_id = webhook_id
+                backend.write({"webhook_issue_jira_id": webhook_id, "webhook_jql": jql})
                 if not tools.config["test_enable"]:
                     env.cr.commit()  # pylint: disable=invalid-commit
 
-                url = urllib.parse.urljoin(base_url, "/connector_jira/webhooks/worklog")
+                url = backend._webhook_url("worklog")
                 webhook = adapter.create_webhook(
                     name="Odoo Worklogs",
                     url=url,
                     events=["worklog_created", "worklog_updated", "worklog_deleted"],
+                    secret=secret if backend.webhook_verification == "hmac" else None,
                 )
                 webhook_id = webhook["self"].split("/")[-1]
                 backend.webhook_worklog_jira_id = webhook_id
                 if not tools.config["test_enable"]:
                     env.cr.commit()  # pylint: disable=invalid-commit
 
+    def _linked_issue_types_by_project(self):
+        """Return the synchronized issue types of the linked projects
+
+        As a dict ``{jira project id: set of jira issue type ids}``.
+        """
+        self.ensure_one()
+        bindings = (
+            self.env["jira.project.project"]
+            .sudo()
+            .with_context(active_test=False)
+            .search([("backend_id", "=", self.id), ("external_id", "!=", False)])
+        )
+        issue_types_by_project = defaultdict(set)
+        for binding in bindings:
+            issue_types_by_project[binding.external_id].update(
+                binding.sync_issue_type_ids.mapped("external_id")
+            )
+        return issue_types_by_project
+
+    def _webhook_issue_jql(self):
+        """Return the JQL filtering the events of the issues webhook
+
+        Only the issues of the linked projects, of the issue types
+        synchronized for them, are sent by Jira. Without any, the JQL
+        matches no issue.
+        """
+        self.ensure_one()
+        issue_types_by_project = self._linked_issue_types_by_project()
+        # group the projects synchronizing the same issue types
+        projects_by_issue_types = defaultdict(list)
+        for project_id, issue_type_ids in issue_types_by_project.items():
+            if issue_type_ids:
+                projects_by_issue_types[tuple(sorted(issue_type_ids))].append(
+                    project_id
+                )
+        clauses = sorted(
+            "(project in ({}) AND issuetype in ({}))".format(
+                ", ".join(sorted(project_ids)), ", ".join(issue_type_ids)
+            )
+            for issue_type_ids, project_ids in projects_by_issue_types.items()
+        )
+        return " OR ".join(clauses) or WEBHOOK_NO_ISSUE_JQL
+
+    @api.model
+    @tools.ormcache("backend_id")
+    def _get_webhook_filter(self, backend_id):
+        """Return what the webhooks of a backend can import
+
+        Return a tuple ``(issue types by project, all worklogs)``:
+        ``{jira project id: frozenset of jira issue type ids}`` for
+        the linked projects, and True when the worklogs of any project
+        are imported (in the fallback project). The result is shared,
+        it must not be modified.
+        """
+        backend = self.sudo().browse(backend_id)
+        issue_types_by_project = {
+            project_id: frozenset(issue_type_ids)
+            for project_id, issue_type_ids in (
+                backend._linked_issue_types_by_project().items()
+            )
+        }
+        return issue_types_by_project, bool(backend.worklog_fallback_project_id)
+
+    def _is_webhook_event_relevant(self, model_name, issue):
+        """Return False if the event of a webhook would import nothing
+
+        :param model_name: "jira.project.task" or
+                           "jira.account.analytic.line"
+        :param issue: skeleton of the issue sent in the webhook, if any
+        """
+        self.ensure_one()
+        fields_ = (issue or {}).get("fields") or {}
+        project_id = (fields_.get("project") or {}).get("id")
+        if not project_id:
+            # nothing to check without the issue
+            return True
+        issue_types_by_project, all_worklogs = self._get_webhook_filter(self.id)
+        if model_name == "jira.account.analytic.line":
+            # the worklogs of the issues types not synchronized are
+            # attached to their parent, only the project matters
+            return all_worklogs or str(project_id) in issue_types_by_project
+        issue_type_id = (fields_.get("issuetype") or {}).get("id")
+        issue_type_ids = issue_types_by_project.get(str(project_id), ())
+        return not issue_type_id or str(issue_type_id) in issue_type_ids
+
+    def _add_webhook_dropped_count(self, count):
+        """Add events of the webhooks dropped as irrelevant to the count
+
+        Called by the flush of the webhook events, with the events
+        dropped since the previous flush, the webhooks never lock the
+        row of the backend.
+        """
+        # not a write: no invalidation of the caches
+        self.env.cr.execute(
+            "UPDATE jira_backend "
+            "SET webhook_dropped_count = COALESCE(webhook_dropped_count, 0) + %s "
+            "WHERE id = %s",
+            (count, self.id),
+        )
+        self.invalidate_cache(["webhook_dropped_count"], self.ids)
+
+    def _delay_update_webhook_jql(self):
+        """Update the JQL of the webhooks after a change of the projects"""
+        for backend in self.sudo():
+            if not (backend.use_webhooks and backend.webhook_issue_jira_id):
+                continue
+            backend.with_delay(
+                identity_key=identity_exact,
+                description=_("Update the JQL of the Jira webhook"),
+            )._update_webhook_jql()
+
+    def _update_webhook_jql(self):
+        """Update the JQL of the issues webhook with the linked projects"""
+        self.ensure_one()
+        if not (self.use_webhooks and self.webhook_issue_jira_id):
+            return _("Webhooks are not installed")
+        jql = self._webhook_issue_jql()
+        if jql == (self.webhook_jql or ""):
+            return _("JQL of the webhook unchanged")
+        with self.work_on("jira.backend") as work:
+            adapter = work.component(usage="backend.adapter")
+            secret = None
+            if self.webhook_verification == "hmac":
+                secret = self.sudo().webhook_secret
+            adapter.update_webhook(self.webhook_issue_jira_id, jql=jql, secret=secret)
+        self.webhook_jql = jql
+        return _("JQL of the webhook updated: {}").format(jql)
+
+    def _webhook_url(self, kind):
+        """Return the URL of a webhook, with the secret token if needed
+
+        :param kind: "issue" or "worklog"
+        """
+        self.ensure_one()
+        path = "/connector_jira/webhooks/{}/{}".format(self.sudo().webhook_token, kind)
+        url = urllib.parse.urljoin(self.odoo_webhook_base_url, path)
+        if self.webhook_verification == "token":
+            url = "{}?{}".format(
+                url, urllib.parse.urlencode({"token": self.sudo().webhook_secret})
+            )
+        return url
+
+    def _verify_webhook_request(self, httprequest):
+        """Return True if a webhook request really comes from Jira
+
+        The data of verified requests can be trusted and imported without
+        reading them again from Jira.
+
+        :param httprequest: the werkzeug request of the webhook
+        """
+        self.ensure_one()
+        secret = self.sudo().webhook_secret
+        if self.webhook_verification == "none" or not secret:
+            return False
+        if self.webhook_verification == "token":
+            token = httprequest.args.get("token") or ""
+            return hmac.compare_digest(token.encode(), secret.encode())
+        signature = httprequest.headers.get("X-Hub-Signature") or ""
+        algorithm, __, digest = signature.partition("=")
+        if algorithm != "sha256":
+            return False
+        expected = hmac.new(
+            secret.encode(), httprequest.get_data(), hashlib.sha256
+        ).hexdigest()
+        return hmac.compare_digest(digest.encode(), expected.encode())
+
     @api.onchange("odoo_webhook_base_url")
     def onchange_odoo_webhook_base_url(self):
         if self.use_webhooks:
@@ -466,6 +810,9 @@ class JiraBackend(models.Model):
                     if err.status_code != 404:
                         raise
             self.use_webhooks = False
+            self.sudo().write(
+                {"webhook_secret": False, "webhook_token": False, "webhook_jql": False}
+            )
 
     def check_connection(self):
         self.ensure_one()
@@ -497,6 +844,48 @@ class JiraBackend(models.Model):
         )
         return True
 
+    def _resume_backfill_analytic_line(self):
+        """Retry the shards of the worklogs backfills not done yet"""
+        ts_model = self.env["jira.backend.timestamp"]
+        for backend in self:
+            timestamp = ts_model._timestamp_for_field(
+                backend,
+                "import_analytic_line_from_date",
+                "timestamp.batch.importer",
+            )
+            if timestamp.shard_ids:
+                backend._run_background_backfill_shards(
+                    "jira.account.analytic.line",
+                    timestamp,
+                    force=backend.import_analytic_line_force,
+                )
+
+    def backfill_analytic_line(self):
+        self._run_background_backfill_from_date(
+            "jira.account.analytic.line",
+            "import_analytic_line_from_date",
+            "timestamp.batch.importer",
+            self.backfill_analytic_line_shards,
+            force=self.import_analytic_line_force,
+        )
+        return True
+
+    def cancel_backfill_analytic_line(self):
+        """Drop the shards of a backfill not done yet
+
+        Meant for a backfill which cannot finish, for instance because
+        one of its jobs keeps failing.
+        """
+        ts_model = self.env["jira.backend.timestamp"]
+        for backend in self:
+            timestamp = ts_model._timestamp_for_field(
+                backend,
+                "import_analytic_line_from_date",
+                "timestamp.batch.importer",
+            )
+            timestamp.shard_ids.unlink()
+        return True
+
     def delete_analytic_line(self):
         self._run_background_from_date(
             "jira.account.analytic.line",
@@ -551,7 +940,9 @@ class JiraBackend(models.Model):
 
     @api.model
     def _scheduler_import_analytic_line(self):
-        self.search([]).import_analytic_line()
+        backends = self.search([])
+        backends.import_analytic_line()
+        backends._resume_backfill_analytic_line()
 
     @api.model
     def _scheduler_delete_analytic_line(self):
@@ -582,6 +973,22 @@ class JiraBackendTimestamp(models.Model):
         string="Last Timestamp",
         required=True,
     )
+    # A backfill splits the range of a timestamp in shards imported in
+    # parallel, each shard being a timestamp stopping at its
+    # 'until_timestamp', the regular timestamp being their parent.
+    until_timestamp = MilliDatetime(
+        string="Until Timestamp",
+    )
+    parent_id = fields.Many2one(
+        comodel_name="jira.backend.timestamp",
+        string="Backfilled Timestamp",
+        ondelete="cascade",
+    )
+    shard_ids = fields.One2many(
+        comodel_name="jira.backend.timestamp",
+        inverse_name="parent_id",
+        string="Backfill Shards",
+    )
 
     # The content of this field must match to the "usage" of a component.
     # The method JiraBinding.run_batch_timestamp() will find the matching
@@ -625,6 +1032,49 @@ class JiraBackendTimestamp(models.Model):
         self.ensure_one()
         self.last_timestamp = timestamp
 
+    def _create_shards(self, until, number):
+        """Split the range from the timestamp to ``until`` in shards
+
+        Return the timestamps of the shards.
+        """
+        self.ensure_one()
+        number = max(number, 1)
+        since = self.last_timestamp
+        step = (until - since) / number
+        shards = self.browse()
+        for index in range(number):
+            shard_since = since + step * index
+            shard_until = until if index == number - 1 else shard_since + step
+            shards |= self.create(
+                {
+                    "backend_id": self.backend_id.id,
+                    # unique per backend and component usage
+                    "from_date_field": "{}_shard_{}".format(
+                        self.from_date_field, index
+                    ),
+                    "component_usage": self.component_usage,
+                    "last_timestamp": shard_since,
+                    "until_timestamp": shard_until,
+                    "parent_id": self.id,
+                }
+            )
+        return shards
+
+    def _job_channel(self):
+        """Return the channel of the import jobs created by the timestamp
+
+        The imports of the backfill shards do not delay the regular
+        synchronization.
+        """
+        self.ensure_one()
+        return BACKFILL_CHANNEL if self.parent_id else None
+
+    def _finish_backfill(self):
+        """Remove a backfill shard once its range is imported"""
+        self.ensure_one()
+        if self.parent_id and self.last_timestamp >= self.until_timestamp:
+            self.unlink()
+
     def _lock(self):
         """Update the timestamp for a synchro
 
@@ -658,7 +1108,7 @@ class BackendAdapter(Component):
         return self.client._get_json("field")
 
     def create_webhook(
-        self, name=None, url=None, events=None, jql="", exclude_body=False
+        self, name=None, url=None, events=None, jql="", exclude_body=False, secret=None
     ):
         assert name and url and events
         data = {
@@ -668,10 +1118,29 @@ class BackendAdapter(Component):
             "jqlFilter": jql,
             "excludeIssueDetails": exclude_body,
         }
+        if secret:
+            data["secret"] = secret
         url = self.client._get_url("webhook", base=self.webhook_base_path)
         response = self.client._session.post(url, data=json.dumps(data))
         return json_loads(response)
 
+    def update_webhook(self, id_, jql="", secret=None):
+        """Update the JQL filter of a webhook"""
+        url = self.client._get_url("webhook/%s" % id_, base=self.webhook_base_path)
+        webhook = json_loads(self.client._session.get(url))
+        data = {
+            "name": webhook["name"],
+            "url": webhook["url"],
+            "events": webhook["events"],
+            "jqlFilter": jql,
+            "filters": {"issue-related-events-section": jql},
+            "excludeIssueDetails": webhook.get("excludeBody", False),
+        }
+        if secret:
+            data["secret"] = secret
+        response = self.client._session.put(url, data=json.dumps(data))
+        return json_loads(response)
+
     def delete_webhook(self, id_):
         url = self.client._get_url("webhook/%s" % id_, base=self.webhook_base_path)
         return json_loads(self.client._session.delete(url))
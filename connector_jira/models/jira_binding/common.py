@@ -1,7 +1,7 @@
 # Copyright 2016-2022 Camptocamp SA
 # License AGPL-3.0 or later (https://www.gnu.org/licenses/agpl.html).
 
-from odoo import api, fields, models
+from odoo import _, api, fields, models
 
 from ...fields import MilliDatetime
 
@@ -36,6 +36,24 @@ class JiraBinding(models.AbstractModel):
         ),
     ]
 
+    def _jira_fields_changed(self, values, fnames):
+        """Return whether writing ``values`` changes one of ``fnames``
+
+        Used to clear the caches only when the cached data change, for
+        instance not when the binder writes the same external id again.
+        The commands on x2many fields are considered as changes.
+        """
+        for fname in fnames:
+            if fname not in values:
+                continue
+            field = self._fields[fname]
+            if field.type in ("one2many", "many2many"):
+                return True
+            for record in self:
+                if field.convert_to_write(record[fname], record) != values[fname]:
+                    return True
+        return False
+
     @api.model
     def import_batch(self, backend):
         """Prepare import of a batch of record"""
@@ -46,6 +64,9 @@ class JiraBinding(models.AbstractModel):
     @api.model
     def run_batch_timestamp(self, backend, timestamp, force=False):
         """Prepare batch of records"""
+        if not timestamp.exists():
+            # shard of a backfill already done
+            return _("Nothing to import, the timestamp has been removed.")
         with backend.work_on(self._name) as work:
             importer = work.component(usage=timestamp.component_usage)
             return importer.run(timestamp, force=force)
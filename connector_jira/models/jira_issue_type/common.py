@@ -44,3 +44,6 @@ class IssueTypeAdapter(Component):
     def search(self):
         issues = self.client.issue_types()
         return [issue.id for issue in issues]
+
+    def search_read(self):
+        return [issue.raw for issue in self.client.issue_types()]
@@ -23,16 +23,13 @@ class IssueTypeMapper(Component):
 class IssueTypeBatchImporter(Component):
     """Import the Jira Issue Types
 
-    For every id in in the list of issue types, a direct import is done.
-    Import from a date
+    The list of issue types returned by Jira is created or updated
+    in one pass.
     """
 
     _name = "jira.issue.type.batch.importer"
-    _inherit = "jira.direct.batch.importer"
+    _inherit = "jira.upsert.batch.importer"
     _apply_on = ["jira.issue.type"]
 
-    def run(self):
-        """Run the synchronization"""
-        record_ids = self.backend_adapter.search()
-        for record_id in record_ids:
-            self._import_record(record_id)
+    def _search_read(self):
+        return self.backend_adapter.search_read()
@@ -0,0 +1,268 @@
+# Copyright 2026 Camptocamp SA
+# License AGPL-3.0 or later (https://www.gnu.org/licenses/agpl.html).
+
+import json
+import logging
+from collections import Counter, OrderedDict, defaultdict
+
+from odoo import _, api, fields, models
+
+from odoo.addons.queue_job.job import identity_exact
+
+_logger = logging.getLogger(__name__)
+
+# delay (in seconds) during which the events received by the webhooks
+# are buffered before being flushed to jobs
+FLUSH_DELAY = 5
+# maximum number of events flushed by a job
+FLUSH_BATCH_SIZE = 5000
+
+
+class JiraWebhookEvent(models.Model):
+    """Event received by a Jira webhook
+
+    The webhooks only append a row in this table, the events are
+    flushed every few seconds by a job which coalesces the events
+    of a same record and creates the import or delete jobs. The events
+    dropped as irrelevant are counted on the backend by the flush.
+
+    A flush leaving events in the buffer schedules the next one, the
+    cron only flushes the events a lost job would have left behind.
+    """
+
+    _name = "jira.webhook.event"
+    _description = "Jira Webhook Event"
+    _order = "id"
+    _log_access = False
+
+    backend_id = fields.Many2one(
+        comodel_name="jira.backend",
+        required=True,
+        ondelete="cascade",
+        readonly=True,
+    )
+    model_name = fields.Char(required=True, readonly=True)
+    action = fields.Selection(
+        selection=[("import", "Import"), ("delete", "Delete"), ("drop", "Dropped")],
+        required=True,
+        readonly=True,
+    )
+    external_id = fields.Char(string="ID on Jira", required=True, readonly=True)
+    issue_id = fields.Char(
+        string="Issue ID on Jira",
+        readonly=True,
+        help="Issue of the worklog, for the worklogs events",
+    )
+    received_at = fields.Datetime(readonly=True)
+    payload = fields.Text(
+        readonly=True,
+        help="Data of the record sent by Jira, only kept when the "
+        "webhook request has been verified",
+    )
+
+    @api.model
+    def _add_event(
+        self, backend_id, model_name, action, external_id, issue_id=None, payload=None
+    ):
+        """Buffer an event received by a webhook
+
+        Called by the webhook controllers, it has to be as cheap as
+        possible: a single INSERT, and a flush job created only when
+        none is pending.
+
+        :param payload: data of the record sent by Jira, to give only
+                        when the request has been verified
+        """
+        self.env.cr.execute(
+            "INSERT INTO jira_webhook_event "
+            "(backend_id, model_name, action, external_id, issue_id, payload, "
+            "received_at) "
+            "VALUES (%s, %s, %s, %s, %s, %s, now() at time zone 'UTC')",
+            (
+                backend_id,
+                model_name,
+                action,
+                str(external_id),
+                issue_id and str(issue_id),
+                json.dumps(payload) if payload else None,
+            ),
+        )
+        self._schedule_flush()
+
+    @api.model
+    def _schedule_flush(self, eta=FLUSH_DELAY):
+        """Create a flush job, unless one is already pending
+
+        A running flush does not count as pending: the events it has not
+        seen are flushed by the next one.
+        """
+        self.with_delay(
+            eta=eta,
+            identity_key=identity_exact,
+            description=_("Flush the events received from Jira webhooks"),
+        ).flush_events()
+
+    @api.model
+    def _pop_events(self, limit=FLUSH_BATCH_SIZE):
+        """Remove the oldest events of the buffer and return them
+
+        The rows locked by a concurrent flush are skipped, so an event
+        is never handled twice.
+        """
+        self.env.cr.execute(
+            """
+            DELETE FROM jira_webhook_event
+            WHERE id IN (
+                SELECT id FROM jira_webhook_event
+                ORDER BY id
+                LIMIT %s
+                FOR UPDATE SKIP LOCKED
+            )
+            RETURNING id, backend_id, model_name, action, external_id, issue_id,
+                payload
+            """,
+            (limit,),
+        )
+        return sorted(self.env.cr.fetchall())
+
+    @api.model
+    def _has_events(self):
+        self.env.cr.execute("SELECT 1 FROM jira_webhook_event LIMIT 1")
+        return bool(self.env.cr.fetchone())
+
+    @api.model
+    def _count_dropped_events(self, rows):
+        """Add the dropped events to the count of their backend
+
+        A single update of each backend by flush.
+
+        :param rows: rows of the dropped events, from ``_pop_events``
+        """
+        counts = Counter(backend_id for __, backend_id, *__ in rows)
+        for backend_id, count in sorted(counts.items()):
+            backend = self.env["jira.backend"].browse(backend_id).exists()
+            if backend:
+                backend._add_webhook_dropped_count(count)
+
+    @api.model
+    def _coalesce_events(self, rows):
+        """Keep only the last action of each record
+
+        Return an ordered dict ``{(backend_id, model_name, external_id):
+        (action, issue_id, payload)}``, ordered by the last event of each
+        record. Only the payload of the last event is decoded.
+        """
+        events = OrderedDict()
+        for __, backend_id, model_name, action, external_id, issue_id, payload in rows:
+            key = (backend_id, model_name, external_id)
+            events.pop(key, None)
+            events[key] = (action, issue_id, payload)
+        return OrderedDict(
+            (key, (action, issue_id, payload and json.loads(payload)))
+            for key, (action, issue_id, payload) in events.items()
+        )
+
+    @api.model
+    def flush_events(self):
+        """Create the jobs for the events buffered by the webhooks
+
+        When events remain in the buffer, the next flush is scheduled
+        right away if the batch was full, after ``FLUSH_DELAY`` seconds
+        otherwise.
+        """
+        rows = self._pop_events()
+        if not rows:
+            return _("No events to flush")
+        # the dropped events are only counted
+        dropped = [row for row in rows if row[3] == "drop"]
+        if dropped:
+            self._count_dropped_events(dropped)
+        events = self._coalesce_events([row for row in rows if row[3] != "drop"])
+        imports = defaultdict(list)
+        deletes = defaultdict(list)
+        for key, (action, issue_id, payload) in events.items():
+            backend_id, model_name, external_id = key
+            if action == "delete":
+                deletes[(backend_id, model_name)].append(external_id)
+            else:
+                imports[(backend_id, model_name)].append(
+                    (external_id, issue_id, payload)
+                )
+        backends = self.env["jira.backend"].browse(
+            {backend_id for backend_id, __ in list(imports) + list(deletes)}
+        )
+        jobs = 0
+        for (backend_id, model_name), external_ids in deletes.items():
+            backend = backends.browse(backend_id).exists()
+            if backend:
+                jobs += self._delay_deletes(backend, model_name, external_ids)
+        for (backend_id, model_name), records in imports.items():
+            backend = backends.browse(backend_id).exists()
+            if backend:
+                jobs += self._delay_imports(backend, model_name, records)
+        if self._has_events():
+            self._schedule_flush(
+                eta=None if len(rows) == FLUSH_BATCH_SIZE else FLUSH_DELAY
+            )
+        return _("Flushed {} events, {} jobs created").format(len(rows), jobs)
+
+    @api.model
+    def _delay_deletes(self, backend, model_name, external_ids):
+        delayable_model = self.env[model_name].with_delay(
+            identity_key=identity_exact,
+            description=_("Delete a local record which has been deleted on JIRA"),
+        )
+        for external_id in external_ids:
+            delayable_model.delete_record(backend, external_id)
+        return len(external_ids)
+
+    @api.model
+    def _delay_imports(self, backend, model_name, records):
+        """Create the import jobs
+
+        :param records: list of tuples (external id, issue id, payload),
+                        the payload is given to the job when present
+        """
+        if model_name == "jira.account.analytic.line":
+            return self._delay_worklog_imports(backend, records)
+        delayable_model = self.env[model_name].with_delay(identity_key=identity_exact)
+        for external_id, __, payload in records:
+            if payload:
+                delayable_model.import_record(backend, external_id, record=payload)
+            else:
+                delayable_model.import_record(backend, external_id)
+        return len(records)
+
+    @api.model
+    def _delay_worklog_imports(self, backend, records):
+        """Create the import jobs of the worklogs
+
+        The worklogs of a same issue are imported together. The payloads
+        are completed (e.g. with the data of Tempo) in one go.
+        """
+        payloads = [payload for __, __, payload in records if payload]
+        if payloads:
+            with backend.work_on("jira.account.analytic.line") as work:
+                adapter = work.component(usage="backend.adapter")
+                adapter.complete_read(payloads)
+        worklogs_by_issue = defaultdict(list)
+        for worklog_id, issue_id, payload in records:
+            worklogs_by_issue[issue_id].append((worklog_id, payload))
+        delayable_model = self.env["jira.account.analytic.line"].with_delay(
+            identity_key=identity_exact,
+            description=_("Import worklogs from JIRA"),
+        )
+        for issue_id, worklogs in worklogs_by_issue.items():
+            kwargs = {}
+            if len(worklogs) == 1:
+                worklog_id, payload = worklogs[0]
+                if payload:
+                    kwargs["record"] = payload
+                delayable_model.import_record(backend, issue_id, worklog_id, **kwargs)
+                continue
+            if all(payload for __, payload in worklogs):
+                kwargs["records"] = [payload for __, payload in worklogs]
+            delayable_model.import_issue_worklogs(
+                backend, issue_id, [worklog_id for worklog_id, __ in worklogs], **kwargs
+            )
+        return len(worklogs_by_issue)
@@ -9,11 +9,17 @@ import tempfile
 
 from odoo import _, api, exceptions, fields, models, tools
 from odoo.osv import expression
+from odoo.tools.sql import create_index, escape_psql
 
 from odoo.addons.component.core import Component
 
 _logger = logging.getLogger(__name__)
 
+# fields of the bindings used in the JQL of the issues webhook
+WEBHOOK_JQL_FIELDS = {"backend_id", "external_id", "sync_issue_type_ids"}
+# search terms which can be the beginning of a Jira key ("PROJ", "proj-12")
+JIRA_KEY_PREFIX_RE = re.compile(r"^[A-Za-z][A-Za-z0-9_]*(-[0-9]*)?$")
+
 try:
     from jira import JIRAError
     from jira.utils import json_loads
@@ -21,6 +27,54 @@ except ImportError as err:
     _logger.debug(err)
 
 
+def jira_key_name_search(
+    model, key_field, name_search, name, args, operator, limit, name_get_uid
+):
+    """Name search matching the Jira keys too
+
+    When the name looks like a Jira key, the records are first searched
+    by key prefix with a case sensitive LIKE (the Jira keys are
+    uppercase), which uses the prefix index of the field. The remaining
+    records are searched by ``name_search``, the ``_name_search`` of the
+    parent class. With a negative operator, the records with a matching
+    key are excluded from the result of ``name_search``.
+    """
+    if not name or not JIRA_KEY_PREFIX_RE.match(name):
+        return name_search(
+            name, args=args, operator=operator, limit=limit, name_get_uid=name_get_uid
+        )
+    key_domain = [(key_field, "=like", escape_psql(name.upper()) + "%")]
+    if operator in expression.NEGATIVE_TERM_OPERATORS:
+        return name_search(
+            name,
+            args=expression.AND(
+                [args or [], ["|", (key_field, "=", False), "!"] + key_domain]
+            ),
+            operator=operator,
+            limit=limit,
+            name_get_uid=name_get_uid,
+        )
+    ids = list(
+        model._search(
+            expression.AND([args or [], key_domain]),
+            limit=limit,
+            access_rights_uid=name_get_uid,
+        )
+    )
+    if limit and len(ids) >= limit:
+        return ids
+    if ids:
+        args = expression.AND([args or [], [("id", "not in", ids)]])
+    other_ids = name_search(
+        name,
+        args=args,
+        operator=operator,
+        limit=limit and limit - len(ids),
+        name_get_uid=name_get_uid,
+    )
+    return ids + list(other_ids)
+
+
 class JiraProjectBaseFields(models.AbstractModel):
     """JIRA Project Base fields
 
@@ -205,13 +259,21 @@ class JiraProjectProject(models.Model):
     def create(self, values):
         record = super().create(values)
         record._ensure_jira_key()
+        # filter of the webhooks
+        self.env["jira.backend"].clear_caches()
+        record.backend_id._delay_update_webhook_jql()
         return record
 
     def write(self, values):
         if "project_template" in values:
             raise exceptions.UserError(_("The project template cannot be modified."))
+        update_jql = self._jira_fields_changed(values, WEBHOOK_JQL_FIELDS)
+        backends = self.mapped("backend_id") if update_jql else None
         res = super().write(values)
         self._ensure_jira_key()
+        if update_jql:
+            self.env["jira.backend"].clear_caches()
+            (backends | self.mapped("backend_id"))._delay_update_webhook_jql()
         return res
 
     def _ensure_jira_key(self):
@@ -226,7 +288,11 @@ class JiraProjectProject(models.Model):
     def unlink(self):
         if any(self.mapped("external_id")):
             raise exceptions.UserError(_("Exported project cannot be deleted."))
-        return super().unlink()
+        backends = self.mapped("backend_id")
+        res = super().unlink()
+        self.env["jira.backend"].clear_caches()
+        backends._delay_update_webhook_jql()
+        return res
 
 
 class ProjectProject(models.Model):
@@ -245,6 +311,23 @@ class ProjectProject(models.Model):
         store=True,
     )
 
+    def init(self):
+        super().init()
+        # prefix index for the search of the projects by Jira key
+        create_index(
+            self._cr,
+            "project_project_jira_key_prefix_index",
+            self._table,
+            ["jira_key text_pattern_ops"],
+        )
+
+    def write(self, values):
+        result = super().write(values)
+        if "type_ids" in values:
+            # stages used to map the Jira statuses
+            self.env["project.task.type"].clear_caches()
+        return result
+
     @api.depends("jira_bind_ids.jira_key")
     def _compute_jira_key(self):
         for project in self:
@@ -261,21 +344,19 @@ class ProjectProject(models.Model):
         return names
 
     @api.model
-    def name_search(self, name="", args=None, operator="ilike", limit=100):
-        res = super().name_search(name, args, operator, limit)
-        if not name:
-            return res
-        domain = [
-            "|",
-            ("jira_key", "=ilike", name + "%"),
-            ("id", "in", [x[0] for x in res]),
-        ]
-        if operator in expression.NEGATIVE_TERM_OPERATORS:
-            domain = ["&", "!"] + domain[1:]
-        return self.search(
-            domain + (args or []),
-            limit=limit,
-        ).name_get()
+    def _name_search(
+        self, name, args=None, operator="ilike", limit=100, name_get_uid=None
+    ):
+        return jira_key_name_search(
+            self,
+            "jira_key",
+            super()._name_search,
+            name,
+            args,
+            operator,
+            limit,
+            name_get_uid,
+        )
 
     def create_and_link_jira(self):
         action_link = self.env.ref("connector_jira.open_project_link_jira")
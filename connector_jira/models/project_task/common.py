@@ -2,11 +2,19 @@
 # Copyright 2019 Brainbean Apps (https://brainbeanapps.com)
 # License AGPL-3.0 or later (https://www.gnu.org/licenses/agpl.html).
 
-from odoo import _, api, exceptions, fields, models
-from odoo.osv import expression
+from odoo import _, api, exceptions, fields, models, tools
+from odoo.tools.sql import create_index
 
 from odoo.addons.component.core import Component
 
+from ..project_project.common import jira_key_name_search
+
+
+# fields of the stages used to map the Jira statuses
+STAGE_LOOKUP_FIELDS = {"name", "project_ids", "sequence", "active"}
+# number of tasks for which the Jira fields are aggregated by query
+BINDING_FIELDS_BATCH_SIZE = 1000
+
 
 class JiraProjectTask(models.Model):
     _name = "jira.project.task"
@@ -53,6 +61,11 @@ class JiraProjectTask(models.Model):
         string="JIRA issue",
         compute="_compute_jira_issue_url",
     )
+    jira_description_hash = fields.Char(
+        readonly=True,
+        help="Hash of the description of the issue on Jira when the "
+        "description of the task has been imported",
+    )
 
     _sql_constraints = [
         (
@@ -70,6 +83,15 @@ class JiraProjectTask(models.Model):
             raise exceptions.UserError(_("A Jira task cannot be deleted."))
         return super().unlink()
 
+    def import_description(self):
+        """Import the description of the task from Jira"""
+        self.ensure_one()
+        if not self.exists():
+            return _("Task binding does no longer exist")
+        with self.backend_id.work_on(self._name) as work:
+            importer = work.component(usage="record.importer")
+            return importer.import_description(self)
+
     @api.depends("jira_key")
     def _compute_jira_issue_url(self):
         """Compute the external URL to JIRA."""
@@ -88,24 +110,24 @@ class ProjectTask(models.Model):
         context={"active_test": False},
     )
     jira_issue_type = fields.Char(
-        compute="_compute_jira_issue_type",
+        compute="_compute_jira_binding_fields",
         string="JIRA Issue Type",
         store=True,
     )
     jira_compound_key = fields.Char(
-        compute="_compute_jira_compound_key",
+        compute="_compute_jira_binding_fields",
         string="JIRA Key",
         store=True,
     )
     jira_epic_link_task_id = fields.Many2one(
         comodel_name="project.task",
-        compute="_compute_jira_epic_link_task_id",
+        compute="_compute_jira_binding_fields",
         string="JIRA Epic",
         store=True,
     )
     jira_parent_task_id = fields.Many2one(
         comodel_name="project.task",
-        compute="_compute_jira_parent_task_id",
+        compute="_compute_jira_binding_fields",
         string="JIRA Parent",
         store=True,
     )
@@ -114,31 +136,94 @@ class ProjectTask(models.Model):
         compute="_compute_jira_issue_url",
     )
 
-    @api.depends("jira_bind_ids.jira_issue_type_id.name")
-    def _compute_jira_issue_type(self):
-        for record in self:
-            types = record.mapped("jira_bind_ids.jira_issue_type_id.name")
-            record.jira_issue_type = ",".join([t for t in types if t])
-
-    @api.depends("jira_bind_ids.jira_key")
-    def _compute_jira_compound_key(self):
-        for record in self:
-            keys = record.mapped("jira_bind_ids.jira_key")
-            record.jira_compound_key = ",".join([k for k in keys if k])
-
-    @api.depends("jira_bind_ids.jira_epic_link_id.odoo_id")
-    def _compute_jira_epic_link_task_id(self):
-        for record in self:
-            tasks = record.mapped("jira_bind_ids.jira_epic_link_id.odoo_id")
-            if len(tasks) == 1:
-                record.jira_epic_link_task_id = tasks
+    def init(self):
+        super().init()
+        # prefix index for the search of the tasks by Jira key
+        create_index(
+            self._cr,
+            "project_task_jira_compound_key_prefix_index",
+            self._table,
+            ["jira_compound_key text_pattern_ops"],
+        )
+
+    @api.depends(
+        "jira_bind_ids.jira_issue_type_id.name",
+        "jira_bind_ids.jira_key",
+        "jira_bind_ids.jira_epic_link_id.odoo_id",
+        "jira_bind_ids.jira_parent_id.odoo_id",
+    )
+    def _compute_jira_binding_fields(self):
+        """Compute the Jira fields stored on the tasks
 
-    @api.depends("jira_bind_ids.jira_parent_id.odoo_id")
-    def _compute_jira_parent_task_id(self):
+        The values are aggregated from the bindings with one query per
+        batch of tasks, as the imports can recompute many tasks at once.
+        """
+        tasks = self.filtered(lambda task: isinstance(task.id, int))
+        values = tasks._read_jira_binding_fields()
         for record in self:
-            tasks = record.mapped("jira_bind_ids.jira_parent_id.odoo_id")
-            if len(tasks) == 1:
-                record.jira_parent_task_id = tasks
+            if record in tasks:
+                issue_types, keys, epic_ids, parent_ids = values.get(
+                    record.id, (None, None, [], [])
+                )
+                epics = self.browse(epic_ids)
+                parents = self.browse(parent_ids)
+            else:
+                # new records, not in the database yet
+                issue_types = ",".join(
+                    filter(None, record.mapped("jira_bind_ids.jira_issue_type_id.name"))
+                )
+                keys = ",".join(filter(None, record.mapped("jira_bind_ids.jira_key")))
+                epics = record.mapped("jira_bind_ids.jira_epic_link_id.odoo_id")
+                parents = record.mapped("jira_bind_ids.jira_parent_id.odoo_id")
+            record.jira_issue_type = issue_types
+            record.jira_compound_key = keys
+            if len(epics) == 1:
+                record.jira_epic_link_task_id = epics
+            if len(parents) == 1:
+                record.jira_parent_task_id = parents
+
+    def _read_jira_binding_fields(self):
+        """Aggregate the Jira fields of the bindings of the tasks
+
+        Return a dict ``{task id: (issue types, keys, epic task ids,
+        parent task ids)}``, the tasks without bindings are omitted.
+        """
+        if not self:
+            return {}
+        self.env["jira.project.task"].flush(
+            [
+                "odoo_id",
+                "jira_key",
+                "jira_issue_type_id",
+                "jira_epic_link_id",
+                "jira_parent_id",
+            ]
+        )
+        self.env["jira.issue.type"].flush(["name"])
+        values = {}
+        for task_ids in tools.split_every(BINDING_FIELDS_BATCH_SIZE, self.ids):
+            self.env.cr.execute(
+                """
+                SELECT binding.odoo_id,
+                    string_agg(issue_type.name, ',' ORDER BY binding.id),
+                    string_agg(binding.jira_key, ',' ORDER BY binding.id),
+                    array_remove(array_agg(DISTINCT epic.odoo_id), NULL),
+                    array_remove(array_agg(DISTINCT parent.odoo_id), NULL)
+                FROM jira_project_task AS binding
+                LEFT JOIN jira_issue_type AS issue_type
+                    ON issue_type.id = binding.jira_issue_type_id
+                LEFT JOIN jira_project_task AS epic
+                    ON epic.id = binding.jira_epic_link_id
+                LEFT JOIN jira_project_task AS parent
+                    ON parent.id = binding.jira_parent_id
+                WHERE binding.odoo_id IN %s
+                GROUP BY binding.odoo_id
+                """,
+                (task_ids,),
+            )
+            for task_id, *row in self.env.cr.fetchall():
+                values[task_id] = tuple(row)
+        return values
 
     @api.depends("jira_bind_ids.jira_key")
     def _compute_jira_issue_url(self):
@@ -163,21 +248,19 @@ class ProjectTask(models.Model):
         return names
 
     @api.model
-    def name_search(self, name="", args=None, operator="ilike", limit=100):
-        res = super().name_search(name, args, operator, limit)
-        if not name:
-            return res
-        domain = [
-            "|",
-            ("jira_compound_key", "=ilike", name + "%"),
-            ("id", "in", [x[0] for x in res]),
-        ]
-        if operator in expression.NEGATIVE_TERM_OPERATORS:
-            domain = ["&", "!"] + domain[1:]
-        return self.search(
-            domain + (args or []),
-            limit=limit,
-        ).name_get()
+    def _name_search(
+        self, name, args=None, operator="ilike", limit=100, name_get_uid=None
+    ):
+        return jira_key_name_search(
+            self,
+            "jira_compound_key",
+            super()._name_search,
+            name,
+            args,
+            operator,
+            limit,
+            name_get_uid,
+        )
 
     @api.model
     def _get_connector_jira_fields(self):
@@ -253,18 +336,71 @@ class ProjectTask(models.Model):
         return super().unlink()
 
 
+class ProjectTaskType(models.Model):
+    _inherit = "project.task.type"
+
+    @api.model
+    @tools.ormcache("project_id", "self.env.lang")
+    def _get_jira_stage_ids_by_name(self, project_id):
+        """Return the stages of a project by name, to map the Jira statuses
+
+        When several stages of the project have the same name, the first
+        one is used.
+        """
+        stages = self.sudo().search([("project_ids", "=", project_id)])
+        stage_ids = {}
+        for stage in stages:
+            stage_ids.setdefault(stage.name, stage.id)
+        return stage_ids
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        records = super().create(vals_list)
+        # the stages without project are not in the cache
+        if records.filtered("project_ids"):
+            self.clear_caches()
+        return records
+
+    def write(self, values):
+        clear_cache = "project_ids" in values or (
+            STAGE_LOOKUP_FIELDS.intersection(values) and self.filtered("project_ids")
+        )
+        result = super().write(values)
+        if clear_cache:
+            self.clear_caches()
+        return result
+
+    def unlink(self):
+        clear_cache = bool(self.filtered("project_ids"))
+        result = super().unlink()
+        if clear_cache:
+            self.clear_caches()
+        return result
+
+
 class TaskAdapter(Component):
     _name = "jira.project.task.adapter"
     _inherit = ["jira.webservice.adapter"]
     _apply_on = ["jira.project.task"]
 
-    def read(self, id_, fields=None):
-        # pylint: disable=W8106
-        return self.get(id_, fields=fields).raw
+    def read(self, id_, fields=None, rendered=True, changelog=False):
+        """Read an issue
 
-    def get(self, id_, fields=None):
+        :param rendered: when False, the HTML rendering of the fields
+                         (``renderedFields``) is not requested
+        :param changelog: when True, the changelog of the issue is read
+        """
+        # pylint: disable=W8106
+        return self.get(id_, fields=fields, rendered=rendered, changelog=changelog).raw
+
+    def get(self, id_, fields=None, rendered=True, changelog=False):
+        expand = []
+        if rendered:
+            expand.append("renderedFields")
+        if changelog:
+            expand.append("changelog")
         with self.handle_404():
-            return self.client.issue(id_, fields=fields, expand=["renderedFields"])
+            return self.client.issue(id_, fields=fields, expand=expand or None)
 
     def search(self, jql):
         # we need to have at least one field which is not 'id' or 'key'
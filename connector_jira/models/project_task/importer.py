@@ -2,11 +2,81 @@
 # Copyright 2019 Brainbean Apps (https://brainbeanapps.com)
 # License AGPL-3.0 or later (https://www.gnu.org/licenses/agpl.html).
 
+import hashlib
+import threading
+from collections import OrderedDict
+
 from odoo import _
 
 from odoo.addons.component.core import Component
-from odoo.addons.connector.components.mapper import mapping
-from odoo.addons.connector.exception import MappingError
+from odoo.addons.connector.components.mapper import changed_by, mapping
+from odoo.addons.connector.exception import IDMissingInBackend, MappingError
+from odoo.addons.queue_job.job import identity_exact
+
+from ...components.mapper import iso8601_to_utc_datetime
+
+# maximum number of epics kept in the cache of each worker
+EPIC_CACHE_SIZE = 500
+# fields of the changelog of the issues which do not change the tasks
+CHANGELOG_IGNORED_FIELDS = {
+    "attachment",
+    "comment",
+    "epic child",
+    "labels",
+    "link",
+    "rank",
+    "resolution",
+    "sprint",
+    "timeestimate",
+    "timespent",
+    "workflow",
+    "worklogid",
+}
+
+
+class EpicCache(object):
+    """In-memory cache of the Jira epics read by the task imports
+
+    Many tasks share a same epic: the payload of the epics are stored
+    by (database, backend, epic key) in a bounded LRU. An entry is used
+    only when its ``updated`` date is still the one of the epic on Jira.
+    """
+
+    def __init__(self, size=EPIC_CACHE_SIZE):
+        self.size = size
+        self._epics = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __contains__(self, key):
+        return key in self._epics
+
+    def get(self, key, updated):
+        """Return the payload of an epic if it has not been updated"""
+        with self._lock:
+            epic = self._epics.get(key)
+            if epic is None or epic["fields"].get("updated") != updated:
+                return None
+            self._epics.move_to_end(key)
+            return epic
+
+    def set(self, key, epic):
+        with self._lock:
+            self._epics.pop(key, None)
+            self._epics[key] = epic
+            while len(self._epics) > self.size:
+                self._epics.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._epics.clear()
+
+
+epic_cache = EpicCache()
+
+
+def description_hash(description):
+    """Return the hash of the raw description of an issue"""
+    return hashlib.sha1((description or "").encode("utf-8")).hexdigest()
 
 
 class ProjectTaskMapper(Component):
@@ -23,10 +93,12 @@ class ProjectTaskMapper(Component):
     ]
 
     @mapping
+    @changed_by("duedate")
     def from_attributes(self, record):
         return self.component(usage="map.from.attrs").values(record, self)
 
     @mapping
+    @changed_by("summary")
     def name(self, record):
         # On an Epic, you have 2 fields:
 
@@ -45,6 +117,7 @@ class ProjectTaskMapper(Component):
         return {"name": name}
 
     @mapping
+    @changed_by("issuetype")
     def issue_type(self, record):
         binder = self.binder_for("jira.issue.type")
         jira_type_id = record["fields"]["issuetype"]["id"]
@@ -52,6 +125,7 @@ class ProjectTaskMapper(Component):
         return {"jira_issue_type_id": binding.id}
 
     @mapping
+    @changed_by("assignee")
     def assignee(self, record):
         assignee = record["fields"].get("assignee")
         if not assignee:
@@ -73,10 +147,22 @@ class ProjectTaskMapper(Component):
         return {"user_id": user.id}
 
     @mapping
+    @changed_by("description")
     def description(self, record):
-        return {"description": record["renderedFields"]["description"]}
+        # the description is not rendered when it is imported apart
+        # from the task, see ProjectTaskImporter._after_import
+        raw_description = record["fields"].get("description")
+        values = {"jira_description_hash": description_hash(raw_description)}
+        if "renderedFields" in record:
+            values["description"] = record["renderedFields"]["description"]
+        elif not raw_description:
+            values["description"] = False
+        else:
+            return {}
+        return values
 
     @mapping
+    @changed_by("project")
     def project(self, record):
         binder = self.binder_for("jira.project.project")
         project = binder.unwrap_binding(self.options.project_binding)
@@ -90,6 +176,7 @@ class ProjectTaskMapper(Component):
         return values
 
     @mapping
+    @changed_by("epic")
     def epic(self, record):
         if not self.options.jira_epic:
             return {}
@@ -99,6 +186,7 @@ class ProjectTaskMapper(Component):
         return {"jira_epic_link_id": binding.id}
 
     @mapping
+    @changed_by("parent")
     def parent(self, record):
         jira_parent = record["fields"].get("parent")
         if not jira_parent:
@@ -113,6 +201,7 @@ class ProjectTaskMapper(Component):
         return {"backend_id": self.backend_record.id}
 
     @mapping
+    @changed_by("status")
     def status(self, record):
         status = record["fields"].get("status", {})
         status_name = status.get("name")
@@ -120,13 +209,13 @@ class ProjectTaskMapper(Component):
             return {"stage_id": False}
         project_binder = self.binder_for("jira.project.project")
         project_id = project_binder.unwrap_binding(self.options.project_binding)
-        stage = self.env["project.task.type"].search(
-            [("name", "=", status_name), ("project_ids", "=", project_id.id)],
-            limit=1,
+        stage_ids = self.env["project.task.type"]._get_jira_stage_ids_by_name(
+            project_id.id
         )
-        return {"stage_id": stage.id}
+        return {"stage_id": stage_ids.get(status_name, False)}
 
     @mapping
+    @changed_by("timeoriginalestimate")
     def time_estimate(self, record):
         original_estimate = record["fields"].get("timeoriginalestimate")
         if not original_estimate:
@@ -178,21 +267,121 @@ class ProjectTaskImporter(Component):
     def __init__(self, work_context):
         super().__init__(work_context)
         self.jira_epic = None
+        self.jira_epic_uptodate = False
         self.project_binding = None
+        # Jira fields changed since the last import, None when the
+        # task is fully updated
+        self.changed_fields = None
+
+    def _read_rendered_fields(self):
+        """Return whether the HTML rendering of the issues is read
+
+        When the descriptions are loaded on demand, the imports read
+        only the raw fields.
+        """
+        return self.backend_record.task_description_mode != "lazy"
 
     def _get_external_data(self):
-        """Return the raw Jira data for ``self.external_id``"""
-        result = super()._get_external_data()
-        epic_field_name = self.backend_record.epic_link_field_name
-        if epic_field_name:
-            issue_adapter = self.component(
-                usage="backend.adapter", model_name="jira.project.task"
-            )
-            epic_key = result["fields"][epic_field_name]
-            if epic_key:
-                self.jira_epic = issue_adapter.read(epic_key)
+        """Return the raw Jira data for ``self.external_id``
+
+        With incremental updates, the changelog of the issue is read
+        too, to update only the fields changed since the last import.
+        """
+        binding = self.model.browse()
+        if self.backend_record.task_incremental_update:
+            binding = self._get_binding()
+        result = self.backend_adapter.read(
+            self.external_id,
+            rendered=self._read_rendered_fields(),
+            changelog=bool(binding.jira_updated_at),
+        )
+        if binding.jira_updated_at:
+            self.changed_fields = self._changed_fields(result, binding)
         return result
 
+    def _changelog_field(self, item):
+        """Return the name of the field of a changelog item
+
+        It is the name used by the ``changed_by`` of the mapper.
+        """
+        field_id = (item.get("fieldId") or item["field"]).lower()
+        backend = self.backend_record
+        if field_id == (backend.epic_link_field_name or "").lower():
+            return "epic"
+        if field_id == (backend.epic_name_field_name or "").lower():
+            return "summary"
+        return field_id
+
+    def _changed_fields(self, issue, binding):
+        """Return the fields changed on Jira since the last import
+
+        Return None when the task must be fully updated: the changelog
+        is incomplete or contains a field which has no mapping declaring
+        it in its ``changed_by``.
+        """
+        changelog = issue.get("changelog")
+        if not changelog:
+            return None
+        histories = changelog.get("histories", [])
+        if changelog.get("total", len(histories)) > len(histories):
+            return None
+        changed = set()
+        for history in histories:
+            if iso8601_to_utc_datetime(history["created"]) <= binding.jira_updated_at:
+                continue
+            for item in history.get("items", []):
+                if item["field"].lower() in CHANGELOG_IGNORED_FIELDS:
+                    continue
+                changed.add(self._changelog_field(item))
+        mapped_fields = {source for source, __ in self.mapper.direct}
+        for __, definition in self.mapper.map_methods:
+            mapped_fields |= definition.changed_by or set()
+        if not changed <= mapped_fields:
+            return None
+        return changed
+
+    def _has_changed(self, field):
+        return self.changed_fields is None or field in self.changed_fields
+
+    def _read_epic(self, epic_key):
+        """Return the Jira data of the epic of the task
+
+        When the epic is cached, only its ``updated`` date is read: the
+        cached payload is used when it is still valid, and if the bound
+        epic is up-to-date, this lightweight payload is returned and the
+        import of the epic is skipped. Otherwise the epic is fully read
+        once, the payload is given to the import of the epic.
+        """
+        issue_adapter = self.component(
+            usage="backend.adapter", model_name="jira.project.task"
+        )
+        cache_key = (self.env.cr.dbname, self.backend_record.id, epic_key)
+        if cache_key in epic_cache:
+            jira_epic = issue_adapter.read(epic_key, fields="updated")
+            updated = jira_epic["fields"]["updated"]
+            if self._is_epic_uptodate(epic_key, updated):
+                self.jira_epic_uptodate = True
+                return jira_epic
+            cached = epic_cache.get(cache_key, updated)
+            if cached:
+                return cached
+        jira_epic = issue_adapter.read(epic_key, rendered=self._read_rendered_fields())
+        epic_cache.set(cache_key, jira_epic)
+        self.jira_epic_uptodate = self._is_epic_uptodate(
+            epic_key, jira_epic["fields"]["updated"]
+        )
+        return jira_epic
+
+    def _is_epic_uptodate(self, epic_key, updated):
+        """Return whether the binding of an epic is up-to-date"""
+        binding = self.model.with_context(active_test=False).search(
+            [("backend_id", "=", self.backend_record.id), ("jira_key", "=", epic_key)],
+            limit=1,
+        )
+        return bool(binding.jira_updated_at) and (
+            iso8601_to_utc_datetime(updated) <= binding.jira_updated_at
+        )
+
     def _find_project_binding(self):
         matcher = self.component(usage="jira.task.project.matcher")
         self.project_binding = matcher.find_project_binding(self.external_record)
@@ -215,12 +404,19 @@ class ProjectTaskImporter(Component):
         )
 
     def _update_data(self, map_record, **kwargs):
-        return super()._update_data(
+        if self.changed_fields is not None:
+            # 'updated' is not used by any mapping, it prevents to map
+            # all the fields when no field has changed
+            kwargs["fields"] = sorted(self.changed_fields | {"updated"})
+        values = super()._update_data(
             map_record,
             jira_epic=self.jira_epic,
             project_binding=self.project_binding,
             **kwargs
         )
+        if self.changed_fields is not None:
+            values["jira_updated_at"] = self._get_external_updated_at()
+        return values
 
     def _import(self, binding, **kwargs):
         # called at the beginning of _import because we must be sure
@@ -228,8 +424,52 @@ class ProjectTaskImporter(Component):
         self._find_project_binding()
         if not self._is_issue_type_sync():
             return _("Project or issue type is not synchronized.")
+        self._load_epic()
         return super()._import(binding, **kwargs)
 
+    def _load_epic(self):
+        """Read the epic of the task, also when the issue has been given
+
+        (e.g. by a verified webhook), so the epic link is kept.
+        """
+        epic_field_name = self.backend_record.epic_link_field_name
+        if epic_field_name and self._has_changed("epic"):
+            epic_key = self.external_record["fields"].get(epic_field_name)
+            if epic_key:
+                self.jira_epic = self._read_epic(epic_key)
+
+    def _after_import(self, binding):
+        super()._after_import(binding)
+        if "renderedFields" in self.external_record:
+            return
+        raw_description = self.external_record["fields"].get("description")
+        if binding.jira_description_hash != description_hash(raw_description):
+            binding.with_delay(
+                priority=20,
+                identity_key=identity_exact,
+                description=_("Import the description of a task from Jira"),
+            ).import_description()
+
+    def import_description(self, binding):
+        """Import the description of a task, when it changed on Jira"""
+        self.external_id = binding.external_id
+        try:
+            issue = self.backend_adapter.read(self.external_id, fields="description")
+        except IDMissingInBackend:
+            return _("Record does no longer exist in Jira")
+        self.external_record = issue
+        raw_description = issue["fields"].get("description")
+        hash_ = description_hash(raw_description)
+        if binding.jira_description_hash == hash_:
+            return _("Description already up-to-date.")
+        binding.with_context(**self._update_context()).sudo().write(
+            {
+                "description": issue["renderedFields"]["description"],
+                "jira_description_hash": hash_,
+            }
+        )
+        return _("Description imported.")
+
     def _import_dependency_assignee(self):
         jira_assignee = self.external_record["fields"].get("assignee") or {}
         jira_key = jira_assignee.get("key")
@@ -249,14 +489,26 @@ class ProjectTaskImporter(Component):
             self._import_dependency(jira_parent_id, "jira.project.task")
 
     def _import_dependency_epic(self):
-        if self.jira_epic:
+        if self.jira_epic and not self.jira_epic_uptodate:
+            # the epic is imported again when it has been updated
             self._import_dependency(
-                self.jira_epic["id"], "jira.project.task", record=self.jira_epic
+                self.jira_epic["id"],
+                "jira.project.task",
+                record=self.jira_epic,
+                always=True,
             )
 
     def _import_dependencies(self):
-        """Import the dependencies for the record"""
-        self._import_dependency_assignee()
-        self._import_dependency_issue_type()
-        self._import_dependency_parent()
-        self._import_dependency_epic()
+        """Import the dependencies for the record
+
+        On incremental updates, only the dependencies of the changed
+        fields are imported.
+        """
+        if self._has_changed("assignee"):
+            self._import_dependency_assignee()
+        if self._has_changed("issuetype"):
+            self._import_dependency_issue_type()
+        if self._has_changed("parent"):
+            self._import_dependency_parent()
+        if self._has_changed("epic"):
+            self._import_dependency_epic()
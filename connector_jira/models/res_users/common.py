@@ -2,12 +2,29 @@
 # Copyright 2019 Brainbean Apps (https://brainbeanapps.com)
 # License AGPL-3.0 or later (https://www.gnu.org/licenses/agpl.html)
 
+import time
+from collections import defaultdict, namedtuple
+from datetime import timedelta
 from itertools import groupby
 
-from odoo import _, exceptions, fields, models
+from psycopg2.extras import execute_values
+
+from odoo import _, api, exceptions, fields, models
 
 from odoo.addons.component.core import Component
 
+# age (in seconds) after which the snapshot of the Jira users is read again
+USER_DIRECTORY_TTL = 3600
+# time (in seconds) during which an Odoo user which did not match any Jira
+# user is not evaluated again, unless its login or email or the snapshot
+# change
+USER_MATCH_MISS_TTL = 6 * 3600
+
+JiraUser = namedtuple("JiraUser", "key name email")
+
+# {(dbname, backend id): {user id: (expiry, fingerprint)}}
+_user_match_misses = {}
+
 
 class JiraResUsers(models.Model):
     _name = "jira.res.users"
@@ -24,6 +41,84 @@ class JiraResUsers(models.Model):
     )
 
 
+class JiraUserDirectory(models.Model):
+    """Snapshot of the users of Jira
+
+    The Odoo users are matched against it in memory, instead of
+    searching every user on Jira.
+    """
+
+    _name = "jira.user.directory"
+    _description = "Jira User Directory"
+    _log_access = False
+
+    backend_id = fields.Many2one(
+        comodel_name="jira.backend",
+        required=True,
+        index=True,
+        ondelete="cascade",
+    )
+    key = fields.Char(required=True)
+    name = fields.Char()
+    email = fields.Char()
+
+    @api.model
+    def _refresh(self, backend):
+        """Replace the snapshot of the backend by the users read on Jira"""
+        with backend.work_on("jira.res.users") as work:
+            adapter = work.component(usage="backend.adapter")
+            rows = {
+                user.key: (backend.id, user.key, user.name, user.email)
+                for user in adapter.yield_directory()
+            }
+        cr = self.env.cr
+        cr.execute(
+            "DELETE FROM jira_user_directory WHERE backend_id = %s", (backend.id,)
+        )
+        execute_values(
+            cr._obj,
+            "INSERT INTO jira_user_directory (backend_id, key, name, email) "
+            "VALUES %s",
+            list(rows.values()),
+        )
+        self.invalidate_cache()
+        backend.sudo().user_directory_date = fields.Datetime.now()
+
+    @api.model
+    def _get_index(self, backend):
+        """Return the Jira users by Odoo field and value
+
+        The snapshot is read again from Jira when it is too old. Return
+        a dict ``{odoo field: {lowercase value: [JiraUser]}}``.
+        """
+        backend = backend.sudo()
+        max_date = fields.Datetime.now() - timedelta(seconds=USER_DIRECTORY_TTL)
+        if not backend.user_directory_date or backend.user_directory_date < max_date:
+            self.sudo()._refresh(backend)
+        self.env.cr.execute(
+            "SELECT key, name, email FROM jira_user_directory WHERE backend_id = %s",
+            (backend.id,),
+        )
+        match_fields = self._match_fields()
+        index = defaultdict(lambda: defaultdict(list))
+        for row in self.env.cr.fetchall():
+            jira_user = JiraUser(*row)
+            for odoo_field, jira_fields in match_fields.items():
+                values = {
+                    getattr(jira_user, jira_field).lower()
+                    for jira_field in jira_fields
+                    if getattr(jira_user, jira_field)
+                }
+                for value in values:
+                    index[odoo_field][value].append(jira_user)
+        return index
+
+    @api.model
+    def _match_fields(self):
+        """Fields of the Jira users matched with the fields of Odoo users"""
+        return {"login": ("key", "name"), "email": ("email",)}
+
+
 class ResUsers(models.Model):
     _inherit = "res.users"
 
@@ -41,29 +136,95 @@ class ResUsers(models.Model):
         if not self.jira_bind_ids:
             raise exceptions.UserError(_("No JIRA user could be found"))
 
-    def link_with_jira(self, backends=None, raise_if_mismatch=False):
+    def _jira_users_to_link(self, backend, use_directory=False):
+        """Return the users without binding on the backend
+
+        When the users are matched with the snapshot of the Jira users,
+        the users which did not match recently are excluded.
+        """
+        bindings = (
+            self.env["jira.res.users"]
+            .with_context(active_test=False)
+            .search([("backend_id", "=", backend.id), ("odoo_id", "in", self.ids)])
+        )
+        users = self - bindings.mapped("odoo_id")
+        if not use_directory:
+            return users
+        misses = _user_match_misses.get((self.env.cr.dbname, backend.id), {})
+        now = time.monotonic()
+
+        def missed(user):
+            expiry, fingerprint = misses.get(user.id, (0, None))
+            return expiry > now and fingerprint == user._jira_match_fingerprint(backend)
+
+        return users.filtered(lambda user: not missed(user))
+
+    def _jira_match_fingerprint(self, backend):
+        """Values which invalidate a missed match when they change"""
+        return (backend.sudo().user_directory_date,) + tuple(
+            self[resolve_by] for resolve_by in backend.get_user_resolution_order()
+        )
+
+    def _jira_match_missed(self, backend):
+        misses = _user_match_misses.setdefault((self.env.cr.dbname, backend.id), {})
+        misses[self.id] = (
+            time.monotonic() + USER_MATCH_MISS_TTL,
+            self._jira_match_fingerprint(backend),
+        )
+
+    def _jira_search_user(self, backend, adapter, directory=None):
+        """Search the Jira users matching the user
+
+        Return a tuple (field, value, list of Jira users) for the first
+        field of the resolution order matching Jira users.
+        """
+        self.ensure_one()
+        jira_users = None
+        for resolve_by in backend.get_user_resolution_order():
+            value = self[resolve_by]
+            if directory is not None:
+                jira_users = directory[resolve_by].get((value or "").lower())
+            else:
+                jira_users = adapter.search(fragment=value)
+            if jira_users:
+                break
+        return resolve_by, value, jira_users
+
+    def link_with_jira(
+        self, backends=None, raise_if_mismatch=False, use_directory=None
+    ):
+        """Bind the users with the Jira users having the same login or email
+
+        :param use_directory: match the users with the snapshot of the
+                              Jira users instead of searching each user on
+                              Jira. By default, the snapshot is used for
+                              several users.
+        """
         if backends is None:
             backends = self.env["jira.backend"].search([])
+        if use_directory is None:
+            use_directory = len(self) > 1 and not raise_if_mismatch
         result = {}
         for backend in backends:
             bknd_result = {
                 "success": [],
                 "error": [],
             }
+            directory = None
+            if use_directory:
+                directory = self.env["jira.user.directory"]._get_index(backend)
             with backend.work_on("jira.res.users") as work:
                 binder = work.component(usage="binder")
                 adapter = work.component(usage="backend.adapter")
-                for user in self:
-                    if binder.to_external(user, wrap=True):
-                        continue
-                    jira_user = None
-                    for resolve_by in backend.get_user_resolution_order():
-                        resolve_by_key = resolve_by
-                        resolve_by_value = user[resolve_by]
-                        jira_user = adapter.search(fragment=resolve_by_value)
-                        if jira_user:
-                            break
+                for user in self._jira_users_to_link(backend, use_directory):
+                    (
+                        resolve_by_key,
+                        resolve_by_value,
+                        jira_user,
+                    ) = user._jira_search_user(backend, adapter, directory=directory)
                     if not jira_user:
+                        if use_directory:
+                            user._jira_match_missed(backend)
                         continue
                     elif len(jira_user) > 1:
                         if raise_if_mismatch:
@@ -163,3 +324,31 @@ class UserAdapter(Component):
         )
 
         return users
+
+    _directory_page_size = 1000
+
+    def yield_directory(self):
+        """Generator of all the users of Jira, read by pages
+
+        Yield ``JiraUser`` tuples. The users present in several user
+        directories are yielded several times.
+        """
+        start = 0
+        while True:
+            # "." matches all the users
+            users = self.client.search_users(
+                ".",
+                startAt=start,
+                maxResults=self._directory_page_size,
+                includeActive=True,
+                includeInactive=True,
+            )
+            for user in users:
+                yield JiraUser(
+                    user.key,
+                    getattr(user, "name", None),
+                    getattr(user, "emailAddress", None),
+                )
+            if len(users) < self._directory_page_size:
+                break
+            start += self._directory_page_size
@@ -8,3 +8,7 @@ from . import test_import_task
 from . import test_import_analytic_line
 from . import test_batch_timestamp_import
 from . import test_batch_timestamp_delete
+from . import test_bulk_load_analytic_line
+from . import test_webhook_event
+from . import test_webhook_controller
+from . import test_link_users
@@ -213,3 +213,16 @@ class JiraTransactionComponentCase(TransactionComponentCase):
             delayable = mock.MagicMock(name="DelayableBinding")
             delayable_cls.return_value = delayable
             yield delayable_cls, delayable
+
+    @contextmanager
+    def mock_worklog_complete_read(self):
+        """Do not add the worklogs data of other modules (e.g. Tempo)
+
+        They are not part of the cassettes.
+        """
+        with self.backend_record.work_on("jira.account.analytic.line") as work:
+            adapter = work.component(usage="backend.adapter")
+        with mock.patch.object(
+            type(adapter), "complete_read", side_effect=lambda worklogs: worklogs
+        ):
+            yield
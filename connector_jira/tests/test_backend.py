@@ -1,11 +1,17 @@
 # Copyright 2019 Camptocamp SA
 # License AGPL-3.0 or later (https://www.gnu.org/licenses/agpl.html).
 
+import hashlib
+import hmac
 from datetime import datetime
+from unittest import mock
+
+from werkzeug.test import EnvironBuilder
 
 from odoo import fields
 
 from ..fields import MilliDatetime
+from ..models.jira_backend.common import BACKFILL_CHANNEL
 from .common import JiraTransactionComponentCase
 
 
@@ -119,3 +125,241 @@ class TestBackend(JiraTransactionComponentCase):
                 ),
                 delay_args,
             )
+
+    def test_backfill_shards(self):
+        jira_ts = self.env["jira.backend.timestamp"]._timestamp_for_field(
+            self.backend_record,
+            "import_analytic_line_from_date",
+            "timestamp.batch.importer",
+        )
+        jira_ts._update_timestamp(datetime(2019, 1, 1))
+        shards = jira_ts._create_shards(datetime(2019, 1, 5), 4)
+        self.assertEqual(len(shards), 4)
+        self.assertEqual(jira_ts.shard_ids, shards)
+        self.assertEqual(
+            [(s.last_timestamp, s.until_timestamp) for s in shards],
+            [
+                (datetime(2019, 1, 1), datetime(2019, 1, 2)),
+                (datetime(2019, 1, 2), datetime(2019, 1, 3)),
+                (datetime(2019, 1, 3), datetime(2019, 1, 4)),
+                (datetime(2019, 1, 4), datetime(2019, 1, 5)),
+            ],
+        )
+        self.assertTrue(self.backend_record.backfill_analytic_line_running)
+        self.assertEqual(shards[0]._job_channel(), BACKFILL_CHANNEL)
+        self.assertFalse(jira_ts._job_channel())
+
+    def test_backfill_from_date(self):
+        backend = self.backend_record
+        jira_ts = self.env["jira.backend.timestamp"]._timestamp_for_field(
+            backend,
+            "import_analytic_line_from_date",
+            "timestamp.batch.importer",
+        )
+        jira_ts._update_timestamp(datetime(2019, 1, 1))
+        start = datetime.now()
+        with self.mock_with_delay() as (delayable_cls, delayable):
+            backend.backfill_analytic_line()
+            self.assertEqual(delayable.run_batch_timestamp.call_count, 4)
+            for __, kwargs in delayable_cls.call_args_list:
+                self.assertEqual(kwargs["channel"], BACKFILL_CHANNEL)
+        shards = jira_ts.shard_ids
+        self.assertEqual(len(shards), 4)
+        # the regular synchronization goes on after the backfilled range
+        self.assertGreaterEqual(jira_ts.last_timestamp, start)
+        self.assertEqual(jira_ts.last_timestamp, max(shards.mapped("until_timestamp")))
+
+        with backend.work_on("jira.account.analytic.line") as work:
+            importer = work.component(usage="timestamp.batch.importer")
+        shard = shards[0]
+        worklogs = [{"id": "10100", "issueId": "10000"}]
+        with mock.patch.object(
+            type(importer),
+            "_search",
+            return_value=(shard.until_timestamp, worklogs),
+        ), self.mock_with_delay() as (delayable_cls, delayable):
+            self.env["jira.account.analytic.line"].run_batch_timestamp(backend, shard)
+            # the imports of the shard run on the backfill channel
+            delayable_cls.assert_called_once()
+            self.assertEqual(delayable_cls.call_args[1]["channel"], BACKFILL_CHANNEL)
+            delayable.import_record.assert_called_once_with(
+                backend, "10000", "10100", force=False
+            )
+        # a shard is removed once done, the job of a removed shard does
+        # nothing
+        self.assertFalse(shard.exists())
+        self.assertEqual(jira_ts.shard_ids, shards[1:])
+        self.assertIn(
+            "Nothing to import",
+            self.env["jira.account.analytic.line"].run_batch_timestamp(backend, shard),
+        )
+
+        # the shards whose job failed are retried by the scheduler
+        with self.mock_with_delay() as (delayable_cls, delayable):
+            self.env["jira.backend"]._scheduler_import_analytic_line()
+            shard_calls = [
+                call
+                for call in delayable.run_batch_timestamp.call_args_list
+                if call[0][1].parent_id
+            ]
+            self.assertEqual([call[0][1] for call in shard_calls], list(shards[1:]))
+        backend.cancel_backfill_analytic_line()
+        backend.invalidate_cache()
+        self.assertFalse(backend.backfill_analytic_line_running)
+
+    def test_verify_webhook_request(self):
+        backend = self.backend_record
+        body = b'{"webhookEvent": "jira:issue_updated"}'
+
+        def httprequest(token=None, signature=None):
+            builder = EnvironBuilder(
+                method="POST",
+                query_string={"token": token} if token else None,
+                headers={"X-Hub-Signature": signature} if signature else None,
+                data=body,
+            )
+            return builder.get_request()
+
+        backend.sudo().webhook_secret = "s3cr3t"
+        # no verification configured
+        self.assertFalse(backend._verify_webhook_request(httprequest(token="s3cr3t")))
+
+        backend.webhook_verification = "token"
+        self.assertTrue(backend._verify_webhook_request(httprequest(token="s3cr3t")))
+        self.assertFalse(backend._verify_webhook_request(httprequest(token="wrong")))
+        self.assertFalse(backend._verify_webhook_request(httprequest()))
+
+        backend.webhook_verification = "hmac"
+        digest = hmac.new(b"s3cr3t", body, hashlib.sha256).hexdigest()
+        self.assertTrue(
+            backend._verify_webhook_request(httprequest(signature="sha256=" + digest))
+        )
+        self.assertFalse(
+            backend._verify_webhook_request(httprequest(signature="sha256=0" + digest))
+        )
+        self.assertFalse(backend._verify_webhook_request(httprequest(token="s3cr3t")))
+
+    def test_get_webhook_backend_id(self):
+        backends = self.env["jira.backend"]
+        backend = self.backend_record
+        other = backend.copy({"name": "Other Jira"})
+        self.assertFalse(backends._get_webhook_backend_id("token1"))
+        backend.write({"use_webhooks": True, "webhook_token": "token1"})
+        other.write({"use_webhooks": True, "webhook_token": "token2"})
+        # the cache is invalidated by the writes
+        self.assertEqual(backends._get_webhook_backend_id("token1"), backend.id)
+        self.assertEqual(backends._get_webhook_backend_id("token2"), other.id)
+        self.assertFalse(backends._get_webhook_backend_id("token3"))
+        # the URLs without token are only for the backends without token
+        self.assertFalse(backends._get_webhook_backend_id(None))
+        other.use_webhooks = False
+        self.assertFalse(backends._get_webhook_backend_id("token2"))
+        self.assertFalse(backends._get_webhook_backend_id(None))
+
+    def test_get_webhook_backend_id_legacy(self):
+        backends = self.env["jira.backend"]
+        legacy = self.backend_record
+        tokenized = legacy.copy({"name": "Other Jira"})
+        legacy.write({"use_webhooks": True, "webhook_token": False})
+        tokenized.write({"use_webhooks": True, "webhook_token": "token1"})
+        # the webhooks installed before the tokens go to the legacy backend
+        self.assertEqual(backends._get_webhook_backend_id(None), legacy.id)
+        self.assertEqual(backends._get_webhook_backend_id("token1"), tokenized.id)
+        # the cache is invalidated when the legacy backend gets a token
+        legacy.webhook_token = "token2"
+        self.assertFalse(backends._get_webhook_backend_id(None))
+        self.assertEqual(backends._get_webhook_backend_id("token2"), legacy.id)
+        # or when its webhooks are removed
+        legacy.write({"webhook_token": False})
+        self.assertEqual(backends._get_webhook_backend_id(None), legacy.id)
+        legacy.use_webhooks = False
+        self.assertFalse(backends._get_webhook_backend_id(None))
+
+    def test_webhook_issue_jql(self):
+        backend = self.backend_record
+        issue_types = self.env["jira.issue.type"]
+        for external_id, name in (("1", "Bug"), ("2", "Story"), ("3", "Epic")):
+            issue_types |= issue_types.create(
+                {"name": name, "backend_id": backend.id, "external_id": external_id}
+            )
+        bug, story, epic = issue_types
+        # no project linked: the JQL must match no issue, an empty JQL
+        # would match all of them
+        self.assertEqual(backend._webhook_issue_jql(), "project = -1")
+        projects = self.env["project.project"].create(
+            [{"name": "Jira Project {}".format(i)} for i in range(3)]
+        )
+        self._create_project_binding(
+            projects[0], issue_types=bug + story, external_id="10000"
+        )
+        self._create_project_binding(
+            projects[1], issue_types=story + bug, external_id="10001"
+        )
+        binding = self._create_project_binding(
+            projects[2], issue_types=epic, external_id="10002"
+        )
+        self.assertEqual(
+            backend._webhook_issue_jql(),
+            "(project in (10000, 10001) AND issuetype in (1, 2)) OR "
+            "(project in (10002) AND issuetype in (3))",
+        )
+        backend.write({"use_webhooks": True, "webhook_issue_jira_id": "5"})
+        with self.mock_with_delay() as (delayable_cls, delayable):
+            binding.sync_issue_type_ids = False
+            # the webhook is updated in a job
+            delayable._update_webhook_jql.assert_called_once_with()
+        self.assertEqual(
+            backend._webhook_issue_jql(),
+            "(project in (10000, 10001) AND issuetype in (1, 2))",
+        )
+        with self.mock_with_delay():
+            self.env["jira.project.project"].search(
+                [("backend_id", "=", backend.id)]
+            ).sync_issue_type_ids = False
+        self.assertEqual(backend._webhook_issue_jql(), "project = -1")
+
+    def test_webhook_event_relevant(self):
+        backend = self.backend_record
+        bug = self.env["jira.issue.type"].create(
+            {"name": "Bug", "backend_id": backend.id, "external_id": "1"}
+        )
+        project = self.env["project.project"].create({"name": "Jira Project"})
+
+        def issue(project_id, issue_type_id):
+            return {
+                "id": "10100",
+                "fields": {
+                    "project": {"id": project_id},
+                    "issuetype": {"id": issue_type_id},
+                },
+            }
+
+        task_model = "jira.project.task"
+        worklog_model = "jira.account.analytic.line"
+        self.assertFalse(
+            backend._is_webhook_event_relevant(task_model, issue("1", "1"))
+        )
+        # the binding invalidates the cache
+        self._create_project_binding(project, issue_types=bug, external_id="10000")
+        self.assertTrue(
+            backend._is_webhook_event_relevant(task_model, issue("10000", "1"))
+        )
+        self.assertFalse(
+            backend._is_webhook_event_relevant(task_model, issue("10000", "2"))
+        )
+        self.assertFalse(
+            backend._is_webhook_event_relevant(task_model, issue("10001", "1"))
+        )
+        # nothing to check without the issue
+        self.assertTrue(backend._is_webhook_event_relevant(task_model, None))
+        # the worklogs are attached to the parent of the issue
+        self.assertTrue(
+            backend._is_webhook_event_relevant(worklog_model, issue("10000", "2"))
+        )
+        self.assertFalse(
+            backend._is_webhook_event_relevant(worklog_model, issue("10001", "1"))
+        )
+        backend.worklog_fallback_project_id = project
+        self.assertTrue(
+            backend._is_webhook_event_relevant(worklog_model, issue("10001", "1"))
+        )
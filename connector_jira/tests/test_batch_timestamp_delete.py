@@ -35,41 +35,51 @@ class TestBatchTimestampDelete(JiraTransactionComponentCase):
         since_date = "2019-04-05 00:00:00.000"
         jira_ts._update_timestamp(since_date)
 
+        # Jira WS returns 2 worklog ids to delete here (10103 and 10104),
+        # only 10103 has been imported in Odoo
+        line = self.env["account.analytic.line"].create(
+            {
+                "project_id": self.project.id,
+                "amount": 30.0,
+                "date": "2019-04-08",
+                "name": "A worklog that will be deleted",
+                "user_id": self.env.user.id,
+            }
+        )
+        binding = self._create_analytic_line_binding(
+            line,
+            jira_issue_id="10101",
+            external_id="10103",
+        )
+        other_line = self.env["account.analytic.line"].create(
+            {
+                "project_id": self.project.id,
+                "amount": 10.0,
+                "date": "2019-04-08",
+                "name": "A worklog that is kept",
+                "user_id": self.env.user.id,
+            }
+        )
+        other_binding = self._create_analytic_line_binding(
+            other_line,
+            jira_issue_id="10101",
+            external_id="10105",
+        )
+
         with self.mock_with_delay() as (delayable_cls, delayable):
-            self.env["jira.account.analytic.line"].run_batch_timestamp(
+            result = self.env["jira.account.analytic.line"].run_batch_timestamp(
                 self.backend_record,
                 jira_ts,
             )
-            # Jira WS returns 2 worklog ids to delete here, we expect to have 2
-            # jobs delayed
-            number_of_worklogs = 2
-            self.assertEqual(delayable_cls.call_count, number_of_worklogs)
-            # arguments passed in 'with_delay()'
-            delay_args, delay_kwargs = delayable_cls.call_args
-            self.assertEqual(
-                (self.env["jira.account.analytic.line"],),
-                delay_args,
-            )
+            # the lines are deleted in the batch job, no job is delayed
+            self.assertEqual(delayable_cls.call_count, 0)
 
-            # Job method called after 'with_delay()'.
-            self.assertEqual(delayable.delete_record.call_count, number_of_worklogs)
-            delay_args = delayable.delete_record.call_args_list
-            expected = [
-                # backend, issue_id
-                (
-                    (self.backend_record, 10103),
-                    {"only_binding": False, "set_inactive": False},
-                ),
-                (
-                    (self.backend_record, 10104),
-                    {"only_binding": False, "set_inactive": False},
-                ),
-            ]
-            self.assertEqual(
-                sorted((args, kwargs) for args, kwargs in delay_args),
-                sorted(expected),
-            )
-            # the lines would actually be deleted by the 'delete_record' jobs
+        self.assertFalse(binding.exists())
+        self.assertFalse(line.exists())
+        self.assertTrue(other_binding.exists())
+        self.assertTrue(other_line.exists())
+        self.assertIn("deleted 1 worklogs", result)
+        self.assertIn("ignored 1 worklogs", result)
 
         # For worklogs, Jira returns the youngest timestamp of the worklogs
         # returned by the "deleted since" method, so the next time we look for
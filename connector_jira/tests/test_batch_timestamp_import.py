@@ -86,7 +86,10 @@ class TestBatchTimestampImport(JiraTransactionComponentCase):
         )
         since_date = "2019-04-05 00:00:00.000"
         jira_ts._update_timestamp(since_date)
-        with self.mock_with_delay() as (delayable_cls, delayable):
+        with self.mock_worklog_complete_read(), self.mock_with_delay() as (
+            delayable_cls,
+            delayable,
+        ):
             self.env["jira.account.analytic.line"].run_batch_timestamp(
                 self.backend_record,
                 jira_ts,
@@ -107,14 +110,17 @@ class TestBatchTimestampImport(JiraTransactionComponentCase):
             delay_args = delayable.import_record.call_args_list
             expected = [
                 # backend, issue_id, worklog_id
-                ((self.backend_record, "10102", "10100"), {"force": False}),
-                ((self.backend_record, "10100", "10102"), {"force": False}),
-                ((self.backend_record, "10101", "10101"), {"force": False}),
+                (self.backend_record, "10102", "10100"),
+                (self.backend_record, "10100", "10102"),
+                (self.backend_record, "10101", "10101"),
             ]
             self.assertEqual(
-                sorted((args, kwargs) for args, kwargs in delay_args),
+                sorted(args for args, kwargs in delay_args),
                 sorted(expected),
             )
+            for args, kwargs in delay_args:
+                # only the ids are given, the job reads the worklog
+                self.assertEqual(kwargs, {"force": False})
 
         # For worklogs, Jira returns the youngest timestamp of
         # the worklogs returned by the "updated since" method, so the
@@ -123,3 +129,25 @@ class TestBatchTimestampImport(JiraTransactionComponentCase):
         self.assertEqual(
             jira_ts.last_timestamp, datetime(2019, 4, 8, 12, 32, 19, 311000)
         )
+
+    def test_import_batch_analytic_line_grouped_by_issue(self):
+        """Worklogs of the same issue are imported by a single job"""
+        records = [
+            {"id": "10100", "issueId": "10102"},
+            {"id": "10101", "issueId": "10101"},
+            {"id": "10102", "issueId": "10102"},
+        ]
+        with self.backend_record.work_on("jira.account.analytic.line") as work:
+            importer = work.component(usage="timestamp.batch.importer")
+            with self.mock_with_delay() as (delayable_cls, delayable):
+                count = importer._handle_records(records)
+                self.assertEqual(count, 3)
+                self.assertEqual(delayable_cls.call_count, 2)
+                delayable.import_record.assert_called_once_with(
+                    self.backend_record, "10101", "10101", force=False
+                )
+                # the data of the worklogs are read again by the job, in
+                # one call for the issue
+                delayable.import_issue_worklogs.assert_called_once_with(
+                    self.backend_record, "10102", ["10100", "10102"], force=False
+                )
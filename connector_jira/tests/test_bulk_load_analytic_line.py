@@ -0,0 +1,97 @@
+# Copyright 2026 Camptocamp SA
+# License AGPL-3.0 or later (https://www.gnu.org/licenses/agpl.html).
+
+from datetime import date
+
+from ..models.account_analytic_line.importer import IssueLinks
+from .test_import_analytic_line import TestImportWorklogBase
+
+
+class TestBulkLoadAccountAnalyticLine(TestImportWorklogBase):
+    def _worklog(self, worklog_id, **values):
+        worklog = {
+            "id": worklog_id,
+            "issueId": "10000",
+            "comment": "write tests",
+            "started": "2019-04-04T09:00:00.000+0200",
+            "updated": "2019-04-04T10:00:00.000+0200",
+            "timeSpentSeconds": 3600,
+            "author": {
+                "key": "gbaconnier",
+                "emailAddress": "gbaconnier@example.com",
+                "timeZone": "Europe/Zurich",
+            },
+        }
+        worklog.update(values)
+        return worklog
+
+    def test_bulk_load_worklogs(self):
+        task_binding = self._create_task_binding(self.task, external_id="10000")
+        issue = {
+            "id": "10000",
+            "key": "TEST-1",
+            "fields": {
+                "issuetype": {"id": self.epic_issue_type.external_id},
+                "project": {"id": "10000"},
+            },
+        }
+        existing = self._worklog("10002")
+        with self.mock_worklog_complete_read(), self.backend_record.work_on(
+            "jira.account.analytic.line"
+        ) as work:
+            # the issue is already known, no call to Jira
+            loader = work.component(usage="bulk.loader")
+            loader._issues["10000"] = (issue, IssueLinks(task_binding, None, None))
+            loader.run([existing])
+            stats = loader.run(
+                [
+                    self._worklog("10000"),
+                    self._worklog("10001", comment="more tests"),
+                    existing,
+                ],
+                chunk_size=2,
+            )
+        self.assertEqual(stats["loaded"], 2)
+        self.assertEqual(stats["existing"], 1)
+        bindings = self.env["jira.account.analytic.line"].search(
+            [
+                ("backend_id", "=", self.backend_record.id),
+                ("external_id", "in", ["10000", "10001"]),
+            ],
+            order="external_id",
+        )
+        self.assertRecordValues(
+            bindings,
+            [
+                {
+                    "account_id": self.project.analytic_account_id.id,
+                    "date": date(2019, 4, 4),
+                    "employee_id": self.env.user.employee_ids[0].id,
+                    "external_id": "10000",
+                    "jira_issue_id": "10000",
+                    "jira_issue_key": "TEST-1",
+                    "jira_issue_type_id": self.epic_issue_type.id,
+                    "name": "write tests",
+                    "project_id": self.project.id,
+                    "task_id": self.task.id,
+                    "unit_amount": 1.0,
+                    "user_id": self.env.user.id,
+                },
+                {
+                    "account_id": self.project.analytic_account_id.id,
+                    "date": date(2019, 4, 4),
+                    "employee_id": self.env.user.employee_ids[0].id,
+                    "external_id": "10001",
+                    "jira_issue_id": "10000",
+                    "jira_issue_key": "TEST-1",
+                    "jira_issue_type_id": self.epic_issue_type.id,
+                    "name": "more tests",
+                    "project_id": self.project.id,
+                    "task_id": self.task.id,
+                    "unit_amount": 1.0,
+                    "user_id": self.env.user.id,
+                },
+            ],
+        )
+        # stored Jira references updated on the lines in bulk
+        self.assertEqual(bindings.odoo_id.mapped("jira_issue_key"), ["TEST-1"] * 2)
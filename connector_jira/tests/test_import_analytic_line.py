@@ -3,6 +3,9 @@
 # License AGPL-3.0 or later (https://www.gnu.org/licenses/agpl.html).
 
 from datetime import date, timedelta
+from unittest import mock
+
+from odoo.addons.connector.exception import MappingError
 
 from .common import JiraTransactionComponentCase, recorder
 
@@ -229,3 +232,58 @@ class TestImportAccountAnalyticLine(TestImportWorklogBase):
                 }
             ],
         )
+
+    def test_search_read_requested_worklogs(self):
+        """Only the requested worklogs of an issue are completed"""
+        with self.backend_record.work_on("jira.account.analytic.line") as work:
+            adapter = work.component(usage="backend.adapter")
+            adapter._client = mock.Mock(name="client")
+            adapter._client.worklogs.return_value = [
+                mock.Mock(raw={"id": worklog_id}) for worklog_id in ("1", "2", "3")
+            ]
+            with mock.patch.object(
+                type(adapter), "complete_read", side_effect=lambda worklogs: worklogs
+            ) as complete_read:
+                worklogs = adapter.search_read("10000", worklog_ids=[2, "3"])
+        self.assertEqual(worklogs, [{"id": "2"}, {"id": "3"}])
+        complete_read.assert_called_once_with([{"id": "2"}, {"id": "3"}])
+
+    def _run_issue_worklogs(self, error):
+        """Import 2 worklogs of an issue, the first one raising ``error``"""
+        with self.backend_record.work_on("jira.account.analytic.line") as work:
+            importer = work.component(usage="issue.worklogs.importer")
+            record_importer = work.component(usage="record.importer")
+        worklogs = {"10100": {"id": "10100"}, "10101": {"id": "10101"}}
+
+        def run(self_, external_id, **kwargs):
+            if external_id == "10100":
+                raise error
+
+        with mock.patch.object(
+            type(importer),
+            "_read_issue_worklogs",
+            return_value=({"id": "10000"}, worklogs),
+        ), mock.patch.object(
+            type(record_importer), "run", autospec=True, side_effect=run
+        ) as run_mock, self.mock_with_delay() as (
+            __,
+            delayable,
+        ):
+            try:
+                importer.run("10000", ["10100", "10101"])
+            finally:
+                self.run_count = run_mock.call_count
+            return delayable
+
+    def test_import_issue_worklogs_errors(self):
+        """Only the expected errors of a worklog get their own job"""
+        delayable = self._run_issue_worklogs(MappingError("No user found"))
+        # the other worklog is imported
+        self.assertEqual(self.run_count, 2)
+        delayable.import_record.assert_called_once_with(
+            self.backend_record, "10000", "10100", force=False
+        )
+        # a programming error fails the job
+        with self.assertRaises(KeyError):
+            self._run_issue_worklogs(KeyError("id"))
+        self.assertEqual(self.run_count, 1)
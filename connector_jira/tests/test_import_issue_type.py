@@ -15,6 +15,25 @@ class TestImportIssueType(JiraTransactionComponentCase):
         issue_types = self.env["jira.issue.type"].search([])
         self.assertEqual(len(issue_types), 5)
 
+    @recorder.use_cassette("test_import_issue_type_batch.yaml")
+    def test_import_issue_type_batch_update(self):
+        """Existing issue types are updated, the others created"""
+        task_type = self.env["jira.issue.type"].create(
+            {
+                "name": "Old Task",
+                "backend_id": self.backend_record.id,
+                "external_id": "10002",
+            }
+        )
+        with self.backend_record.work_on("jira.issue.type") as work:
+            importer = work.component(usage="batch.importer")
+            created, updated = importer.run()
+            self.assertEqual((created, updated), (4, 1))
+        self.assertEqual(task_type.name, "Task")
+        self.assertEqual(task_type.description, "A task that needs to be done.")
+        issue_types = self.env["jira.issue.type"].search([])
+        self.assertEqual(len(issue_types), 5)
+
     def test_import_is_issue_type_sync(self):
         self._create_issue_type_bindings()
 
@@ -2,8 +2,12 @@
 # Copyright 2019 Brainbean Apps (https://brainbeanapps.com)
 # License AGPL-3.0 or later (https://www.gnu.org/licenses/agpl.html).
 
+from datetime import datetime
+from unittest import mock
+
 from odoo import exceptions
 
+from ..models.project_task.importer import epic_cache
 from .common import JiraTransactionComponentCase, recorder
 
 
@@ -22,6 +26,11 @@ class TestImportTask(JiraTransactionComponentCase):
             {"name": "To Do", "sequence": 1, "project_ids": [(4, cls.project.id)]}
         )
 
+    def setUp(self):
+        super().setUp()
+        epic_cache.clear()
+        self.addCleanup(epic_cache.clear)
+
     @recorder.use_cassette
     def test_import_task_epic(self):
         """
@@ -141,3 +150,367 @@ class TestImportTask(JiraTransactionComponentCase):
             self.env["project.task"].create(
                 {"name": "My task", "project_id": self.project.id}
             )
+
+    def test_stage_lookup_cache(self):
+        stages = self.env["project.task.type"]
+        project = self.project
+        todo = stages.search([("name", "=", "To Do"), ("project_ids", "=", project.id)])
+        self.assertEqual(
+            stages._get_jira_stage_ids_by_name(project.id), {"To Do": todo.id}
+        )
+        # the cache is invalidated when the stages change
+        done = stages.create({"name": "Done", "project_ids": [(4, project.id)]})
+        self.assertEqual(
+            stages._get_jira_stage_ids_by_name(project.id),
+            {"To Do": todo.id, "Done": done.id},
+        )
+        done.name = "Closed"
+        self.assertEqual(
+            stages._get_jira_stage_ids_by_name(project.id),
+            {"To Do": todo.id, "Closed": done.id},
+        )
+        # or when the stages of the project change
+        project.type_ids = [(3, done.id)]
+        self.assertEqual(
+            stages._get_jira_stage_ids_by_name(project.id), {"To Do": todo.id}
+        )
+        # the stages of no project do not invalidate the caches
+        registry_cls = type(self.env.registry)
+        with mock.patch.object(registry_cls, "_clear_cache") as clear_cache:
+            other = stages.create({"name": "Other"})
+            other.name = "Another"
+            other.unlink()
+            done.sequence = 50
+            self.assertFalse(clear_cache.called)
+
+    def test_epic_cache(self):
+        epic = {
+            "id": "10000",
+            "key": "TEST-1",
+            "fields": {"updated": "2019-04-04T09:31:27.779+0000"},
+        }
+        reads = []
+
+        def read(adapter, id_, fields=None, rendered=True):
+            reads.append(fields)
+            if fields:
+                return {"id": "10000", "key": "TEST-1", "fields": epic["fields"]}
+            return dict(epic, renderedFields={})
+
+        def read_epic():
+            with self.backend_record.work_on("jira.project.task") as work:
+                adapter = work.component(usage="backend.adapter")
+                importer = work.component(usage="record.importer")
+                with mock.patch.object(
+                    type(adapter), "read", autospec=True, side_effect=read
+                ):
+                    jira_epic = importer._read_epic("TEST-1")
+                return jira_epic, importer.jira_epic_uptodate
+
+        # unknown epic: fully read and cached
+        jira_epic, uptodate = read_epic()
+        self.assertEqual(reads, [None])
+        self.assertIn("renderedFields", jira_epic)
+        self.assertFalse(uptodate)
+        # cached epic: only its update date is read
+        reads.clear()
+        jira_epic, uptodate = read_epic()
+        self.assertEqual(reads, ["updated"])
+        self.assertIn("renderedFields", jira_epic)
+        self.assertFalse(uptodate)
+        # the epic has been updated on Jira, the cache is outdated
+        reads.clear()
+        epic["fields"] = {"updated": "2019-04-05T10:00:00.000+0000"}
+        jira_epic, uptodate = read_epic()
+        self.assertEqual(reads, ["updated", None])
+        self.assertFalse(uptodate)
+        # bound and up-to-date epic: the import of the epic is skipped
+        reads.clear()
+        task = self.env["project.task"].create(
+            {"name": "Epic", "project_id": self.project.id}
+        )
+        self._create_task_binding(
+            task,
+            jira_key="TEST-1",
+            external_id="10000",
+            jira_updated_at=datetime(2019, 4, 5, 10, 0),
+        )
+        jira_epic, uptodate = read_epic()
+        self.assertEqual(reads, ["updated"])
+        self.assertNotIn("renderedFields", jira_epic)
+        self.assertTrue(uptodate)
+        # bound but outdated epic, not cached: a single read, its payload
+        # is given to the import of the epic
+        reads.clear()
+        epic_cache.clear()
+        epic["fields"] = {"updated": "2019-04-06T10:00:00.000+0000"}
+        jira_epic, uptodate = read_epic()
+        self.assertEqual(reads, [None])
+        self.assertIn("renderedFields", jira_epic)
+        self.assertFalse(uptodate)
+        # bound and up-to-date epic, not cached
+        reads.clear()
+        epic_cache.clear()
+        epic["fields"] = {"updated": "2019-04-04T09:31:27.779+0000"}
+        jira_epic, uptodate = read_epic()
+        self.assertEqual(reads, [None])
+        self.assertTrue(uptodate)
+
+    @recorder.use_cassette("test_import_task_parents.yaml")
+    def test_import_task_parents_deferred(self):
+        """The dependencies deeper than the configured depth are deferred"""
+        self._create_project_binding(
+            self.project,
+            issue_types=(
+                self.epic_issue_type + self.task_issue_type + self.subtask_issue_type
+            ),
+            external_id="10000",
+        )
+        self.backend_record.import_dependency_depth = 1
+        jobs = self.env["queue.job"]
+        existing_jobs = jobs.search([])
+
+        jira_subtask_issue_id = "10002"
+        result = self.env["jira.project.task"].import_record(
+            self.backend_record, jira_subtask_issue_id
+        )
+        self.assertIn("deferred", result)
+        # the parent task is imported directly, but not its epic: the
+        # parent and the subtask are imported after the epic
+        self.assertFalse(
+            self.env["jira.project.task"].search(
+                [("backend_id", "=", self.backend_record.id)]
+            )
+        )
+        new_jobs = jobs.search([("id", "not in", existing_jobs.ids)])
+        self.assertEqual(len(new_jobs), 3)
+        epic_job = new_jobs.filtered(lambda job: job.args[1] == "10000")
+        parent_job = new_jobs.filtered(lambda job: job.args[1] == "10001")
+        subtask_job = new_jobs.filtered(lambda job: job.args[1] == "10002")
+        self.assertEqual(epic_job.state, "pending")
+        self.assertEqual(parent_job.state, "wait_dependencies")
+        self.assertEqual(subtask_job.state, "wait_dependencies")
+        self.assertEqual(parent_job.dependencies["depends_on"], [epic_job.uuid])
+        self.assertEqual(subtask_job.dependencies["depends_on"], [parent_job.uuid])
+
+    def test_task_binding_fields(self):
+        tasks = self.env["project.task"].create(
+            [
+                {"name": name, "project_id": self.project.id}
+                for name in ("Epic", "Task", "Subtask")
+            ]
+        )
+        epic, task, subtask = tasks
+        epic_binding = self._create_task_binding(
+            epic,
+            jira_key="TEST-1",
+            external_id="10000",
+            jira_issue_type_id=self.epic_issue_type.id,
+        )
+        task_binding = self._create_task_binding(
+            task,
+            jira_key="TEST-2",
+            external_id="10001",
+            jira_issue_type_id=self.task_issue_type.id,
+            jira_epic_link_id=epic_binding.id,
+        )
+        self._create_task_binding(
+            subtask,
+            jira_key="TEST-3",
+            external_id="10002",
+            jira_issue_type_id=self.subtask_issue_type.id,
+            jira_parent_id=task_binding.id,
+        )
+        self.assertRecordValues(
+            tasks,
+            [
+                {
+                    "jira_compound_key": "TEST-1",
+                    "jira_issue_type": "Epic",
+                    "jira_epic_link_task_id": False,
+                    "jira_parent_task_id": False,
+                },
+                {
+                    "jira_compound_key": "TEST-2",
+                    "jira_issue_type": "Task",
+                    "jira_epic_link_task_id": epic.id,
+                    "jira_parent_task_id": False,
+                },
+                {
+                    "jira_compound_key": "TEST-3",
+                    "jira_issue_type": "Sub-task",
+                    "jira_epic_link_task_id": False,
+                    "jira_parent_task_id": task.id,
+                },
+            ],
+        )
+        # recomputed when the bindings change
+        task_binding.jira_key = "TEST-20"
+        self.subtask_issue_type.name = "Subtask"
+        self.assertEqual(task.jira_compound_key, "TEST-20")
+        self.assertEqual(subtask.jira_issue_type, "Subtask")
+        self.assertEqual(
+            self.env["project.task"].search([("jira_compound_key", "=", "TEST-20")]),
+            task,
+        )
+
+    def test_name_search_jira_key(self):
+        tasks = self.env["project.task"].create(
+            [
+                {"name": name, "project_id": self.project.id}
+                for name in ("Epic", "Task", "Other", "Test plan")
+            ]
+        )
+        epic, task, other, plan = tasks
+        self._create_task_binding(epic, jira_key="TEST-1", external_id="10000")
+        self._create_task_binding(task, jira_key="TEST-12", external_id="10001")
+        task_model = self.env["project.task"]
+        domain = [("project_id", "=", self.project.id)]
+
+        def search(name, operator="ilike", limit=100):
+            return [
+                task_id
+                for task_id, __ in task_model.name_search(
+                    name, args=domain, operator=operator, limit=limit
+                )
+            ]
+
+        # by key prefix, whatever the case
+        self.assertEqual(set(search("test-1")), {epic.id, task.id})
+        self.assertEqual(search("TEST-12"), [task.id])
+        # the other names are still searched by the standard name search
+        self.assertEqual(search("oth"), [other.id])
+        self.assertEqual(search("Task"), [task.id])
+        self.assertEqual(search("st pl"), [plan.id])
+        # the keys first, then the names
+        self.assertEqual(set(search("test")), {epic.id, task.id, plan.id})
+        self.assertEqual(search("test")[-1], plan.id)
+        self.assertEqual(set(search("test", limit=2)), {epic.id, task.id})
+        self.assertEqual(
+            set(search("TEST-1", operator="not ilike")), {other.id, plan.id}
+        )
+
+    def test_task_description_lazy(self):
+        self._create_project_binding(
+            self.project, issue_types=self.task_issue_type, external_id="10000"
+        )
+        self.backend_record.task_description_mode = "lazy"
+        issue = {
+            "id": "10001",
+            "key": "TEST-2",
+            "fields": {
+                "summary": "Task1",
+                "description": "h1. Title",
+                "issuetype": {"id": self.task_issue_type.external_id},
+                "project": {"id": "10000"},
+                "updated": "2019-04-04T09:31:27.779+0000",
+                "assignee": None,
+                "duedate": None,
+            },
+        }
+        task_model = self.env["jira.project.task"]
+        # the task is imported without its description, loaded by a job
+        with self.mock_with_delay() as (delayable_cls, delayable):
+            task_model.import_record(self.backend_record, "10001", record=issue)
+        binding = task_model.search(
+            [
+                ("backend_id", "=", self.backend_record.id),
+                ("external_id", "=", "10001"),
+            ]
+        )
+        self.assertEqual(binding.name, "Task1")
+        self.assertFalse(binding.description)
+        self.assertFalse(binding.jira_description_hash)
+        self.assertEqual(delayable_cls.call_count, 1)
+        self.assertEqual(delayable_cls.call_args[0][0], binding)
+        delayable.import_description.assert_called_once_with()
+
+        with self.backend_record.work_on("jira.project.task") as work:
+            adapter = work.component(usage="backend.adapter")
+        rendered_issue = {
+            "id": "10001",
+            "key": "TEST-2",
+            "fields": {"description": "h1. Title"},
+            "renderedFields": {"description": "<h1>Title</h1>"},
+        }
+        with mock.patch.object(type(adapter), "read", return_value=rendered_issue):
+            binding.import_description()
+        self.assertEqual(binding.description, "<h1>Title</h1>")
+        self.assertTrue(binding.jira_description_hash)
+
+        # the description did not change, it is not loaded again
+        with self.mock_with_delay() as (delayable_cls, delayable):
+            task_model.import_record(
+                self.backend_record, "10001", force=True, record=issue
+            )
+        self.assertFalse(delayable_cls.called)
+        self.assertEqual(binding.description, "<h1>Title</h1>")
+
+    def test_task_incremental_update(self):
+        self._create_project_binding(
+            self.project, issue_types=self.task_issue_type, external_id="10000"
+        )
+        done = self.env["project.task.type"].create(
+            {"name": "Done", "project_ids": [(4, self.project.id)]}
+        )
+        issue = {
+            "id": "10001",
+            "key": "TEST-2",
+            "fields": {
+                "summary": "Task1",
+                "description": None,
+                "issuetype": {"id": self.task_issue_type.external_id},
+                "project": {"id": "10000"},
+                "status": {"name": "To Do"},
+                "updated": "2019-04-04T09:31:27.779+0000",
+                "assignee": None,
+                "duedate": None,
+            },
+        }
+        task_model = self.env["jira.project.task"]
+        task_model.import_record(self.backend_record, "10001", record=issue)
+        binding = task_model.search(
+            [
+                ("backend_id", "=", self.backend_record.id),
+                ("external_id", "=", "10001"),
+            ]
+        )
+        self.assertEqual(binding.name, "Task1")
+
+        self.backend_record.task_incremental_update = True
+        # only the status changed since the last import: the unknown
+        # assignee is neither mapped nor imported
+        updated_issue = dict(
+            issue,
+            fields=dict(
+                issue["fields"],
+                summary="Renamed",
+                status={"name": "Done"},
+                updated="2019-04-05T10:00:00.000+0000",
+                assignee={"key": "unknown", "emailAddress": "unknown@example.com"},
+            ),
+            changelog={
+                "total": 2,
+                "histories": [
+                    {
+                        "created": "2019-04-04T09:31:27.779+0000",
+                        "items": [{"field": "summary", "fieldtype": "jira"}],
+                    },
+                    {
+                        "created": "2019-04-05T10:00:00.000+0000",
+                        "items": [{"field": "status", "fieldtype": "jira"}],
+                    },
+                ],
+            },
+        )
+        with self.backend_record.work_on("jira.project.task") as work:
+            adapter = work.component(usage="backend.adapter")
+        with mock.patch.object(
+            type(adapter), "read", return_value=updated_issue
+        ) as read:
+            task_model.import_record(self.backend_record, "10001")
+        self.assertTrue(read.call_args[1]["changelog"])
+        self.assertEqual(binding.stage_id, done)
+        self.assertEqual(binding.name, "Task1")
+        self.assertFalse(binding.user_ids)
+        self.assertEqual(binding.jira_updated_at, datetime(2019, 4, 5, 10, 0))
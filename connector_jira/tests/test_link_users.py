@@ -0,0 +1,72 @@
+# Copyright 2026 Camptocamp SA
+# License AGPL-3.0 or later (https://www.gnu.org/licenses/agpl.html).
+
+from unittest import mock
+
+from odoo import fields
+
+from ..models.res_users import common as res_users_common
+from .common import JiraTransactionComponentCase
+
+
+class TestLinkUsers(JiraTransactionComponentCase):
+    def setUp(self):
+        super().setUp()
+        res_users_common._user_match_misses.clear()
+        self.backend_record.sudo().user_directory_date = fields.Datetime.now()
+        self.env["jira.user.directory"].create(
+            [
+                {
+                    "backend_id": self.backend_record.id,
+                    "key": key,
+                    "name": key,
+                    "email": email,
+                }
+                for key, email in (
+                    ("jdoe", "john.doe@example.com"),
+                    ("jsmith", "jane@example.com"),
+                    ("homonym1", "same@example.com"),
+                    ("homonym2", "same@example.com"),
+                )
+            ]
+        )
+        users = self.env["res.users"]
+        self.john, self.jane, self.same, self.nobody = users.create(
+            [
+                {"name": "John", "login": "jdoe", "email": "other@example.com"},
+                {"name": "Jane", "login": "jane", "email": "Jane@example.com"},
+                {"name": "Same", "login": "same", "email": "same@example.com"},
+                {"name": "Nobody", "login": "nobody", "email": "no@example.com"},
+            ]
+        )
+        self.users = self.john + self.jane + self.same + self.nobody
+
+    def test_link_with_directory(self):
+        backend = self.backend_record
+        with mock.patch.object(
+            type(self.env["jira.user.directory"]), "_refresh"
+        ) as refresh:
+            result = self.users.link_with_jira(backends=backend)
+            # the snapshot is recent, no call to Jira
+            refresh.assert_not_called()
+        self.assertEqual(self.john.jira_bind_ids.external_id, "jdoe")
+        # matched by email
+        self.assertEqual(self.jane.jira_bind_ids.external_id, "jsmith")
+        self.assertFalse(self.same.jira_bind_ids)
+        self.assertFalse(self.nobody.jira_bind_ids)
+        self.assertEqual(
+            [error["error"] for error in result[backend]["error"]],
+            ["multiple_found"],
+        )
+
+        # the bound users and the recent misses are not evaluated again
+        users_to_link = self.users._jira_users_to_link(backend, use_directory=True)
+        self.assertEqual(users_to_link, self.same)
+
+        # a miss is evaluated again when the user changes
+        self.nobody.login = "jnobody"
+        self.env["jira.user.directory"].create(
+            {"backend_id": backend.id, "key": "jnobody", "name": "jnobody"}
+        )
+        self.users.link_with_jira(backends=backend)
+        self.assertEqual(self.nobody.jira_bind_ids.external_id, "jnobody")
@@ -0,0 +1,115 @@
+# Copyright 2026 Camptocamp SA
+# License AGPL-3.0 or later (https://www.gnu.org/licenses/agpl.html).
+
+import json
+from unittest import mock
+
+from werkzeug.test import EnvironBuilder
+
+from ..controllers.main import JiraWebhookController
+from .common import JiraTransactionComponentCase
+
+# body of an issue webhook, as sent by Jira
+ISSUE_UPDATED_BODY = {
+    "timestamp": 1769068800000,
+    "webhookEvent": "jira:issue_updated",
+    "issue_event_type_name": "issue_generic",
+    "user": {
+        "self": "http://jira:8080/rest/api/2/user?username=admin",
+        "name": "admin",
+        "key": "admin",
+        "displayName": "Admin",
+    },
+    "issue": {
+        "id": "10000",
+        "self": "http://jira:8080/rest/api/2/issue/10000",
+        "key": "TEST-1",
+        "fields": {
+            "summary": "Task 1",
+            "description": "The *description*",
+            "issuetype": {"id": "1", "name": "Bug", "subtask": False},
+            "project": {"id": "10000", "key": "TEST", "name": "Test"},
+            "assignee": None,
+            "parent": None,
+            "status": {"id": "10000", "name": "To Do"},
+            "created": "2026-01-20T10:00:00.000+0000",
+            "updated": "2026-01-22T08:00:00.000+0000",
+        },
+    },
+    "changelog": {
+        "id": "10100",
+        "items": [
+            {
+                "field": "summary",
+                "fieldtype": "jira",
+                "from": None,
+                "fromString": "Task",
+                "to": None,
+                "toString": "Task 1",
+            }
+        ],
+    },
+}
+
+
+class TestWebhookController(JiraTransactionComponentCase):
+    def setUp(self):
+        super().setUp()
+        backend = self.backend_record
+        backend.write(
+            {
+                "use_webhooks": True,
+                "webhook_token": "token1",
+                "webhook_verification": "token",
+            }
+        )
+        backend.sudo().webhook_secret = "s3cr3t"
+        bug = self.env["jira.issue.type"].create(
+            {"name": "Bug", "backend_id": backend.id, "external_id": "1"}
+        )
+        project = self.env["project.project"].create({"name": "Jira Project"})
+        self._create_project_binding(project, issue_types=bug, external_id="10000")
+
+    def _post_webhook(self, body, secret):
+        httprequest = EnvironBuilder(
+            method="POST",
+            query_string={"token": secret},
+            data=json.dumps(body),
+            content_type="application/json",
+        ).get_request()
+        request = mock.MagicMock(
+            env=self.env, jsonrequest=body, httprequest=httprequest
+        )
+        with mock.patch.multiple(
+            "odoo.addons.connector_jira.controllers.main",
+            request=request,
+            ensure_db=mock.DEFAULT,
+        ), self.mock_with_delay():
+            JiraWebhookController().webhook_issue(token="token1")
+
+    def test_webhook_issue_verified_payload(self):
+        self._post_webhook(ISSUE_UPDATED_BODY, "s3cr3t")
+        event = self.env["jira.webhook.event"].search([])
+        self.assertEqual(len(event), 1)
+        self.assertEqual(event.action, "import")
+        self.assertEqual(event.external_id, "10000")
+        # the issue sent by Jira is imported without reading it again
+        self.assertEqual(json.loads(event.payload), ISSUE_UPDATED_BODY["issue"])
+
+    def test_webhook_issue_not_verified(self):
+        self._post_webhook(ISSUE_UPDATED_BODY, "wrong")
+        event = self.env["jira.webhook.event"].search([])
+        self.assertEqual(event.external_id, "10000")
+        self.assertFalse(event.payload)
+
+    def test_webhook_issue_dropped(self):
+        body = dict(ISSUE_UPDATED_BODY)
+        body["issue"] = dict(body["issue"], fields={"project": {"id": "10001"}})
+        self._post_webhook(body, "s3cr3t")
+        event = self.env["jira.webhook.event"].search([])
+        # the event is only counted by the flush
+        self.assertEqual(event.action, "drop")
+        self.assertFalse(event.payload)
+        self.assertFalse(self.backend_record.webhook_dropped_count)
+        self.env["jira.webhook.event"].flush_events()
+        self.assertEqual(self.backend_record.webhook_dropped_count, 1)
@@ -0,0 +1,168 @@
+# Copyright 2026 Camptocamp SA
+# License AGPL-3.0 or later (https://www.gnu.org/licenses/agpl.html).
+
+from unittest import mock
+
+from odoo.addons.queue_job.job import identity_exact
+
+from ..models.jira_webhook_event import common as webhook_event
+from .common import JiraTransactionComponentCase
+
+
+class TestWebhookEvent(JiraTransactionComponentCase):
+    def test_flush_coalesced_events(self):
+        backend = self.backend_record
+        events = self.env["jira.webhook.event"]
+        with self.mock_with_delay() as (delayable_cls, delayable):
+            # a burst of updates on the same issue
+            for __ in range(3):
+                events._add_event(backend.id, "jira.project.task", "import", "10000")
+            # created then deleted
+            events._add_event(backend.id, "jira.project.task", "import", "10001")
+            events._add_event(backend.id, "jira.project.task", "delete", "10001")
+            # several worklogs of the same issue
+            for worklog_id in ("10100", "10101", "10100"):
+                events._add_event(
+                    backend.id,
+                    "jira.account.analytic.line",
+                    "import",
+                    worklog_id,
+                    issue_id="10000",
+                )
+            events._add_event(
+                backend.id,
+                "jira.account.analytic.line",
+                "import",
+                "10102",
+                issue_id="10001",
+            )
+            delayable.reset_mock()
+            result = events.flush_events()
+
+            self.assertEqual(
+                delayable.delete_record.call_args_list,
+                [mock.call(backend, "10001")],
+            )
+            self.assertEqual(
+                delayable.import_record.call_args_list,
+                [
+                    mock.call(backend, "10000"),
+                    mock.call(backend, "10001", "10102"),
+                ],
+            )
+            self.assertEqual(
+                delayable.import_issue_worklogs.call_args_list,
+                [mock.call(backend, "10000", ["10101", "10100"])],
+            )
+        self.assertIn("Flushed 9 events, 4 jobs created", result)
+        # the buffer is empty
+        self.assertFalse(events.search([]))
+        self.assertEqual(events.flush_events(), "No events to flush")
+
+    def test_flush_dropped_events(self):
+        backend = self.backend_record
+        events = self.env["jira.webhook.event"]
+        with self.mock_with_delay() as (delayable_cls, delayable):
+            events._add_event(backend.id, "jira.project.task", "import", "10000")
+            # the issue has been moved to a project not synchronized
+            events._add_event(backend.id, "jira.project.task", "drop", "10000")
+            for worklog_id in ("10100", "10101"):
+                events._add_event(
+                    backend.id,
+                    "jira.account.analytic.line",
+                    "drop",
+                    worklog_id,
+                    issue_id="10001",
+                )
+            delayable.reset_mock()
+            result = events.flush_events()
+
+            # the dropped events create no job, nor cancel the others
+            self.assertEqual(
+                delayable.import_record.call_args_list,
+                [mock.call(backend, "10000")],
+            )
+            self.assertFalse(delayable.import_issue_worklogs.called)
+        self.assertIn("Flushed 4 events, 1 jobs created", result)
+        self.assertEqual(backend.webhook_dropped_count, 3)
+        with self.mock_with_delay():
+            events._add_event(backend.id, "jira.project.task", "drop", "10002")
+        events.flush_events()
+        self.assertEqual(backend.webhook_dropped_count, 4)
+
+    def test_flush_verified_payloads(self):
+        backend = self.backend_record
+        events = self.env["jira.webhook.event"]
+        issue = {"id": "10000", "key": "TEST-1", "renderedFields": {}}
+        worklogs = [{"id": "10100", "issueId": "10000"}, {"id": "10101"}]
+        with self.mock_worklog_complete_read(), self.mock_with_delay() as (
+            delayable_cls,
+            delayable,
+        ):
+            events._add_event(
+                backend.id, "jira.project.task", "import", "10000", payload=issue
+            )
+            for worklog in worklogs:
+                events._add_event(
+                    backend.id,
+                    "jira.account.analytic.line",
+                    "import",
+                    worklog["id"],
+                    issue_id="10000",
+                    payload=worklog,
+                )
+            delayable.reset_mock()
+            events.flush_events()
+
+            # no need to read the records again
+            self.assertEqual(
+                delayable.import_record.call_args_list,
+                [mock.call(backend, "10000", record=issue)],
+            )
+            self.assertEqual(
+                delayable.import_issue_worklogs.call_args_list,
+                [mock.call(backend, "10000", ["10100", "10101"], records=worklogs)],
+            )
+
+    def test_schedule_flush(self):
+        backend = self.backend_record
+        events = self.env["jira.webhook.event"]
+        with self.mock_with_delay() as (delayable_cls, delayable):
+            events._add_event(backend.id, "jira.project.task", "import", "10000")
+            # the flush is scheduled by each event, a single job is kept
+            # pending by the identity key
+            delay_args, delay_kwargs = delayable_cls.call_args
+            self.assertEqual(delay_kwargs["eta"], webhook_event.FLUSH_DELAY)
+            self.assertEqual(delay_kwargs["identity_key"], identity_exact)
+            delayable.flush_events.assert_called_once_with()
+            delayable_cls.reset_mock()
+            delayable.reset_mock()
+            events.flush_events()
+            # nothing left in the buffer, no next flush
+            delayable.flush_events.assert_not_called()
+
+    def test_flush_schedules_next(self):
+        backend = self.backend_record
+        events = self.env["jira.webhook.event"]
+        pop_events = type(events)._pop_events
+
+        def pop_2_events(self):
+            return pop_events(self, limit=2)
+
+        with self.mock_with_delay() as (delayable_cls, delayable), mock.patch.object(
+            webhook_event, "FLUSH_BATCH_SIZE", 2
+        ), mock.patch.object(type(events), "_pop_events", pop_2_events):
+            for external_id in ("10000", "10001", "10002"):
+                events._add_event(
+                    backend.id, "jira.project.task", "import", external_id
+                )
+            delayable_cls.reset_mock()
+            delayable.reset_mock()
+            events.flush_events()
+            # the batch was full, the next flush runs right away
+            self.assertIsNone(delayable_cls.call_args[1]["eta"])
+            delayable.flush_events.assert_called_once_with()
+            delayable_cls.reset_mock()
+            delayable.reset_mock()
+            events.flush_events()
+            delayable.flush_events.assert_not_called()
@@ -38,6 +38,8 @@ class OrganizationAdapter(Component):
     _desk_headers = CaseInsensitiveDict({"X-ExperimentalApi": "opt-in"})
 
     _desk_api_path_base = "{server}/rest/servicedeskapi/{path}"
+    # 50 items per page is the maximum allowed by Jira
+    _desk_page_size = 50
 
     def __init__(self, work_context):
         super().__init__(work_context)
@@ -51,23 +53,25 @@ class OrganizationAdapter(Component):
         return organization.raw
 
     def search(self):
-        # A GET on the REST API returns only one page with the
-        # first 50 rows. Fetch all pages.
-        orgs = []
+        return list(self.yield_search())
+
+    def yield_search(self):
+        """Generator of all the organizations
+
+        A GET on the REST API returns only one page of rows,
+        the pages are read one after the other.
+        """
         start = 0
         while True:
             result = self.client._get_json(
                 "organization",
                 params={
                     "start": start,
-                    # 50 items per page is the maximum allowed by Jira
-                    "limit": start + 50,
+                    "limit": self._desk_page_size,
                 },
                 base=self._desk_api_path_base,
             )
-            start += 50
-            orgs += result["values"]
+            yield from result["values"]
             if result["isLastPage"]:
                 break
-
-        return orgs
+            start += len(result["values"])
@@ -22,3 +22,20 @@ class JiraOrganization(models.Model):
         with backend.work_on(self._name) as work:
             importer = work.component(usage="batch.importer")
             importer.run()
+
+    def write(self, values):
+        # index of the projects by organizations, the organizations
+        # are written on each import
+        clear_cache = self._jira_fields_changed(values, ("project_ids", "external_id"))
+        res = super().write(values)
+        if clear_cache:
+            self.env["jira.project.project"].clear_caches()
+        return res
+
+    def unlink(self):
+        # only the organizations of projects are in the index
+        clear_cache = bool(self.filtered("project_ids"))
+        res = super().unlink()
+        if clear_cache:
+            self.env["jira.project.project"].clear_caches()
+        return res
@@ -22,15 +22,13 @@ class OrganizationMapper(Component):
 class OrganizationBatchImporter(Component):
     """Import the Jira Organizations
 
-    For every id in in the list of organizations, a direct import is done.
+    The organizations are read page by page, created or updated in one
+    pass, the unchanged ones are left untouched.
     """
 
     _name = "jira.organization.batch.importer"
-    _inherit = "jira.direct.batch.importer"
+    _inherit = "jira.upsert.batch.importer"
     _apply_on = ["jira.organization"]
 
-    def run(self):
-        """Run the synchronization"""
-        records = self.backend_adapter.search()
-        for record in records:
-            self._import_record(record["id"], record=record)
+    def _search_read(self):
+        return self.backend_adapter.yield_search()
@@ -20,9 +20,14 @@ class JiraProjectBinder(Component):
         will return:
 
         * a project linked with JIRA with the exact set of organizations
+        * when a single organization is passed, a project linked with this
+          organization amongst others
         * if no project has the exact same set, a project linked without
           organization set on the binding
 
+        The bindings are read from an index kept in memory, see
+        ``jira.project.project._get_organization_index()``.
+
         If no organizations are passed, only project bindings
         without organization match.
 
@@ -35,37 +40,32 @@ class JiraProjectBinder(Component):
                  or an empty recordset if the external_id is not mapped
         :rtype: recordset
         """
-        domain = [
-            (self._external_field, "=", tools.ustr(external_id)),
-            (self._backend_field, "=", self.backend_record.id),
-        ]
-        if not organizations:
-            domain.append(
-                ("organization_ids", "=", False),
-            )
-        candidates = self.model.with_context(active_test=False).search(domain)
-        if organizations:
-            fallback = self.model.browse()
-            binding = self.model.browse()
-            for candidate in candidates:
-                if not candidate.organization_ids:
-                    fallback = candidate
-                    continue
-
-                if organizations in candidate.organization_ids:
-                    binding = candidate
-                    break
-            if not binding:
-                binding = fallback
-        else:
-            binding = candidates
-
-        if not binding:
-            if unwrap:
-                return self.model.browse()[self._odoo_field]
-            return self.model.browse()
+        index = self.model._get_organization_index(self.backend_record.id)
+        candidates = index.get(tools.ustr(external_id), ())
+        organization_ids = frozenset(
+            organizations.mapped("external_id") if organizations else ()
+        )
+        binding_id = None
+        fallback_id = None
+        for candidate_organization_ids, candidate_id in candidates:
+            if candidate_organization_ids == organization_ids:
+                binding_id = candidate_id
+                break
+            if not candidate_organization_ids:
+                fallback_id = candidate_id
+            elif (
+                binding_id is None
+                and len(organization_ids) == 1
+                and organization_ids <= candidate_organization_ids
+            ):
+                # a single organization matches a project binding having
+                # several ones
+                binding_id = candidate_id
+        if binding_id is None:
+            binding_id = fallback_id
 
-        binding.ensure_one()
+        # exists(): the project of a binding may have been deleted
+        binding = self.model.browse(binding_id).exists()
         if unwrap:
-            binding = binding[self._odoo_field]
+            return binding[self._odoo_field]
         return binding
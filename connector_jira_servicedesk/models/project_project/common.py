@@ -1,8 +1,13 @@
 # Copyright 2019 Camptocamp SA
 # License AGPL-3.0 or later (http://www.gnu.org/licenses/agpl.html)
 import urllib.parse
+from collections import defaultdict
 
-from odoo import _, api, exceptions, fields, models
+from odoo import _, api, exceptions, fields, models, tools
+
+# changing these fields on a project binding invalidates the index
+# of the bindings by organizations
+ORGANIZATION_INDEX_FIELDS = ("backend_id", "external_id", "organization_ids")
 
 
 class JiraProjectBaseFields(models.AbstractModel):
@@ -79,6 +84,45 @@ class JiraProjectProject(models.Model):
                         % (other.display_name)
                     )
 
+    @api.model
+    @tools.ormcache("backend_id")
+    def _get_organization_index(self, backend_id):
+        """Return the project bindings by Jira project and organizations
+
+        Cached for each worker until the bindings or their organizations
+        change.
+
+        :return: {jira project id: ((frozenset(jira organization ids),
+                 binding id), ...)}
+        """
+        bindings = self.with_context(active_test=False).search(
+            [("backend_id", "=", backend_id)]
+        )
+        index = defaultdict(list)
+        for binding in bindings:
+            index[binding.external_id].append(
+                (frozenset(binding.organization_ids.mapped("external_id")), binding.id)
+            )
+        return {key: tuple(values) for key, values in index.items()}
+
+    @api.model
+    def create(self, values):
+        record = super().create(values)
+        self.clear_caches()
+        return record
+
+    def write(self, values):
+        clear_cache = self._jira_fields_changed(values, ORGANIZATION_INDEX_FIELDS)
+        res = super().write(values)
+        if clear_cache:
+            self.clear_caches()
+        return res
+
+    def unlink(self):
+        res = super().unlink()
+        self.clear_caches()
+        return res
+
     def make_servicedesk_issue_url(self, jira_issue_id):
         return urllib.parse.urljoin(
             self.backend_id.uri,
@@ -12,9 +12,13 @@ class ProjectTaskProjectMatcher(Component):
         jira_org_ids = self.component(usage="organization.from.task").get_jira_org_ids(
             jira_task_data
         )
-        binder = self.binder_for("jira.organization")
-        for jira_org_id in jira_org_ids:
-            organizations |= binder.to_internal(jira_org_id)
+        if jira_org_ids:
+            organizations = organizations.search(
+                [
+                    ("backend_id", "=", self.backend_record.id),
+                    ("external_id", "in", [str(org_id) for org_id in jira_org_ids]),
+                ]
+            )
         jira_project_id = jira_task_data["fields"]["project"]["id"]
         binder = self.binder_for("jira.project.project")
         return binder.to_internal(
@@ -1 +1,2 @@
 from . import test_import_organization
+from . import test_project_binder
@@ -24,6 +24,33 @@ class TestImportOrganization(JiraTransactionComponentCase):
         # is the pagination of the REST API
         self.assertEqual(len(organizations), 60)
 
+    @recorder.use_cassette("test_import_organization_batch.yaml")
+    def test_import_organization_batch_unchanged(self):
+        """Only new or renamed organizations are imported"""
+        renamed = self.env["jira.organization"].create(
+            {
+                "backend_id": self.backend_record.id,
+                "external_id": "55",
+                "name": "dummy",
+            }
+        )
+        unchanged = self.env["jira.organization"].create(
+            {
+                "backend_id": self.backend_record.id,
+                "external_id": "56",
+                "name": "org24",
+            }
+        )
+        self.env["jira.organization"].import_batch(
+            self.backend_record,
+        )
+        organizations = self.env["jira.organization"].search([])
+        self.assertEqual(len(organizations), 60)
+        self.assertEqual(renamed.name, "org25")
+        self.assertTrue(renamed.sync_date)
+        # not imported again
+        self.assertFalse(unchanged.sync_date)
+
     def test_import_organization_from_record(self):
         """Import one organization from a records
 
@@ -0,0 +1,71 @@
+# Copyright 2026 Camptocamp SA
+# License AGPL-3.0 or later (http://www.gnu.org/licenses/agpl.html)
+
+from unittest import mock
+
+from odoo.addons.connector_jira.tests.common import JiraTransactionComponentCase
+
+
+class TestProjectBinder(JiraTransactionComponentCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.org1, cls.org2, cls.org3 = [
+            cls.env["jira.organization"].create(
+                {
+                    "backend_id": cls.backend_record.id,
+                    "external_id": str(jira_id),
+                    "name": "org{}".format(jira_id),
+                }
+            )
+            for jira_id in (1, 2, 3)
+        ]
+        cls.binding_no_org = cls._create_project_binding(
+            cls.env["project.project"].create({"name": "No organization"}),
+            external_id="10000",
+            jira_key="NOORG",
+        )
+        cls.binding_org1 = cls._create_project_binding(
+            cls.env["project.project"].create({"name": "Organization 1"}),
+            external_id="10000",
+            jira_key="ORGONE",
+            organization_ids=[(6, 0, cls.org1.ids)],
+        )
+        cls.binding_org2_org3 = cls._create_project_binding(
+            cls.env["project.project"].create({"name": "Organizations 2 and 3"}),
+            external_id="10000",
+            jira_key="ORGTWO",
+            organization_ids=[(6, 0, (cls.org2 | cls.org3).ids)],
+        )
+
+    def _to_internal(self, organizations=None):
+        with self.backend_record.work_on("jira.project.project") as work:
+            binder = work.component(usage="binder")
+            return binder.to_internal("10000", organizations=organizations)
+
+    def test_to_internal(self):
+        self.assertEqual(self._to_internal(), self.binding_no_org)
+        self.assertEqual(self._to_internal(self.org1), self.binding_org1)
+        self.assertEqual(
+            self._to_internal(self.org2 | self.org3), self.binding_org2_org3
+        )
+        self.assertEqual(self._to_internal(self.org2), self.binding_org2_org3)
+        # no exact match
+        self.assertEqual(self._to_internal(self.org1 | self.org2), self.binding_no_org)
+
+    def test_to_internal_organizations_changed(self):
+        self.assertEqual(self._to_internal(self.org1), self.binding_org1)
+        self.binding_org1.organization_ids = self.org3
+        self.assertEqual(self._to_internal(self.org1), self.binding_no_org)
+        self.org1.project_ids = self.binding_org2_org3
+        self.assertEqual(self._to_internal(self.org1), self.binding_org2_org3)
+
+    def test_organizations_written_again(self):
+        registry_cls = type(self.env.registry)
+        with mock.patch.object(registry_cls, "_clear_cache") as clear_cache:
+            # the binder writes the external id on each import
+            self.org1.write({"external_id": "1", "name": "Organization 1"})
+            self.binding_org1.write({"external_id": "10000"})
+            self.assertFalse(clear_cache.called)
+            self.org1.external_id = "4"
+            self.assertEqual(clear_cache.call_count, 1)
@@ -9,7 +9,9 @@
     "depends": ["connector_jira_tempo_base", "hr_timesheet"],
     "website": "https://github.com/OCA/connector-jira",
     "data": [
+        "security/ir.model.access.csv",
         "data/cron.xml",
+        "data/queue_job_data.xml",
         "views/jira_backend_view.xml",
         "views/timesheet_account_analytic_line.xml",
     ],
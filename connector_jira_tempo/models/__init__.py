@@ -2,3 +2,4 @@
 
 from . import account_analytic_line
 from . import jira_backend
+from . import jira_tempo_approval_period
@@ -2,10 +2,94 @@
 # Copyright 2019 Brainbean Apps (https://brainbeanapps.com)
 # License AGPL-3.0 or later (https://www.gnu.org/licenses/agpl.html).
 
+import threading
+import time
+from collections import defaultdict
+
 from odoo import fields, models
 
 from odoo.addons.component.core import Component
 
+# seconds during which an approval status read from Tempo is reused
+APPROVAL_CACHE_TTL = 300
+# read the approvals of the company team instead of one call per author
+# when at least this number of authors are unknown
+TEAM_PREFETCH_MIN_AUTHORS = 2
+
+
+def worklog_day(worklog):
+    """Return the day (iso format) of a worklog, used to find its period"""
+    return worklog["started"][:10]
+
+
+class TempoApprovalCache(object):
+    """In-memory cache of the Tempo timesheet approvals of the users
+
+    The approvals are stored by (database, backend, username), for each
+    approval period, the boundaries of the period being the ones returned
+    by Tempo. An approval is used only for dates within its period and
+    expires after ``ttl`` seconds, as the status may change during a
+    period. The periods for which the approvals of a team have been
+    read are stored the same way. The cache is shared by the threads of
+    the worker.
+    """
+
+    def __init__(self, ttl=APPROVAL_CACHE_TTL):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        # (dbname, backend id, username): {(date from, date to): (approval,
+        # expiry)}
+        self._approvals = {}
+        # (dbname, backend id, team id): {(date from, date to): (True,
+        # expiry)}
+        self._teams = {}
+
+    @staticmethod
+    def _find(periods, day, now):
+        for (date_from, date_to), (value, expiry) in periods.items():
+            if expiry > now and date_from <= day <= date_to:
+                return value
+        return None
+
+    def _store(self, entries, key, period, value):
+        now = time.monotonic()
+        periods = {
+            dates: entry
+            for dates, entry in entries.get(key, {}).items()
+            if entry[1] > now
+        }
+        periods[(period["dateFrom"], period["dateTo"])] = (value, now + self.ttl)
+        entries[key] = periods
+
+    def get(self, key, day):
+        """Return the approval of a user valid for a day (iso format)"""
+        with self._lock:
+            return self._find(self._approvals.get(key, {}), day, time.monotonic())
+
+    def set(self, key, approval):
+        period = approval.get("period")
+        if not period or "status" not in approval:
+            return
+        with self._lock:
+            self._store(self._approvals, key, period, approval)
+
+    def team_fetched(self, key, day):
+        """Return whether the approvals of a team are read for a day"""
+        with self._lock:
+            return bool(self._find(self._teams.get(key, {}), day, time.monotonic()))
+
+    def set_team_fetched(self, key, period):
+        with self._lock:
+            self._store(self._teams, key, period, True)
+
+    def clear(self):
+        with self._lock:
+            self._approvals.clear()
+            self._teams.clear()
+
+
+approval_cache = TempoApprovalCache()
+
 
 class AccountAnalyticLine(models.Model):
     _inherit = "account.analytic.line"
@@ -33,15 +117,93 @@ class WorklogAdapter(Component):
             )
         return worklog
 
+    def complete_read(self, worklogs):
+        worklogs = super().complete_read(worklogs)
+        if self.env.context.get("jira_worklog_no_tempo_timesheets_approval_data"):
+            return worklogs
+        worklogs_to_complete = [
+            worklog
+            for worklog in worklogs
+            if "_tempo_timesheets_approval" not in worklog
+        ]
+        self._tempo_timesheets_approval_prefetch(worklogs_to_complete)
+        for worklog in worklogs_to_complete:
+            with self.handle_404():
+                worklog[
+                    "_tempo_timesheets_approval"
+                ] = self.tempo_timesheets_approval_read(worklog)
+        return worklogs
+
+    def _tempo_timesheets_approval_prefetch(self, worklogs):
+        """Read the approvals of the company team when many authors share it
+
+        The approvals of the team are read for the period of each day
+        having worklogs of several authors not in the cache. Authors not
+        member of the team are read individually afterwards.
+        """
+        team_id = self.backend_record.jira_company_team_id
+        if not team_id:
+            return
+        team_key = (self.env.cr.dbname, self.backend_record.id, team_id)
+        authors_by_day = defaultdict(set)
+        for worklog in worklogs:
+            authors_by_day[worklog_day(worklog)].add(worklog["author"]["name"])
+        for day, authors in sorted(authors_by_day.items()):
+            if approval_cache.team_fetched(team_key, day):
+                continue
+            unknown_authors = [
+                username
+                for username in authors
+                if approval_cache.get(self._tempo_approval_cache_key(username), day)
+                is None
+            ]
+            if len(unknown_authors) < TEAM_PREFETCH_MIN_AUTHORS:
+                continue
+            with self.handle_404():
+                result = self.tempo_timesheets_approval_read_status_by_team(
+                    team_id, day
+                )
+            approval_cache.set_team_fetched(
+                team_key, result.get("period") or {"dateFrom": day, "dateTo": day}
+            )
+
+    def _tempo_approval_cache_key(self, username):
+        return (self.env.cr.dbname, self.backend_record.id, username)
+
     def tempo_timesheets_approval_read(self, worklog):
+        """Return the approval of the author for the period of a worklog
+
+        The approvals are cached per author and approval period. The
+        current period of the author is read first, as most of the
+        worklogs imported belong to it, then the period of the worklog
+        when it is another one.
+        """
+        username = worklog["author"]["name"]
+        day = worklog_day(worklog)
+        key = self._tempo_approval_cache_key(username)
+        approval = approval_cache.get(key, day)
+        if approval is not None:
+            return approval
+        today = fields.Date.today().isoformat()
+        if approval_cache.get(key, today) is None:
+            approval = self._tempo_timesheets_approval_read_current(username)
+            approval_cache.set(key, approval)
+            if approval_cache.get(key, day) is not None or not approval.get("period"):
+                return approval
+        approval = self._tempo_timesheets_approval_read_current(
+            username, period_start=day
+        )
+        approval_cache.set(key, approval)
+        return approval
+
+    def _tempo_timesheets_approval_read_current(self, username, period_start=None):
+        """Read the approval of a user, for the period of a day if given"""
         url = self._tempo_timesheets_get_url("timesheet-approval/current")
+        params = {"username": username}
+        if period_start:
+            params["periodStartDate"] = period_start
         with self.handle_404():
-            response = self.client._session.get(
-                url,
-                params={
-                    "username": worklog["author"]["name"],
-                },  # noqa
-            )
+            response = self.client._session.get(url, params=params)
         return response.json()
 
     def tempo_timesheets_approval_read_status_by_team(
@@ -56,4 +218,11 @@ class WorklogAdapter(Component):
                     "periodStartDate": period_start,
                 },  # noqa
             )
-        return response.json()
+        result = response.json()
+        period = result.get("period")
+        for entry in result.get("approvals", []) if period else []:
+            approval_cache.set(
+                self._tempo_approval_cache_key(entry["user"]["name"]),
+                dict(entry, period=period),
+            )
+        return result
@@ -11,7 +11,10 @@ class AnalyticLineMapper(Component):
 
     @mapping
     def tempo_timesheets_approval(self, record):
-        approval = record["_tempo_timesheets_approval"]
+        approval = record.get("_tempo_timesheets_approval")
+        if not approval:
+            # not read, for instance by the bulk loader of worklogs
+            return {}
         values = {
             "jira_tempo_status": approval["status"],
         }
@@ -6,10 +6,14 @@ import logging
 from collections import defaultdict
 from datetime import datetime, timedelta
 
-from odoo import fields, models
+from odoo import _, exceptions, fields, models
+
+from odoo.addons.queue_job.job import identity_exact
 
 _logger = logging.getLogger(__name__)
 
+TEMPO_APPROVAL_CHANNEL = "root.connector_jira.tempo_approval"
+
 
 def get_past_week_1st_day():
     today = datetime.today()
@@ -34,6 +38,12 @@ class JiraBackend(models.Model):
         help="If this flag is ON, once the status is sync'ed from Jira, "
         "all approved timesheets will be validated on Odoo as well."
     )
+    tempo_backfill_date_from = fields.Date(
+        string="Backfill Tempo statuses from",
+    )
+    tempo_backfill_date_to = fields.Date(
+        string="Backfill Tempo statuses to",
+    )
 
     def _scheduler_sync_tempo_timesheets_approval_status(self, period_start=None):
         """Synchronize JIRA Tempo timesheet status on Odoo TS lines.
@@ -56,38 +66,180 @@ class JiraBackend(models.Model):
         for backend in self:
             backend._sync_tempo_timesheets_approval_status(period_start)
 
-    def _sync_tempo_timesheets_approval_status(self, period_start):
+    def backfill_tempo_timesheets_approval_status(self):
+        for backend in self:
+            if not (
+                backend.tempo_backfill_date_from and backend.tempo_backfill_date_to
+            ):
+                raise exceptions.UserError(
+                    _("The dates of the Tempo statuses backfill are required.")
+                )
+            backend._backfill_tempo_timesheets_approval_status(
+                backend.tempo_backfill_date_from, backend.tempo_backfill_date_to
+            )
+        return True
+
+    def _backfill_tempo_timesheets_approval_status(
+        self, date_from, date_to, team_ids=None
+    ):
+        """Synchronize the Tempo statuses of the periods of a date range
+
+        The Tempo periods covering the range are read first, then one job
+        is created per team and period, on the Tempo approval channel
+        whose capacity bounds the concurrency. As no 2 jobs cover the
+        same period, they never update the same lines.
+
+        :param team_ids: Tempo teams, the company team by default
+        """
+        self.ensure_one()
+        if team_ids is None:
+            team_ids = [self.jira_company_team_id]
+        team_ids = [team_id for team_id in team_ids if team_id]
+        if not team_ids:
+            _logger.warning(
+                "No Tempo team on backend %s, the statuses are not backfilled",
+                self.name,
+            )
+            return
+        for team_id in team_ids:
+            for period_start in self._get_tempo_period_starts(
+                team_id, date_from, date_to
+            ):
+                self.with_delay(
+                    channel=TEMPO_APPROVAL_CHANNEL,
+                    priority=12,
+                    identity_key=identity_exact,
+                    description=_("Backfill Tempo statuses of team {} from {}").format(
+                        team_id, period_start
+                    ),
+                ).sync_tempo_timesheets_approval_status_period(team_id, period_start)
+
+    def _get_tempo_period_starts(self, team_id, date_from, date_to):
+        """Return the first days of the Tempo periods of a team in a range
+
+        The periods are read from Tempo, the first one may start before
+        ``date_from``.
+        """
+        starts = []
+        day = date_from
+        with self.work_on("jira.account.analytic.line") as work:
+            adapter = work.component(usage="backend.adapter")
+            while day <= date_to:
+                result = adapter.tempo_timesheets_approval_read_status_by_team(
+                    team_id, fields.Date.to_string(day)
+                )
+                period = result.get("period")
+                if not period:
+                    _logger.warning("No Tempo period of team %s on %s", team_id, day)
+                    break
+                if period["dateFrom"] not in starts:
+                    starts.append(period["dateFrom"])
+                # never loop on a period not moving forward
+                day = max(fields.Date.to_date(period["dateTo"]), day)
+                day += timedelta(days=1)
+        return starts
+
+    def sync_tempo_timesheets_approval_status_period(self, team_id, period_start):
+        """Job synchronizing the Tempo statuses of a team for a period
+
+        The period is skipped when its approvals did not change since
+        its last synchronization.
+        """
+        self.ensure_one()
+        return self._sync_tempo_timesheets_approval_status(
+            period_start, team_id=team_id, skip_unchanged=True
+        )
+
+    def _sync_tempo_timesheets_approval_status(
+        self, period_start, team_id=None, skip_unchanged=False
+    ):
         """Find users and TS lines and update tempo status."""
-        team_id = self.jira_company_team_id
+        if team_id is None:
+            team_id = self.jira_company_team_id
         with self.work_on("jira.account.analytic.line") as work:
             importer = work.component(usage="backend.adapter")
             result = importer.tempo_timesheets_approval_read_status_by_team(
                 team_id,
                 period_start,
             )
-            user_binder = importer.binder_for("jira.res.users")
         # Pick the date range from the Tempo period.
         # In this way we make sure we affect only the dates we want.
         date_from = result["period"]["dateFrom"]
         date_to = result["period"]["dateTo"]
         approvals = result.get("approvals", [])
+        period_model = self.env["jira.tempo.approval.period"]
+        if skip_unchanged and period_model._is_unchanged(
+            self, team_id, result["period"], approvals
+        ):
+            return _("Approvals of the period from {} to {} did not change").format(
+                date_from, date_to
+            )
+        user_ids = self._get_user_ids_by_jira_key(
+            [entry["user"]["key"] for entry in approvals]
+        )
         mapping = defaultdict(list)
         for entry in approvals:
             user_data = entry["user"]
-            try:
-                user = user_binder.to_internal(user_data["key"], unwrap=True)
-            except ValueError:
+            user_id = user_ids.get(user_data["key"])
+            if not user_id:
                 _logger.error("User %(key)s not found" % user_data)
                 continue
-            mapping[entry["status"]].append(user.id)
-        for state, user_ids in mapping.items():
-            self._update_ts_line_status(date_from, date_to, state, user_ids)
+            mapping[entry["status"]].append(user_id)
+        for state, state_user_ids in mapping.items():
+            self._update_ts_line_status(date_from, date_to, state, state_user_ids)
+        period_model._record_sync(self, team_id, result["period"], approvals)
+        return _("Approvals of the period from {} to {} synchronized").format(
+            date_from, date_to
+        )
+
+    def _get_user_ids_by_jira_key(self, keys):
+        """Return {jira user key: user id} for the users bound to the backend"""
+        if not keys:
+            return {}
+        self.env["jira.res.users"].flush(["backend_id", "external_id", "odoo_id"])
+        self.env.cr.execute(
+            "SELECT external_id, odoo_id FROM jira_res_users "
+            "WHERE backend_id = %s AND external_id IN %s",
+            (self.id, tuple(keys)),
+        )
+        return dict(self.env.cr.fetchall())
 
     def _update_ts_line_status(self, date_from, date_to, state, user_ids):
+        """Apply a Tempo status on the TS lines of users for a period"""
         lines = self._get_ts_lines(date_from, date_to, user_ids)
-        lines.mapped("jira_bind_ids").write({"jira_tempo_status": state})
+        self._write_ts_lines_status(lines, state)
         self._validate_ts(date_from, date_to, state, user_ids)
 
+    def _write_ts_lines_status(self, lines, state):
+        """Write the Tempo status on lines in a single statement
+
+        Only the lines imported from this backend and having a different
+        status are updated.
+        """
+        if not lines:
+            return
+        self.env.cr.execute(
+            "UPDATE account_analytic_line AS line "
+            "SET jira_tempo_status = %s, "
+            "    write_uid = %s, "
+            "    write_date = (now() at time zone 'UTC') "
+            "WHERE line.id IN %s "
+            "AND line.jira_tempo_status IS DISTINCT FROM %s "
+            "AND EXISTS ("
+            "    SELECT 1 FROM jira_account_analytic_line AS binding "
+            "    WHERE binding.odoo_id = line.id AND binding.backend_id = %s"
+            ") "
+            "RETURNING line.id",
+            (state, self.env.uid, tuple(lines.ids), state, self.id),
+        )
+        line_ids = [row[0] for row in self.env.cr.fetchall()]
+        _logger.info("Tempo status %s set on %s timesheet lines", state, len(line_ids))
+        if line_ids:
+            fnames = ["jira_tempo_status", "write_uid", "write_date"]
+            lines.invalidate_cache(fnames, line_ids)
+            # the bindings cache the fields inherited from the lines
+            self.env["jira.account.analytic.line"].invalidate_cache(fnames)
+
     def _get_ts_lines_domain(self, date_from, date_to, user_ids):
         domain = [
             # TODO: any better filter here?
@@ -0,0 +1,90 @@
+# Copyright 2026 Camptocamp SA
+# License AGPL-3.0 or later (https://www.gnu.org/licenses/agpl.html).
+
+import hashlib
+import json
+
+from odoo import api, fields, models
+
+
+class JiraTempoApprovalPeriod(models.Model):
+    """Approvals of a Tempo team for a period, as last synchronized
+
+    Used to skip the periods whose approvals did not change since the
+    last synchronization.
+    """
+
+    _name = "jira.tempo.approval.period"
+    _description = "Jira Tempo Approval Period"
+    _order = "date_from desc"
+
+    backend_id = fields.Many2one(
+        comodel_name="jira.backend",
+        required=True,
+        ondelete="cascade",
+    )
+    team_id = fields.Integer(required=True)
+    date_from = fields.Date(required=True)
+    date_to = fields.Date(required=True)
+    approvals_hash = fields.Char(
+        help="Fingerprint of the users' approval statuses of the period"
+    )
+    sync_date = fields.Datetime()
+
+    _sql_constraints = [
+        (
+            "period_uniq",
+            "unique(backend_id, team_id, date_from)",
+            "A period can only exist once per backend and team.",
+        ),
+    ]
+
+    @api.model
+    def _approvals_hash(self, approvals):
+        statuses = sorted(
+            (entry["user"]["key"], entry["status"]) for entry in approvals
+        )
+        return hashlib.sha1(json.dumps(statuses).encode("utf-8")).hexdigest()
+
+    @api.model
+    def _is_unchanged(self, backend, team_id, period, approvals):
+        """Return True if the approvals did not change since last sync"""
+        record = self.search(
+            [
+                ("backend_id", "=", backend.id),
+                ("team_id", "=", team_id),
+                ("date_from", "=", period["dateFrom"]),
+            ]
+        )
+        return bool(record) and record.approvals_hash == self._approvals_hash(approvals)
+
+    @api.model
+    def _record_sync(self, backend, team_id, period, approvals):
+        """Store the approvals of a period as synchronized
+
+        The jobs of the weeks of a same period can run concurrently, the
+        period is upserted so they do not fail on the unique constraint.
+        """
+        self.env.cr.execute(
+            "INSERT INTO jira_tempo_approval_period "
+            "(backend_id, team_id, date_from, date_to, approvals_hash, sync_date, "
+            "create_uid, create_date, write_uid, write_date) "
+            "VALUES (%(backend_id)s, %(team_id)s, %(date_from)s, %(date_to)s, "
+            "%(hash)s, %(now)s, %(uid)s, %(now)s, %(uid)s, %(now)s) "
+            "ON CONFLICT (backend_id, team_id, date_from) DO UPDATE "
+            "SET date_to = EXCLUDED.date_to, "
+            "    approvals_hash = EXCLUDED.approvals_hash, "
+            "    sync_date = EXCLUDED.sync_date, "
+            "    write_uid = EXCLUDED.write_uid, "
+            "    write_date = EXCLUDED.write_date",
+            {
+                "backend_id": backend.id,
+                "team_id": team_id,
+                "date_from": period["dateFrom"],
+                "date_to": period["dateTo"],
+                "hash": self._approvals_hash(approvals),
+                "now": fields.Datetime.now(),
+                "uid": self.env.uid,
+            },
+        )
+        self.invalidate_cache()
@@ -2,14 +2,21 @@
 # Copyright 2019 Brainbean Apps (https://brainbeanapps.com)
 # License AGPL-3.0 or later (https://www.gnu.org/licenses/agpl.html).
 
+import threading
 from datetime import date
+from unittest import mock
 
 from freezegun import freeze_time
 
+from odoo.tests.common import TransactionCase
+
+from odoo.addons.connector_jira.tests.common import JiraTransactionComponentCase
 from odoo.addons.connector_jira.tests.test_import_analytic_line import (
     TestImportWorklogBase,
 )
+from odoo.addons.queue_job.job import identity_exact
 
+from ..models.account_analytic_line.common import TempoApprovalCache, approval_cache
 from .common import recorder
 
 
@@ -68,6 +75,11 @@ class TestImportWorklogStatus(TestImportWorklogBase):
             )  # noqa
         )
 
+    def setUp(self):
+        super().setUp()
+        approval_cache.clear()
+        self.addCleanup(approval_cache.clear)
+
     # note: when you are recording tests with VCR, Jira
     # will reject any call when you pretend to have a time too
     # different from now(). So adjust this date be rougly equal
@@ -126,3 +138,240 @@ class TestImportWorklogStatus(TestImportWorklogBase):
         self.backend_record._scheduler_sync_tempo_timesheets_approval_status()
         self.assertEqual(binding.jira_tempo_status, "approved")
         self.assertEqual(binding2.jira_tempo_status, "approved")
+
+
+class TestTempoApprovalCache(TransactionCase):
+    def test_cache_by_period(self):
+        cache = TempoApprovalCache()
+        key = (self.env.cr.dbname, 1, "sorsi")
+        approval = {
+            "status": "open",
+            "period": {"dateFrom": "2019-05-01", "dateTo": "2019-05-31"},
+        }
+        cache.set(key, approval)
+        self.assertEqual(cache.get(key, "2019-05-09"), approval)
+        # another period must be read again
+        self.assertIsNone(cache.get(key, "2019-06-01"))
+        self.assertIsNone(cache.get((self.env.cr.dbname, 2, "sorsi"), "2019-05-09"))
+        # errors are not cached
+        cache.set((self.env.cr.dbname, 1, "manager"), {"errors": {}})
+        self.assertIsNone(cache.get((self.env.cr.dbname, 1, "manager"), "2019-05-09"))
+
+    def test_cache_expiry(self):
+        cache = TempoApprovalCache(ttl=0)
+        key = (self.env.cr.dbname, 1, "sorsi")
+        cache.set(
+            key,
+            {
+                "status": "open",
+                "period": {"dateFrom": "2019-05-01", "dateTo": "2019-05-31"},
+            },
+        )
+        self.assertIsNone(cache.get(key, "2019-05-09"))
+
+    def test_cache_threads(self):
+        cache = TempoApprovalCache()
+        period = {"dateFrom": "2019-05-01", "dateTo": "2019-05-31"}
+
+        def work(index):
+            key = (self.env.cr.dbname, 1, "user{}".format(index % 4))
+            for __ in range(200):
+                cache.set(key, {"status": "open", "period": period})
+                cache.get(key, "2019-05-09")
+                cache.set_team_fetched((self.env.cr.dbname, 1, 1), period)
+
+        threads = [threading.Thread(target=work, args=(i,)) for i in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertTrue(cache.team_fetched((self.env.cr.dbname, 1, 1), "2019-05-09"))
+
+
+class TestTempoApprovalRead(JiraTransactionComponentCase):
+    def setUp(self):
+        super().setUp()
+        approval_cache.clear()
+        self.addCleanup(approval_cache.clear)
+        self.periods = {
+            None: ("2019-05-01", "2019-05-31"),
+            "2019-04-10": ("2019-04-01", "2019-04-30"),
+            "2019-04-20": ("2019-04-01", "2019-04-30"),
+        }
+        self.reads = []
+
+    def _read_current(self, adapter, username, period_start=None):
+        self.reads.append((username, period_start))
+        date_from, date_to = self.periods[period_start]
+        return {
+            "status": "approved" if period_start else "open",
+            "period": {"dateFrom": date_from, "dateTo": date_to},
+        }
+
+    def _read(self, worklogs):
+        with self.backend_record.work_on("jira.account.analytic.line") as work:
+            adapter = work.component(usage="backend.adapter")
+            with mock.patch.object(
+                type(adapter),
+                "_tempo_timesheets_approval_read_current",
+                autospec=True,
+                side_effect=self._read_current,
+            ):
+                return [adapter.tempo_timesheets_approval_read(w) for w in worklogs]
+
+    @freeze_time("2019-05-09 09:34:42")
+    def test_approval_of_worklog_period(self):
+        def worklog(started):
+            return {"author": {"name": "sorsi"}, "started": started + "T10:00:00"}
+
+        approvals = self._read([worklog("2019-05-08"), worklog("2019-05-02")])
+        self.assertEqual([a["status"] for a in approvals], ["open", "open"])
+        self.assertEqual(self.reads, [("sorsi", None)])
+        # a worklog of a past period gets the approval of its period
+        self.reads.clear()
+        approvals = self._read([worklog("2019-04-10"), worklog("2019-04-20")])
+        self.assertEqual([a["status"] for a in approvals], ["approved", "approved"])
+        self.assertEqual(self.reads, [("sorsi", "2019-04-10")])
+
+    def test_team_prefetch_by_period(self):
+        self.backend_record.jira_company_team_id = 1
+        worklogs = [
+            {"author": {"name": name}, "started": started + "T10:00:00"}
+            for name in ("sorsi", "manager")
+            for started in ("2019-04-10", "2019-04-20", "2019-05-08")
+        ]
+        calls = []
+
+        def read_team(adapter, team_id, period_start):
+            calls.append(period_start)
+            date_from, date_to = self.periods[
+                None if period_start.startswith("2019-05") else period_start
+            ]
+            return {"period": {"dateFrom": date_from, "dateTo": date_to}}
+
+        with self.backend_record.work_on("jira.account.analytic.line") as work:
+            adapter = work.component(usage="backend.adapter")
+            with mock.patch.object(
+                type(adapter),
+                "tempo_timesheets_approval_read_status_by_team",
+                autospec=True,
+                side_effect=read_team,
+            ):
+                adapter._tempo_timesheets_approval_prefetch(worklogs)
+        # one call for each period of the worklogs
+        self.assertEqual(calls, ["2019-04-10", "2019-05-08"])
+
+
+class TestTempoApprovalBackfill(JiraTransactionComponentCase):
+    def _backfill(self, date_from, date_to, team_ids=None):
+        reads = []
+
+        def read_team(adapter, team_id, period_start):
+            reads.append((team_id, period_start))
+            # monthly periods
+            month = period_start[:7]
+            last_day = {"2019-04": "30", "2019-05": "31"}[month]
+            return {
+                "period": {
+                    "dateFrom": month + "-01",
+                    "dateTo": "{}-{}".format(month, last_day),
+                }
+            }
+
+        with self.backend_record.work_on("jira.account.analytic.line") as work:
+            adapter_cls = type(work.component(usage="backend.adapter"))
+        with mock.patch.object(
+            adapter_cls,
+            "tempo_timesheets_approval_read_status_by_team",
+            autospec=True,
+            side_effect=read_team,
+        ), self.mock_with_delay() as (delayable_cls, delayable):
+            self.backend_record._backfill_tempo_timesheets_approval_status(
+                date_from, date_to, team_ids=team_ids
+            )
+            job_args = sorted(
+                args
+                for args, __ in delayable.sync_tempo_timesheets_approval_status_period.call_args_list  # noqa
+            )
+            return delayable_cls, job_args, reads
+
+    def test_backfill_jobs(self):
+        delayable_cls, job_args, reads = self._backfill(
+            date(2019, 4, 15), date(2019, 5, 20), team_ids=[1, 2]
+        )
+        # one job per team and Tempo period, not per week
+        self.assertEqual(
+            job_args,
+            [
+                (1, "2019-04-01"),
+                (1, "2019-05-01"),
+                (2, "2019-04-01"),
+                (2, "2019-05-01"),
+            ],
+        )
+        delay_args, delay_kwargs = delayable_cls.call_args
+        self.assertEqual(delay_kwargs["channel"], "root.connector_jira.tempo_approval")
+        self.assertEqual(delay_kwargs["identity_key"], identity_exact)
+        # a single read per period to find its boundaries
+        self.assertEqual(
+            reads,
+            [
+                (1, "2019-04-15"),
+                (1, "2019-05-01"),
+                (2, "2019-04-15"),
+                (2, "2019-05-01"),
+            ],
+        )
+
+    def test_backfill_company_team(self):
+        self.backend_record.jira_company_team_id = 1
+        __, job_args, __ = self._backfill(date(2019, 4, 1), date(2019, 4, 20))
+        self.assertEqual(job_args, [(1, "2019-04-01")])
+
+    def test_backfill_without_team(self):
+        self.backend_record.jira_company_team_id = False
+        delayable_cls, job_args, reads = self._backfill(
+            date(2019, 4, 1), date(2019, 4, 20)
+        )
+        delayable_cls.assert_not_called()
+        self.assertFalse(reads)
+
+    def test_skip_unchanged_period(self):
+        period_model = self.env["jira.tempo.approval.period"]
+        period = {"dateFrom": "2019-05-01", "dateTo": "2019-05-31"}
+        approvals = [
+            {"user": {"key": "sorsi"}, "status": "open"},
+            {"user": {"key": "manager"}, "status": "approved"},
+        ]
+        self.assertFalse(
+            period_model._is_unchanged(self.backend_record, 1, period, approvals)
+        )
+        period_model._record_sync(self.backend_record, 1, period, approvals)
+        self.assertTrue(
+            period_model._is_unchanged(
+                self.backend_record, 1, period, list(reversed(approvals))
+            )
+        )
+        approvals[0]["status"] = "waiting_for_approval"
+        self.assertFalse(
+            period_model._is_unchanged(self.backend_record, 1, period, approvals)
+        )
+        # another team has its own periods
+        self.assertFalse(
+            period_model._is_unchanged(self.backend_record, 2, period, approvals)
+        )
+        # the period is updated in place when synchronized again
+        period_model._record_sync(self.backend_record, 1, period, approvals)
+        self.assertTrue(
+            period_model._is_unchanged(self.backend_record, 1, period, approvals)
+        )
+        self.assertEqual(
+            period_model.search_count(
+                [
+                    ("backend_id", "=", self.backend_record.id),
+                    ("team_id", "=", 1),
+                    ("date_from", "=", "2019-05-01"),
+                ]
+            ),
+            1,
+        )
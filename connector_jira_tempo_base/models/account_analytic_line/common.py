@@ -2,13 +2,24 @@
 # Copyright 2019 Brainbean Apps (https://brainbeanapps.com)
 # License AGPL-3.0 or later (https://www.gnu.org/licenses/agpl.html).
 
+import logging
+from collections import defaultdict
+from datetime import timedelta
+
+import requests
+
 from odoo.addons.component.core import Component
+from odoo.addons.connector_jira.components.mapper import iso8601_to_naive_date
+
+_logger = logging.getLogger(__name__)
 
 
 class WorklogAdapter(Component):
     _inherit = "jira.worklog.adapter"
 
     _tempo_timesheets_api_path_base = "{server}/rest/tempo-timesheets/3/{path}"
+    # number of days of Tempo worklogs read in one call
+    _tempo_timesheets_page_days = 7
 
     def _tempo_timesheets_get_url(self, path):
         return self.client._get_url(
@@ -24,8 +35,104 @@ class WorklogAdapter(Component):
             worklog["_tempo_timesheets"] = self.tempo_timesheets_read(worklog_id)
         return worklog
 
+    def complete_read(self, worklogs):
+        worklogs = super().complete_read(worklogs)
+        if self.env.context.get("jira_worklog_no_tempo_timesheets_data"):
+            return worklogs
+        missing = [
+            worklog for worklog in worklogs if "_tempo_timesheets" not in worklog
+        ]
+        try:
+            tempo_worklogs = self.tempo_timesheets_read_many(missing)
+        except requests.exceptions.HTTPError:
+            _logger.exception("Could not read the Tempo worklogs by authors")
+            tempo_worklogs = {}
+        fallback = [
+            worklog for worklog in missing if str(worklog["id"]) not in tempo_worklogs
+        ]
+        if fallback:
+            _logger.warning(
+                "%d Tempo worklogs not found by authors, reading them one by one",
+                len(fallback),
+            )
+        for worklog in missing:
+            tempo_worklog = tempo_worklogs.get(str(worklog["id"]))
+            if tempo_worklog is None:
+                with self.handle_404():
+                    tempo_worklog = self.tempo_timesheets_read(worklog["id"])
+            worklog["_tempo_timesheets"] = tempo_worklog
+        return worklogs
+
     def tempo_timesheets_read(self, worklog_id):
         url = self._tempo_timesheets_get_url("worklogs/%s" % worklog_id)
         with self.handle_404():
             response = self.client._session.get(url)
         return response.json()
+
+    def tempo_timesheets_search(self, date_from, date_to, username=None):
+        """Generator of the Tempo worklogs between 2 dates (included)
+
+        The range is read in pages of ``_tempo_timesheets_page_days`` days.
+        When a ``username`` is given, only the worklogs of this author are
+        read.
+        """
+        page_size = timedelta(days=self._tempo_timesheets_page_days)
+        url = self._tempo_timesheets_get_url("worklogs")
+        while date_from <= date_to:
+            page_to = min(date_from + page_size - timedelta(days=1), date_to)
+            params = {"dateFrom": date_from.isoformat(), "dateTo": page_to.isoformat()}
+            if username:
+                params["username"] = username
+            response = self.client._session.get(url, params=params)
+            response.raise_for_status()
+            yield from response.json()
+            date_from = page_to + timedelta(days=1)
+
+    def tempo_timesheets_read_many(self, worklogs):
+        """Read the Tempo worklogs of Jira worklogs, author by author
+
+        Each author is read on the days of their worklogs only, and the
+        pages stop as soon as all of their worklogs are found. Worklogs
+        without author are not read here.
+
+        :return: {jira worklog id: tempo worklog}
+        """
+        by_author = defaultdict(dict)
+        for worklog in worklogs:
+            username = (worklog.get("author") or {}).get("name")
+            if username:
+                by_author[username][str(worklog["id"])] = worklog
+        result = {}
+        for username, author_worklogs in sorted(by_author.items()):
+            wanted = set(author_worklogs)
+            # the start dates are in the timezone of the author, widen the
+            # ranges by a day to get all of them
+            days = sorted(
+                {
+                    iso8601_to_naive_date(worklog["started"])
+                    for worklog in author_worklogs.values()
+                }
+            )
+            ranges = []
+            for day in days:
+                if ranges and day - ranges[-1][1] <= timedelta(days=2):
+                    ranges[-1][1] = day
+                else:
+                    ranges.append([day, day])
+            for date_from, date_to in ranges:
+                for tempo_worklog in self.tempo_timesheets_search(
+                    date_from - timedelta(days=1),
+                    date_to + timedelta(days=1),
+                    username=username,
+                ):
+                    worklog_id = str(
+                        tempo_worklog.get("jiraWorklogId") or tempo_worklog.get("id")
+                    )
+                    if worklog_id in wanted:
+                        result[worklog_id] = tempo_worklog
+                        wanted.discard(worklog_id)
+                        if not wanted:
+                            break
+                if not wanted:
+                    break
+        return result
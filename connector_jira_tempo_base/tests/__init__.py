@@ -2,3 +2,5 @@
 
 from odoo.addons.connector_jira.tests import test_delete_analytic_line
 from odoo.addons.connector_jira.tests import test_import_analytic_line
+
+from . import test_read_tempo_worklogs
@@ -0,0 +1,161 @@
+# License AGPL-3.0 or later (https://www.gnu.org/licenses/agpl.html).
+
+from unittest import mock
+
+import requests
+
+from odoo.addons.connector_jira.tests.common import JiraTransactionComponentCase
+
+
+def _worklog(worklog_id, author, started):
+    return {
+        "id": worklog_id,
+        "author": {"name": author},
+        "started": started + "T10:00:00.000+0000",
+    }
+
+
+class TestReadTempoWorklogs(JiraTransactionComponentCase):
+    def setUp(self):
+        super().setUp()
+        # Tempo worklogs by author, as returned by the "worklogs" endpoint
+        self.tempo_worklogs = {
+            "sorsi": [
+                {"jiraWorklogId": 10100, "dateStarted": "2019-04-08"},
+                {"jiraWorklogId": 10101, "dateStarted": "2019-04-10"},
+                {"jiraWorklogId": 10102, "dateStarted": "2019-04-14"},
+                {"jiraWorklogId": 10104, "dateStarted": "2019-04-20"},
+            ],
+            "manager": [{"jiraWorklogId": 10200, "dateStarted": "2019-04-08"}],
+        }
+        self.params = []
+
+    def _get(self, url, params=None):
+        self.params.append(params)
+        response = mock.Mock()
+        response.json.return_value = [
+            tempo_worklog
+            for tempo_worklog in self.tempo_worklogs[params["username"]]
+            if params["dateFrom"] <= tempo_worklog["dateStarted"] <= params["dateTo"]
+        ]
+        return response
+
+    def _complete_read(self, worklogs, get=None):
+        with self.backend_record.work_on("jira.account.analytic.line") as work:
+            adapter = work.component(usage="backend.adapter")
+            with mock.patch.object(
+                type(adapter), "client", new_callable=mock.PropertyMock
+            ) as client, mock.patch.object(
+                type(adapter),
+                "tempo_timesheets_read",
+                autospec=True,
+                side_effect=lambda adapter, worklog_id: {"id": worklog_id},
+            ) as read_one:
+                client.return_value._session.get.side_effect = get or self._get
+                client.return_value._get_url.return_value = "tempo/worklogs"
+                worklogs = adapter.complete_read(worklogs)
+            return worklogs, read_one
+
+    def test_read_by_author(self):
+        worklogs = [
+            _worklog(10100, "sorsi", "2019-04-08"),
+            _worklog(10200, "manager", "2019-04-08"),
+        ]
+        worklogs, read_one = self._complete_read(worklogs)
+        self.assertEqual(
+            [w["_tempo_timesheets"]["jiraWorklogId"] for w in worklogs],
+            [10100, 10200],
+        )
+        read_one.assert_not_called()
+        # each author is read on the days of their worklogs only
+        self.assertEqual(
+            [(p["username"], p["dateFrom"], p["dateTo"]) for p in self.params],
+            [
+                ("manager", "2019-04-07", "2019-04-09"),
+                ("sorsi", "2019-04-07", "2019-04-09"),
+            ],
+        )
+
+    def test_read_in_pages(self):
+        worklogs = [
+            _worklog(10100, "sorsi", "2019-04-08"),
+            _worklog(10101, "sorsi", "2019-04-10"),
+            _worklog(10102, "sorsi", "2019-04-14"),
+        ]
+        worklogs, read_one = self._complete_read(worklogs)
+        read_one.assert_not_called()
+        self.assertEqual(
+            [w["_tempo_timesheets"]["jiraWorklogId"] for w in worklogs],
+            [10100, 10101, 10102],
+        )
+        # the range of 9 days is read in pages of 7 days
+        self.assertEqual(
+            [(p["dateFrom"], p["dateTo"]) for p in self.params],
+            [("2019-04-07", "2019-04-13"), ("2019-04-14", "2019-04-15")],
+        )
+
+    def test_read_sparse_dates(self):
+        worklogs = [
+            _worklog(10100, "sorsi", "2019-04-08"),
+            _worklog(10104, "sorsi", "2019-04-20"),
+        ]
+        worklogs, read_one = self._complete_read(worklogs)
+        read_one.assert_not_called()
+        # the days in between are not read
+        self.assertEqual(
+            [(p["dateFrom"], p["dateTo"]) for p in self.params],
+            [("2019-04-07", "2019-04-09"), ("2019-04-19", "2019-04-21")],
+        )
+
+    def test_stop_paging_when_found(self):
+        # started the next day in the timezone of Jira
+        self.tempo_worklogs["sorsi"][2]["dateStarted"] = "2019-04-12"
+        worklogs = [
+            _worklog(10100, "sorsi", "2019-04-08"),
+            _worklog(10102, "sorsi", "2019-04-13"),
+        ]
+        worklogs, read_one = self._complete_read(worklogs)
+        read_one.assert_not_called()
+        # both worklogs are in the first page, the second one is not read
+        self.assertEqual(
+            [(p["dateFrom"], p["dateTo"]) for p in self.params],
+            [("2019-04-07", "2019-04-13")],
+        )
+
+    def test_fallback_one_by_one(self):
+        worklogs = [
+            _worklog(10100, "sorsi", "2019-04-08"),
+            # unknown by Tempo in the bulk read
+            _worklog(10103, "sorsi", "2019-04-08"),
+            # no author to filter on
+            {"id": 10300, "author": {}, "started": "2019-04-08T10:00:00.000+0000"},
+        ]
+        with self.assertLogs(
+            "odoo.addons.connector_jira_tempo_base.models.account_analytic_line.common",
+            level="WARNING",
+        ) as logs:
+            worklogs, read_one = self._complete_read(worklogs)
+        self.assertIn("2 Tempo worklogs not found by authors", logs.output[0])
+        self.assertEqual(
+            [call.args[1] for call in read_one.call_args_list], [10103, 10300]
+        )
+        self.assertEqual(worklogs[0]["_tempo_timesheets"]["jiraWorklogId"], 10100)
+        self.assertEqual(worklogs[1]["_tempo_timesheets"], {"id": 10103})
+
+    def test_fallback_on_error(self):
+        def get(url, params=None):
+            response = mock.Mock()
+            response.raise_for_status.side_effect = requests.exceptions.HTTPError()
+            return response
+
+        worklogs = [_worklog(10100, "sorsi", "2019-04-08")]
+        with self.assertLogs(
+            "odoo.addons.connector_jira_tempo_base.models.account_analytic_line.common",
+            level="WARNING",
+        ) as logs:
+            worklogs, read_one = self._complete_read(worklogs, get=get)
+        self.assertTrue(
+            any("Could not read the Tempo worklogs" in line for line in logs.output)
+        )
+        read_one.assert_called_once()
+        self.assertEqual(worklogs[0]["_tempo_timesheets"], {"id": 10100})